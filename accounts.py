@@ -0,0 +1,143 @@
+# accounts.py
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
+from cachetools import TTLCache
+from config import BotConfig
+from exchange import BinanceAPIHandler
+from service import TradingService
+from scheduler import AnalysisScheduler
+from startup import build_account, initialize_components
+
+logger = logging.getLogger(__name__)
+
+# Publiczne dane rynkowe: wspólne dla kont, z krótkim TTL dla cen i długim dla metadanych
+PRICE_METHODS = ('get_all_tickers', 'get_symbol_ticker', 'get_ticker', 'get_orderbook_ticker')
+INFO_METHODS = ('get_symbol_info', 'get_exchange_info')
+PASSTHROUGH_METHODS = ('get_klines', 'get_order_book', 'get_server_time')
+
+class MarketDataPlane:
+    """
+    Wspólna warstwa danych rynkowych dla wielu kont: jeden klient (jedna sesja HTTP)
+    i pamięć podręczna odpowiedzi, więc kolejne konto w tym samym cyklu nie kosztuje
+    dodatkowej wagi REST.
+    """
+
+    def __init__(self, client, price_ttl: float = 2.0, info_ttl: float = 3600.0, timer: Callable[[], float] = time.monotonic):
+        self.client = client
+        self._caches = {
+            'price': TTLCache(maxsize=4096, ttl=price_ttl, timer=timer),
+            'info': TTLCache(maxsize=4096, ttl=info_ttl, timer=timer)
+        }
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def call(self, method: str, *args, **params) -> Any:
+        kind = 'price' if method in PRICE_METHODS else 'info' if method in INFO_METHODS else None
+        if kind is None:
+            return getattr(self.client, method)(*args, **params)
+        key = (method, args, tuple(sorted(params.items())))
+        cache = self._caches[kind]
+        with self._lock:
+            if key in cache:
+                self.stats['hits'] += 1
+                return cache[key]
+        value = getattr(self.client, method)(*args, **params)
+        with self._lock:
+            self.stats['misses'] += 1
+            cache[key] = value
+        return value
+
+class AccountClient:
+    """
+    Klient konta widziany przez PortfolioOptimizer/RiskManager: dane rynkowe ze wspólnej
+    warstwy, konto i zlecenia własnym kluczem API.
+    """
+
+    def __init__(self, client, market: MarketDataPlane):
+        self.client = client
+        self.market = market
+
+    def __getattr__(self, name: str):
+        if name in PRICE_METHODS or name in INFO_METHODS or name in PASSTHROUGH_METHODS:
+            return lambda *args, **params: self.market.call(name, *args, **params)
+        return getattr(self.client, name)
+
+def load_account_configs(path: str, base: BotConfig) -> List[BotConfig]:
+    """
+    Plik JSON z listą kont: każde to nadpisania konfiguracji bazowej, np.
+    {"account_name": "sub1", "api_key_env": "SUB1_KEY", "api_secret_env": "SUB1_SECRET",
+     "max_trade_usd": 1000}. Dziennik stanu domyślnie osobny dla konta.
+    """
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    configs = []
+    for entry in entries:
+        name = entry.get('account_name')
+        if not name:
+            raise ValueError("Każde konto musi mieć account_name")
+        values = {**base.dict(), 'state_journal_path': f"state_{name}.db", **entry}
+        configs.append(BotConfig(**values))
+    names = [c.account_name for c in configs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Powtórzone nazwy kont: {names}")
+    return configs
+
+class MultiAccountService(TradingService):
+    """
+    Wiele subkont w jednym procesie: wspólne dane rynkowe, świece, wskaźniki i model
+    sentymentu (jeden CryptoAnalyzer), osobne PortfolioOptimizer/RiskManager na konto.
+    """
+
+    def __init__(self, config: BotConfig, account_configs: List[BotConfig]):
+        super().__init__(config)
+        self.account_configs = account_configs
+        self.market = None
+        self.accounts: Dict[str, Dict] = {}
+
+    async def initialize(self):
+        components = await initialize_components(self.config, self.profiler, account=False)
+        for name, component in components.items():
+            setattr(self, name, component)
+        await self.start_metrics_server()
+
+        self.market = MarketDataPlane(
+            self.api_handler.client,
+            price_ttl=self.config.market_price_ttl,
+            info_ttl=self.config.market_info_ttl
+        )
+        handlers = await asyncio.gather(*(
+            asyncio.to_thread(BinanceAPIHandler, account_config, True)
+            for account_config in self.account_configs
+        ))
+        for account_config, handler in zip(self.account_configs, handlers):
+            client = AccountClient(handler.client, self.market)
+            self.accounts[account_config.account_name] = build_account(
+                account_config,
+                self.analyzer,
+                client,
+                self.http_pool,
+                self.order_books
+            )
+        logger.info(f"Konta: {', '.join(self.accounts)}")
+
+    def create_scheduler(self) -> AnalysisScheduler:
+        return AnalysisScheduler(
+            self.analyzer,
+            {name: account['optimizer'] for name, account in self.accounts.items()},
+            self.config,
+            reporter=self._on_cycle_report,
+            snapshots=self.snapshots
+        )
+
+    async def close(self):
+        for account in self.accounts.values():
+            account['journal'].close()
+            if account['notifier']:
+                await account['notifier'].close()
+        if self.market:
+            logger.info(f"Statystyki wspólnych danych rynkowych: {self.market.stats}")
+        await super().close()
@@ -0,0 +1,128 @@
+# analysis_pool.py
+import logging
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+from klines import KLINE_DTYPE, klines_frame
+from indicators import compute_indicators, trend_direction
+
+logger = logging.getLogger(__name__)
+
+# (symbol, (początek, długość) świec bazowych, [(początek, długość) per interwał potwierdzenia])
+Segment = Tuple[str, Tuple[int, int], List[Tuple[int, int]]]
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: procesy puli dzielą resource_tracker z procesem głównym,
+        # więc ponowna rejestracja jest nieszkodliwa (blok usuwa unlink w analyze)
+        return shared_memory.SharedMemory(name=name)
+
+def _analyze_segments(buffer, rows: int, segments: Sequence[Segment], intervals: Sequence[str]) -> List[Dict]:
+    data = np.ndarray(rows, dtype=KLINE_DTYPE, buffer=buffer)
+    results = []
+    for symbol, (start, length), confirmations in segments:
+        df = klines_frame(data[start:start + length])
+        try:
+            row = {'symbol': symbol, 'price': float(df['close'].iloc[-1]), **compute_indicators(df)}
+            for interval, (c_start, c_length) in zip(intervals, confirmations):
+                row[f'trend_{interval}'] = trend_direction(data['close'][c_start:c_start + c_length].copy())
+        except Exception as e:
+            row = {'symbol': symbol, 'error': str(e)}
+        results.append(row)
+    return results
+
+def analyze_shard(shm_name: str, rows: int, segments: Sequence[Segment], intervals: Sequence[str]) -> List[Dict]:
+    """Uruchamiane w procesie roboczym: świece czytane bezpośrednio z pamięci współdzielonej."""
+    shm = _attach(shm_name)
+    try:
+        # Widoki na bufor żyją tylko w _analyze_segments - po powrocie można zamknąć blok
+        return _analyze_segments(shm.buf, rows, segments, intervals)
+    finally:
+        shm.close()
+
+def analyze_in_process(candidates, intervals: Sequence[str]) -> List[Dict]:
+    """To samo co AnalysisPool.analyze, w bieżącym procesie (zapas po awarii puli)."""
+    if not candidates:
+        return []
+    rows = sum(len(base) + sum(len(a) for a in extra) for _, base, extra in candidates)
+    buffer = bytearray(max(1, rows * KLINE_DTYPE.itemsize))
+    segments = AnalysisPool._pack(buffer, rows, candidates)
+    return _analyze_segments(buffer, rows, segments, intervals)
+
+class AnalysisPool:
+    """
+    Wskaźniki liczone w ProcessPoolExecutor. Tablice świec trafiają do jednego
+    bloku pamięci współdzielonej; procesom przekazywany jest tylko układ segmentów.
+    Po śmierci procesu roboczego (BrokenProcessPool) pula jest odtwarzana przy
+    następnym wywołaniu, a błąd trafia do wywołującego.
+    """
+
+    def __init__(self, workers: int, start_method: str = "spawn"):
+        self.workers = workers
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method)
+            )
+        return self._executor
+
+    def analyze(self, candidates: Sequence[Tuple[str, np.ndarray, List[np.ndarray]]], intervals: Sequence[str]) -> List[Dict]:
+        """Wyniki w kolejności `candidates`; błędy wskaźników jako {'symbol', 'error'}."""
+        if not candidates:
+            return []
+        rows = sum(len(base) + sum(len(a) for a in extra) for _, base, extra in candidates)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, rows * KLINE_DTYPE.itemsize))
+        try:
+            segments = self._pack(shm.buf, rows, candidates)
+            # Ciągłe fragmenty listy - scalenie wyników w kolejności zgłoszeń
+            shards = [s for s in np.array_split(np.arange(len(segments)), self.workers) if len(s)]
+            futures = [
+                self.executor.submit(analyze_shard, shm.name, rows, segments[s[0]:s[-1] + 1], list(intervals))
+                for s in shards
+            ]
+            results = []
+            try:
+                for future in futures:
+                    results.extend(future.result())
+            except BrokenProcessPool:
+                logger.error("Proces roboczy analizy zakończył się nieoczekiwanie - odtworzenie puli")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                raise
+            return results
+        finally:
+            shm.close()
+            shm.unlink()
+
+    @staticmethod
+    def _pack(buffer, rows: int, candidates) -> List[Segment]:
+        data = np.ndarray(rows, dtype=KLINE_DTYPE, buffer=buffer)
+        segments = []
+        offset = 0
+        for symbol, base, extra in candidates:
+            data[offset:offset + len(base)] = base
+            base_segment = (offset, len(base))
+            offset += len(base)
+            extra_segments = []
+            for array in extra:
+                data[offset:offset + len(array)] = array
+                extra_segments.append((offset, len(array)))
+                offset += len(array)
+            segments.append((symbol, base_segment, extra_segments))
+        del data
+        return segments
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
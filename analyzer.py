@@ -1,13 +1,26 @@
 # analyzer.py
 import logging
+import threading
+import time
+import asyncio
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
 import pandas as pd
 import numpy as np
-import aiohttp
-from ta.momentum import RSIIndicator
-from ta.trend import MACD, ADXIndicator
-from ta.volatility import BollingerBands, AverageTrueRange
-from typing import Dict, Optional, List
-from sentiment import SentimentAnalyzer
+from typing import TYPE_CHECKING, Dict, Optional, List
+from metrics import metrics, timed
+from volatility import VolatilityTracker
+from coin_index import CoinMentionExtractor
+from klines import klines_frame, parse_klines_array
+from timeframes import CandleSeries
+from universe import screen_tickers
+from analysis_pool import AnalysisPool, analyze_in_process
+from cluster import AnalysisCoordinator
+from shared_limiter import KLINES_WEIGHT, TICKER_24H_ALL_WEIGHT, throttle
+from indicators import compute_bb_percent, compute_indicators, trend_direction
+
+if TYPE_CHECKING:
+    from ta.volatility import BollingerBands
 
 logger = logging.getLogger(__name__)
 
@@ -19,132 +32,384 @@ class CryptoAnalyzer:
         ticker_cache: object,
         config: object,
         api_handler: object,
-        cryptopanic_api_key: Optional[str] = None
+        cryptopanic_api_key: Optional[str] = None,
+        sentiment_analyzer: Optional[object] = None
     ):
         self.client = binance_client
         self.reddit = reddit
         self.ticker_cache = ticker_cache
         self.config = config
         self.api_handler = api_handler
+        # Wspólny budżet wagi REST (shared_limiter) - również dla pobierania danych
+        self.limiter = getattr(api_handler, 'limiter', None)
         self.cryptopanic_api_key = cryptopanic_api_key
-        self.sentiment_analyzer = SentimentAnalyzer(config)
+        self.sentiment_analyzer = sentiment_analyzer
+        if sentiment_analyzer is None and config.enable_news and not config.simulation_mode:
+            # Model sentymentu (torch/transformers) ładowany tylko gdy jest używany
+            from sentiment import SentimentAnalyzer
+            self.sentiment_analyzer = SentimentAnalyzer(config)
+        self.volatility = VolatilityTracker(
+            ewma_lambda=config.volatility_ewma_lambda,
+            atr_period=config.volatility_atr_period,
+            ttl=config.volatility_ttl,
+            history=config.volatility_history
+        )
+        # Jedna seria świec bazowych na symbol; wyższe interwały liczone lokalnie
+        self.candles: Dict[str, CandleSeries] = {}
+        # Świece z WebSocket czekają tu na wątek analizy - tylko on zmienia serie
+        self._candle_updates: Dict[str, deque] = {}
+        self._candle_lock = threading.Lock()
+        self.clock = time.time
+        self.pool = None
+        if config.analysis_workers > 0:
+            self.pool = AnalysisPool(config.analysis_workers, config.analysis_start_method)
+        # Tryb rozproszony: symbole liczą węzły (cluster.py), tutaj tylko scalanie
+        self.coordinator = None
+        if config.cluster_workers:
+            self.coordinator = AnalysisCoordinator(
+                config.cluster_workers,
+                shard_size=config.cluster_shard_size,
+                shard_timeout=config.cluster_shard_timeout,
+                connect_timeout=config.cluster_connect_timeout,
+                secret=config.cluster_secret
+            )
+        self._extractor_version = None
         self.logger = logging.getLogger(self.__class__.__name__)
 
+    @timed('analyze_market')
     async def analyze_market(self) -> pd.DataFrame:
+        symbols = await asyncio.to_thread(self.screen_universe)
+        return await self.analyze_symbols(symbols)
+
+    def screen_universe(self) -> List[str]:
+        """
+        Kandydaci do analizy: jedno zapytanie o tickery 24h dla wszystkich par,
+        filtr progów z konfiguracji i top-N według wolumenu.
+        """
+        symbols = self.ticker_cache.symbols
+        limit = self.config.max_analysis_symbols
+        if not self.config.screen_enabled:
+            return symbols[:limit]
         try:
-            symbols = self.ticker_cache.symbols[:100]
-            results = []
-            
-            for symbol in symbols:
-                try:
-                    df = self.get_historical_data(symbol, '1h')
-                    if df.empty:
-                        continue
-                    
-                    indicators = self.calculate_indicators(df)
-                    if not indicators:
-                        self.logger.warning(f"Brak wskaźników dla {symbol}")
-                        continue
-                    
-                    score = self.calculate_score(indicators)
-                    results.append({
-                        'symbol': symbol,
-                        'price': df['close'].iloc[-1],
-                        'score': score,
-                        **indicators
-                    })
-                except Exception as e:
-                    self.logger.error(f"Błąd przetwarzania {symbol}: {str(e)}")
-                    continue
+            throttle(self.limiter, TICKER_24H_ALL_WEIGHT)
+            with metrics.timer('call_seconds', function='get_ticker'):
+                tickers = self.client.get_ticker()
+        except Exception as e:
+            self.logger.error("Błąd pobierania tickerów 24h: %s", e)
+            return symbols[:limit]
+        return screen_tickers(
+            tickers,
+            symbols,
+            limit,
+            min_quote_volume=self.config.screen_min_quote_volume,
+            max_spread=self.config.screen_max_spread,
+            min_abs_change=self.config.screen_min_abs_change,
+            max_abs_change=self.config.screen_max_abs_change
+        )
+
+    async def analyze_symbols(self, symbols: List[str], sentiment: Optional[tuple] = None) -> pd.DataFrame:
+        try:
+            if self.coordinator is not None:
+                results = await self._collect_results_cluster(symbols)
+            else:
+                # Zapytania REST i wskaźniki blokują - wykonywane poza pętlą zdarzeń
+                results = await asyncio.to_thread(self._collect_results, symbols)
             
             if not results:
                 return pd.DataFrame(columns=['symbol', 'price', 'score', 'rsi', 'macd', 'adx', 'bb_percent'])
             
             df = pd.DataFrame(results)
-            df = self.process_results(df)
+            if 'score' not in df.columns or df['score'].isna().any():
+                df['score'] = self.calculate_scores(df)
             
             if self.config.enable_news and not self.config.simulation_mode:
-                await self.add_sentiment_data(df)
+                if sentiment is None:
+                    df = await self.add_sentiment_data(df)
+                else:
+                    df = self.apply_sentiment(df, *sentiment)
             
-            return df
+            return self.process_results(df)
             
         except Exception as e:
             self.logger.error(f"Krytyczny błąd analizy: {str(e)}")
             return pd.DataFrame(columns=['symbol', 'price', 'score'])
 
-    def get_historical_data(self, symbol: str, interval: str) -> pd.DataFrame:
+    def _collect_results(self, symbols: List[str]) -> List[Dict]:
+        if self.pool is not None:
+            return self._collect_results_pool(symbols)
+        results = []
+        for symbol in symbols:
+            try:
+                row = self.analyze_symbol(symbol)
+                if row:
+                    results.append(row)
+            except Exception as e:
+                self.logger.error("Błąd przetwarzania %s: %s", symbol, e)
+        return results
+
+    def _collect_results_pool(self, symbols: List[str]) -> List[Dict]:
+        # Pobieranie świec i zmienność (stan analizatora) w tym procesie, wskaźniki w procesach roboczych
+        intervals = self.config.confirmation_intervals
+        candidates = []
+        for symbol in symbols:
+            try:
+                series = self.get_candles(symbol)
+                if series is None:
+                    continue
+                base = series.array(lookback=self.config.analysis_lookback)
+                self.update_volatility(symbol, klines_frame(base))
+                candidates.append((symbol, base, [series.array(i) for i in intervals]))
+            except Exception as e:
+                self.logger.error("Błąd przetwarzania %s: %s", symbol, e)
+
         try:
-            klines = self.client.get_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=100
+            rows = self.pool.analyze(candidates, intervals)
+        except BrokenProcessPool:
+            # Pula odtworzy się w następnym cyklu; ten liczony w bieżącym procesie
+            rows = analyze_in_process(candidates, intervals)
+        results = []
+        for row in rows:
+            if 'error' in row:
+                self.logger.error("Błąd wskaźników %s: %s", row['symbol'], row['error'])
+            else:
+                results.append(row)
+        return results
+
+    async def _collect_results_cluster(self, symbols: List[str]) -> List[Dict]:
+        rows, leftover = await self.coordinator.analyze(symbols)
+        for row in rows:
+            # Zmienność potrzebna menedżerowi ryzyka liczona z świec przysłanych przez węzeł
+            candles = row.pop('candles', None)
+            # Score zawsze liczony tutaj (calculate_scores), nie przyjmowany od węzła
+            row.pop('score', None)
+            if candles:
+                self.volatility.update(row['symbol'], *candles)
+        if leftover:
+            self.logger.warning("Analiza lokalna %d symboli pominiętych przez węzły", len(leftover))
+            rows.extend(await asyncio.to_thread(self._collect_results, leftover))
+        return rows
+
+    def closed_candles(self, symbol: str) -> Optional[List[list]]:
+        """Zamknięte świece z okna analizy jako [czasy zamknięcia, high, low, close]."""
+        series = self.candles.get(symbol)
+        if series is None:
+            return None
+        tail = series.array(lookback=self.config.analysis_lookback)
+        closed = tail[tail['close_time'] < int(time.time() * 1000)]
+        return [closed[field].tolist() for field in ('close_time', 'high', 'low', 'close')]
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+        if self.coordinator is not None:
+            self.coordinator.close()
+
+    def analyze_symbol(self, symbol: str) -> Optional[Dict]:
+        series = self.get_candles(symbol)
+        if series is None:
+            return None
+        df = series.frame(lookback=self.config.analysis_lookback)
+
+        self.update_volatility(symbol, df)
+        indicators = self.calculate_indicators(df)
+        if not indicators:
+            self.logger.warning("Brak wskaźników dla %s", symbol)
+            return None
+        
+        return {
+            'symbol': symbol,
+            'price': df['close'].iloc[-1],
+            **indicators,
+            **self.calculate_confirmations(series)
+        }
+
+    def get_candles(self, symbol: str) -> Optional[CandleSeries]:
+        """
+        Pierwsze wywołanie pobiera pełną historię interwału bazowego, kolejne tylko
+        świece od ostatniej znanej (niezamkniętej) włącznie. Seria starsza niż cała
+        historia (np. symbol długo poza analizą) jest pobierana od nowa.
+        """
+        series = self.candles.get(symbol)
+        with self._candle_lock:
+            updates = self._candle_updates.pop(symbol, ())
+        if series is not None and \
+                self.clock() * 1000 - series.last_open_time > self.config.candle_history * series.base_ms:
+            # Dociąganie od startTime zwróciłoby candle_history świec i zostawiło lukę do teraz
+            self.logger.info("Seria %s nieaktualna, pełne przeładowanie", symbol)
+            series = None
+        if series is None:
+            series = CandleSeries(
+                self.config.base_interval,
+                self.config.confirmation_intervals,
+                self.config.candle_history
             )
+        else:
+            for candles in updates:
+                series.update(candles)
+        params = {'limit': self.config.candle_history}
+        if series.last_open_time is not None:
+            params['startTime'] = series.last_open_time
+        try:
+            # Pełna historia nowej serii to ruch masowy, dociąganie ostatnich świec - zwykły
+            throttle(self.limiter, KLINES_WEIGHT, 'default' if 'startTime' in params else 'bulk')
+            with metrics.timer('call_seconds', function='get_klines'):
+                klines = self.client.get_klines(
+                    symbol=symbol,
+                    interval=self.config.base_interval,
+                    **params
+                )
+            series.update(parse_klines_array(klines))
+        except Exception as e:
+            self.logger.error("Błąd danych %s: %s", symbol, e)
+            return None
+        if not len(series):
+            return None
+        self.candles[symbol] = series
+        return series
+
+    def on_candles(self, symbol: str, candles: np.ndarray) -> None:
+        """
+        Świece ze strumienia WebSocket i uzupełnień luk; seria musi mieć już historię z REST.
+        Wołane w wątku pętli - świece trafią do serii przy następnym get_candles.
+        """
+        if symbol not in self.candles:
+            return
+        with self._candle_lock:
+            updates = self._candle_updates.get(symbol)
+            if updates is None:
+                updates = self._candle_updates[symbol] = deque(maxlen=self.config.candle_history)
+            updates.append(candles)
+
+    def get_historical_data(self, symbol: str, interval: str) -> pd.DataFrame:
+        try:
+            throttle(self.limiter, KLINES_WEIGHT, 'bulk')
+            with metrics.timer('call_seconds', function='get_klines'):
+                klines = self.client.get_klines(
+                    symbol=symbol,
+                    interval=interval,
+                    limit=100
+                )
             return self.parse_klines(klines)
         except Exception as e:
-            self.logger.error(f"Błąd danych {symbol}: {str(e)}")
+            self.logger.error("Błąd danych %s: %s", symbol, e)
             return pd.DataFrame()
 
     def parse_klines(self, klines: list) -> pd.DataFrame:
-        df = pd.DataFrame(klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_volume', 'count',
-            'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        return df
+        return klines_frame(parse_klines_array(klines))
+
+    def update_volatility(self, symbol: str, df: pd.DataFrame) -> None:
+        try:
+            close_times = pd.to_numeric(df['close_time'])
+            closed = df[close_times < int(time.time() * 1000)]
+            self.volatility.update(
+                symbol,
+                close_times[closed.index],
+                closed['high'],
+                closed['low'],
+                closed['close']
+            )
+        except Exception as e:
+            self.logger.error("Błąd aktualizacji zmienności %s: %s", symbol, e)
+
+    def calculate_volatility(self, symbol: str) -> float:
+        volatility = self.volatility.get(symbol)
+        if volatility is None:
+            self.logger.debug("Brak aktualnej zmienności dla %s, używam domyślnej", symbol)
+            return self.config.default_volatility
+        return volatility
 
+    @timed('calculate_indicators')
     def calculate_indicators(self, df: pd.DataFrame) -> Dict[str, float]:
         try:
-            rsi = RSIIndicator(df['close'], window=14).rsi().iloc[-1]
-            macd = MACD(df['close']).macd_diff().iloc[-1]
-            adx = ADXIndicator(df['high'], df['low'], df['close']).adx().iloc[-1]
-            bb = BollingerBands(df['close'], window=20, window_dev=2)
-            bb_percent = self.calculate_bb_percent(df, bb)
-            
-            return {
-                'rsi': round(rsi, 2),
-                'macd': round(macd, 4),
-                'adx': round(adx, 2),
-                'bb_percent': round(bb_percent, 2)
-            }
+            return compute_indicators(df)
         except Exception as e:
-            self.logger.error(f"Błąd wskaźników: {str(e)}")
+            self.logger.error("Błąd wskaźników: %s", e)
             return {}
 
+    def calculate_confirmations(self, series: CandleSeries) -> Dict[str, float]:
+        """Kierunek trendu (znak histogramu MACD) na wyższych interwałach: -1, 0 lub 1."""
+        return {
+            f'trend_{interval}': trend_direction(series.array(interval)['close'])
+            for interval in self.config.confirmation_intervals
+        }
+
     def calculate_score(self, indicators: Dict[str, float]) -> float:
-        return (
+        score = (
             0.4 * (1 - indicators['rsi']/100) + 
             0.3 * indicators['macd'] + 
             0.3 * indicators['bb_percent']
         )
+        trends = [v for k, v in indicators.items() if k.startswith('trend_')]
+        if trends:
+            score += self.config.mtf_weight * sum(trends) / len(trends)
+        return score
+
+    def calculate_scores(self, df: pd.DataFrame) -> pd.Series:
+        # Ta sama formuła co calculate_score, liczona na całych kolumnach
+        score = (
+            0.4 * (1 - df['rsi']/100) + 
+            0.3 * df['macd'] + 
+            0.3 * df['bb_percent']
+        )
+        trends = [c for c in df.columns if c.startswith('trend_')]
+        if trends:
+            score = score + self.config.mtf_weight * df[trends].mean(axis=1)
+        return score
+
+    def calculate_bb_percent(self, df: pd.DataFrame, bb: 'BollingerBands') -> float:
+        return compute_bb_percent(df, bb)
+
+    def _refresh_coin_extractor(self) -> None:
+        # Przebudowa automatu tylko po odświeżeniu listy symboli
+        if self._extractor_version == self.ticker_cache.last_update:
+            return
+        self.sentiment_analyzer.extractor = CoinMentionExtractor(
+            self.ticker_cache.base_assets.values(),
+            self.config.coin_aliases
+        )
+        self._extractor_version = self.ticker_cache.last_update
 
-    def calculate_bb_percent(self, df: pd.DataFrame, bb: BollingerBands) -> float:
-        hband = bb.bollinger_hband().iloc[-1]
-        lband = bb.bollinger_lband().iloc[-1]
-        current_close = df['close'].iloc[-1]
-        bb_diff = hband - lband
-        return (current_close - lband) / bb_diff if bb_diff != 0 else 0.0
+    async def fetch_sentiment(self) -> tuple:
+        if self.sentiment_analyzer is None:
+            return {}, {}
+        if self.sentiment_analyzer.reddit is None:
+            self.sentiment_analyzer.reddit = self.reddit
+        self._refresh_coin_extractor()
+        await self.sentiment_analyzer.ingest()
+        index = self.sentiment_analyzer.coin_index
+        return index.snapshot("reddit"), index.snapshot("news")
 
-    async def add_sentiment_data(self, df: pd.DataFrame) -> None:
+    async def add_sentiment_data(self, df: pd.DataFrame) -> pd.DataFrame:
         try:
-            reddit_data = await self.analyze_reddit_sentiment(["CryptoCurrency", "Bitcoin"])
-            news_data = await self.analyze_cryptopanic_news()
-            
-            for _, row in df.iterrows():
-                coin = row['symbol'].replace('USDT', '')
-                df.loc[df['symbol'] == row['symbol'], 'reddit_sentiment'] = \
-                    reddit_data.get(coin, {}).get('positive', 0)
+            reddit_data, news_data = await self.fetch_sentiment()
+            return self.apply_sentiment(df, reddit_data, news_data)
+        except Exception as e:
+            self.logger.error(f"Błąd integracji sentymentu: {str(e)}")
+            return df
+
+    def apply_sentiment(self, df: pd.DataFrame, reddit_scores: Dict[str, float], news_scores: Dict[str, float]) -> pd.DataFrame:
+        try:
+            sentiment = pd.DataFrame({
+                'reddit_sentiment': pd.Series(reddit_scores, dtype=float),
+                'news_sentiment': pd.Series(news_scores, dtype=float)
+            })
+            coins = df['symbol'].map(self.ticker_cache.base_assets)
+            coins = coins.fillna(df['symbol'].str.removesuffix('USDT'))
             
-            news_score = sum([n['sentiment'] for n in news_data])/len(news_data) if news_data else 0
-            df['news_sentiment'] = news_score
+            df = (
+                df.drop(columns=['reddit_sentiment', 'news_sentiment'], errors='ignore')
+                .assign(coin=coins)
+                .merge(sentiment, how='left', left_on='coin', right_index=True)
+                .drop(columns='coin')
+            )
+            df[['reddit_sentiment', 'news_sentiment']] = df[['reddit_sentiment', 'news_sentiment']].fillna(0.0)
             
             df['score'] = df['score'] * (1 - self.config.news_weight) + \
                           (df['reddit_sentiment'] + df['news_sentiment']) * self.config.news_weight
             
         except Exception as e:
             self.logger.error(f"Błąd integracji sentymentu: {str(e)}")
+        return df
 
-    def process_results(self, results: list) -> pd.DataFrame:
-        return results.sort_values('score', ascending=False).reset_index(drop=True)
\ No newline at end of file
+    def process_results(self, results: pd.DataFrame) -> pd.DataFrame:
+        return results.nlargest(self.config.analysis_top_k, 'score').reset_index(drop=True)
@@ -0,0 +1,469 @@
+# bench_cycle.py
+"""
+Benchmarki cyklu handlowego na nagranych danych, bez sieci.
+
+    python bench_cycle.py                   # porównanie z bench_baseline.json
+    python bench_cycle.py --update-baseline # zapis nowej linii bazowej
+    python bench_cycle.py --record-live     # nagranie świec z Binance do fixture
+
+Kod wyjścia 1 oznacza regresję względem linii bazowej.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_PATH = os.path.join(HERE, "bench_fixtures", "klines_1h.json")
+BASELINE_PATH = os.path.join(HERE, "bench_baseline.json")
+SIZES = (10, 100, 1000)
+KLINES_PER_SYMBOL = 100
+
+def generate_fixture(length: int = 300, seed: int = 7) -> List[list]:
+    """Syntetyczna seria w formacie surowej odpowiedzi /api/v3/klines."""
+    rng = np.random.default_rng(seed)
+    closes = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    spread = np.abs(rng.normal(0, 0.004, length)) * closes
+    start = 1_700_000_000_000
+    klines = []
+    for i in range(length):
+        open_time = start + i * 3_600_000
+        high = max(opens[i], closes[i]) + spread[i]
+        low = min(opens[i], closes[i]) - spread[i]
+        volume = rng.uniform(50, 500)
+        klines.append([
+            open_time, f"{opens[i]:.2f}", f"{high:.2f}", f"{low:.2f}", f"{closes[i]:.2f}",
+            f"{volume:.5f}", open_time + 3_599_999, f"{volume * closes[i]:.2f}",
+            int(rng.integers(100, 5000)), f"{volume / 2:.5f}", f"{volume * closes[i] / 2:.2f}", "0"
+        ])
+    return klines
+
+def record_live(symbol: str = "BTCUSDT", limit: int = 300) -> None:
+    from binance.client import Client
+    klines = Client().get_klines(symbol=symbol, interval="1h", limit=limit)
+    save_fixture(klines)
+
+def save_fixture(klines: List[list]) -> None:
+    os.makedirs(os.path.dirname(FIXTURE_PATH), exist_ok=True)
+    with open(FIXTURE_PATH, "w") as f:
+        json.dump(klines, f, separators=(",", ":"))
+
+def load_fixture() -> List[list]:
+    with open(FIXTURE_PATH) as f:
+        return json.load(f)
+
+def symbol_klines(base: List[list], n: int) -> Dict[str, List[list]]:
+    """Dla każdego symbolu inne okno nagranej serii, przeskalowane cenowo."""
+    out = {}
+    windows = len(base) - KLINES_PER_SYMBOL
+    for i in range(n):
+        offset = (i * 7) % windows
+        scale = 1 + (i % 50) * 0.01
+        out[f"S{i}USDT"] = [
+            k[:1] + [f"{float(v) * scale:.6f}" for v in k[1:5]] + k[5:]
+            for k in base[offset:offset + KLINES_PER_SYMBOL]
+        ]
+    return out
+
+class FakeClient:
+    """Klient Binance odpowiadający z fixture."""
+
+    def __init__(self, klines: Dict[str, List[list]]):
+        self.klines = klines
+        self.prices = {s: float(k[-1][4]) for s, k in klines.items()}
+
+    def get_klines(self, symbol, interval, limit=100, startTime=None):
+        klines = self.klines[symbol]
+        if startTime is not None:
+            klines = [k for k in klines if k[0] >= startTime]
+        return klines[-limit:]
+
+    def get_ticker(self):
+        return [
+            {
+                'symbol': s,
+                'lastPrice': str(p),
+                'bidPrice': str(p * 0.9999),
+                'askPrice': str(p * 1.0001),
+                'priceChangePercent': '1.5',
+                'quoteVolume': str(1e7 + i)
+            }
+            for i, (s, p) in enumerate(self.prices.items())
+        ]
+
+    def get_symbol_ticker(self, symbol):
+        return {'symbol': symbol, 'price': str(self.prices[symbol])}
+
+    def get_all_tickers(self):
+        return [{'symbol': s, 'price': str(p)} for s, p in self.prices.items()]
+
+    def get_symbol_info(self, symbol):
+        return {'filters': [{'filterType': 'LOT_SIZE', 'stepSize': '0.00010000'}]}
+
+    def get_account(self):
+        return {'balances': [{'asset': 'USDT', 'free': '1000000000'}]}
+
+def make_config(n: int, workers: int = 0):
+    from config import BotConfig
+    return BotConfig(
+        simulation_mode=True,
+        enable_news=False,
+        max_analysis_symbols=n,
+        analysis_top_k=n,
+        api_rate_limit=10 ** 9,
+        api_rate_window=1,
+        analysis_workers=workers
+    )
+
+def make_analyzer(client: FakeClient, config):
+    from analyzer import CryptoAnalyzer
+    from utils import DynamicRateLimiter
+    symbols = list(client.klines)
+    ticker_cache = SimpleNamespace(
+        symbols=symbols,
+        base_assets={s: s[:-len('USDT')] for s in symbols}
+    )
+    analyzer = CryptoAnalyzer(
+        binance_client=client,
+        reddit=None,
+        ticker_cache=ticker_cache,
+        config=config,
+        api_handler=SimpleNamespace(limiter=DynamicRateLimiter(config.api_rate_limit, config.api_rate_window))
+    )
+    # Zegar zatrzymany na końcu nagrania - serie z fixture nie są przeterminowane
+    end = max(k[-1][6] for k in client.klines.values()) / 1000
+    analyzer.clock = lambda: end
+    return analyzer
+
+def make_optimizer(client: FakeClient, analyzer, config):
+    from optimizer import PortfolioOptimizer
+    from risk_manager import RiskManager
+    optimizer = PortfolioOptimizer(client, analyzer, config)
+    optimizer.set_risk_manager(RiskManager(optimizer, analyzer, config))
+    return optimizer
+
+def legacy_parse_klines(klines: list) -> pd.DataFrame:
+    """Poprzednia implementacja: 12 kolumn object, apply(pd.to_numeric), to_datetime."""
+    df = pd.DataFrame(klines, columns=[
+        'timestamp', 'open', 'high', 'low', 'close', 'volume',
+        'close_time', 'quote_volume', 'count',
+        'taker_buy_base', 'taker_buy_quote', 'ignore'
+    ])
+    numeric_cols = ['open', 'high', 'low', 'close', 'volume']
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+# Każdy przypadek: setup(n) -> funkcja bez argumentów mierzona przez runner
+def case_parse_klines(n: int) -> Callable:
+    from analyzer import CryptoAnalyzer
+    analyzer = CryptoAnalyzer.__new__(CryptoAnalyzer)
+    payloads = list(symbol_klines(load_fixture(), n).values())
+    return lambda: [analyzer.parse_klines(k) for k in payloads]
+
+def case_parse_klines_legacy(n: int) -> Callable:
+    payloads = list(symbol_klines(load_fixture(), n).values())
+    return lambda: [legacy_parse_klines(k) for k in payloads]
+
+def case_calculate_indicators(n: int) -> Callable:
+    client = FakeClient(symbol_klines(load_fixture(), n))
+    analyzer = make_analyzer(client, make_config(n))
+    frames = [analyzer.parse_klines(k) for k in client.klines.values()]
+    return lambda: [analyzer.calculate_indicators(df) for df in frames]
+
+def case_analyze_market(n: int) -> Callable:
+    client = FakeClient(symbol_klines(load_fixture(), n))
+    config = make_config(n)
+
+    def run():
+        # Świeży analizator - bez stanu zmienności z poprzedniego powtórzenia
+        return asyncio.run(make_analyzer(client, config).analyze_market())
+    return run
+
+def case_analyze_market_warm(n: int) -> Callable:
+    """Kolejny cykl: świece już w pamięci, pobierane tylko najnowsze."""
+    client = FakeClient(symbol_klines(load_fixture(), n))
+    analyzer = make_analyzer(client, make_config(n))
+    asyncio.run(analyzer.analyze_market())
+    return lambda: asyncio.run(analyzer.analyze_market())
+
+def case_analyze_pool(workers: int) -> Callable:
+    """Cykl z wskaźnikami w ProcessPoolExecutor (świece przez pamięć współdzieloną)."""
+    def setup(n: int) -> Callable:
+        client = FakeClient(symbol_klines(load_fixture(), n))
+        analyzer = make_analyzer(client, make_config(n, workers))
+        # Start procesów i pierwsze pobranie świec poza pomiarem
+        asyncio.run(analyzer.analyze_market())
+        _pools.append(analyzer)
+        return lambda: asyncio.run(analyzer.analyze_market())
+    return setup
+
+_pools = []
+
+def case_analyze_batch(n: int) -> Optional[Callable]:
+    # Tylko model z lokalnej pamięci podręcznej - pomiar nie pobiera niczego z sieci.
+    # Ustawiane przed pierwszym importem transformers (huggingface_hub czyta je przy imporcie)
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+    try:
+        from sentiment import SentimentAnalyzer
+        analyzer = SentimentAnalyzer(make_config(n))
+    except Exception:
+        # Wymaga torch/transformers i modelu w lokalnej pamięci podręcznej
+        return None
+    texts = [f"{'BTC to the moon' if i % 3 else 'ETH dump incoming'} #{i}" for i in range(n)]
+    return lambda: analyzer._analyze_batch(texts)
+
+def case_orders(n: int) -> Callable:
+    client = FakeClient(symbol_klines(load_fixture(), n))
+    config = make_config(n)
+    analyzer = make_analyzer(client, config)
+    predictions = pd.DataFrame({
+        'symbol': list(client.klines),
+        'score': np.linspace(0.1, 1.0, n)
+    })
+
+    def run():
+        optimizer = make_optimizer(client, analyzer, config)
+        allocations = optimizer.calculate_allocation(predictions, budget=1000.0 * n)
+        return optimizer.generate_orders(allocations, check_risk=False)
+    return run
+
+def case_check_positions(n: int) -> Callable:
+    client = FakeClient(symbol_klines(load_fixture(), n))
+    config = make_config(n)
+    analyzer = make_analyzer(client, config)
+    risk_manager = make_optimizer(client, analyzer, config).risk_manager
+    for i, (symbol, klines) in enumerate(client.klines.items()):
+        analyzer.update_volatility(symbol, analyzer.parse_klines(klines))
+        entry = client.prices[symbol] * (0.9 + (i % 20) * 0.01)
+        risk_manager.update_position(symbol, 1.0, entry)
+    prices = dict(client.prices)
+    return lambda: risk_manager.check_positions(prices)
+
+def case_rate_limiter(n: int, threads: int = 8) -> Callable:
+    from utils import DynamicRateLimiter
+    # Jedno wait() na symbol, rozłożone na wątki
+    calls = max(1, n // threads)
+
+    def run():
+        limiter = DynamicRateLimiter(max_calls=10 ** 9, window_seconds=60)
+        workers = [
+            threading.Thread(target=lambda: [limiter.wait() for _ in range(calls)])
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return run
+
+def case_shared_limiter(n: int, threads: int = 8) -> Callable:
+    import tempfile
+    from shared_limiter import SharedRateLimiter
+    # Jak rate_limiter, ale przez plik mapowany w pamięć i blokadę pliku
+    calls = max(1, n // threads)
+    path = os.path.join(tempfile.mkdtemp(), 'rate_limit.bin')
+
+    def run():
+        limiter = SharedRateLimiter(path, max_weight=10 ** 9, window_seconds=60)
+        workers = [
+            threading.Thread(target=lambda: [limiter.wait() for _ in range(calls)])
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        limiter.close()
+    return run
+
+def case_order_book(n: int) -> Callable:
+    """Jedna różnica depth (po 5 poziomów na stronę) i szacunek wykonania na symbol."""
+    from order_book import OrderBook
+    rng = np.random.default_rng(7)
+    books = []
+    for i in range(n):
+        book = OrderBook(f"S{i}USDT", depth=100)
+        book.load_snapshot({
+            'lastUpdateId': 1,
+            'bids': [[100 - 0.01 * k, 1 + k % 5] for k in range(1, 101)],
+            'asks': [[100 + 0.01 * k, 1 + k % 5] for k in range(1, 101)]
+        })
+        books.append(book)
+    events = [
+        {
+            'U': 2, 'u': 2,
+            'b': [[round(100 - 0.01 * k, 2), float(q)] for k, q in zip(rng.integers(1, 120, 5), rng.integers(0, 4, 5))],
+            'a': [[round(100 + 0.01 * k, 2), float(q)] for k, q in zip(rng.integers(1, 120, 5), rng.integers(0, 4, 5))]
+        }
+        for _ in range(n)
+    ]
+
+    def run():
+        for book, event in zip(books, events):
+            book.last_update_id = 1
+            book.apply_diff(event)
+            book.estimate_fill('BUY', quote=2500.0)
+    return run
+
+def case_backtest(n: int) -> Optional[Callable]:
+    try:
+        from backtest import run_backtest
+    except ImportError:
+        return None
+    base = load_fixture()
+    # Skala = liczba świec / 10 (jeden symbol, 100/1000/10000 świec)
+    bars = n * 10
+    frame = pd.DataFrame(
+        [[float(v) for v in base[i % len(base)][1:6]] for i in range(bars)],
+        columns=['open', 'high', 'low', 'close', 'volume']
+    )
+    frame['timestamp'] = base[0][0] + np.arange(bars, dtype=np.int64) * 3_600_000
+    return lambda: run_backtest(frame.copy())
+
+def case_scoring(n: int) -> Callable:
+    import bench_scoring
+    analyzer = bench_scoring.make_analyzer(n)
+    rows = bench_scoring.make_rows(n)
+    reddit, news = bench_scoring.make_sentiment(n), bench_scoring.make_sentiment(n, seed=2)
+    return lambda: bench_scoring.columnar_pipeline(analyzer, [dict(r) for r in rows], reddit, news)
+
+CASES = {
+    'parse_klines': case_parse_klines,
+    'parse_klines_legacy': case_parse_klines_legacy,
+    'calculate_indicators': case_calculate_indicators,
+    'analyze_market': case_analyze_market,
+    'analyze_market_warm': case_analyze_market_warm,
+    'analyze_pool_1': case_analyze_pool(1),
+    'analyze_pool_2': case_analyze_pool(2),
+    'analyze_pool_4': case_analyze_pool(4),
+    'analyze_pool_8': case_analyze_pool(8),
+    'analyze_batch': case_analyze_batch,
+    'orders': case_orders,
+    'check_positions': case_check_positions,
+    'rate_limiter': case_rate_limiter,
+    'shared_limiter': case_shared_limiter,
+    'order_book': case_order_book,
+    'backtest': case_backtest,
+    'scoring': case_scoring,
+}
+
+def calibrate(repeat: int = 5) -> float:
+    """Stała praca referencyjna - normalizuje wyniki między maszynami i przebiegami."""
+    data = np.random.default_rng(0).random(200_000)
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sum(float(x) for x in data[:50_000])
+        np.sort(data)
+        samples.append(time.perf_counter() - start)
+    return min(samples)
+
+def measure(func: Callable, repeat: int, min_sample: float = 0.05) -> float:
+    """Mediana czasu jednego wywołania; krótkie przypadki powtarzane w pętli."""
+    start = time.perf_counter()
+    func()  # rozgrzewka
+    loops = max(1, int(min_sample / max(time.perf_counter() - start, 1e-6)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return statistics.median(samples)
+
+def run(cases=None, sizes=SIZES, repeat: int = 5) -> Dict:
+    import logging
+    logging.disable(logging.CRITICAL)
+    results = {}
+    for name in cases or CASES:
+        for n in sizes:
+            func = CASES[name](n)
+            key = f"{name}[{n}]"
+            if func is None:
+                results[key] = None
+                print(f"{key:28s} pominięty (brak zależności)")
+                continue
+            # Kalibracja tuż przed przypadkiem - obciążenie maszyny zmienia się w trakcie
+            calibration = calibrate()
+            seconds = measure(func, repeat)
+            results[key] = {'seconds': seconds, 'relative': seconds / calibration}
+            while _pools:
+                _pools.pop().close()
+            print(f"{key:28s} {seconds * 1000:10.2f} ms  ({seconds * 1e6 / n:8.1f} µs/symbol)")
+    logging.disable(logging.NOTSET)
+    return {
+        'python': platform.python_version(),
+        'results': results
+    }
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.5, min_delta: float = 0.0005) -> List[Dict]:
+    """
+    Regresja: czas względny (w jednostkach kalibracji) wzrósł o więcej niż
+    `tolerance`, a bezwzględnie o więcej niż `min_delta` sekund - mniejsze
+    różnice to szum pomiaru.
+    """
+    regressions = []
+    for key, result in current['results'].items():
+        reference = baseline['results'].get(key)
+        if result is None or reference is None:
+            continue
+        ratio = result['relative'] / reference['relative']
+        # Oczekiwany czas na bieżącej maszynie
+        expected = result['seconds'] / ratio
+        if ratio > 1 + tolerance and result['seconds'] - expected > min_delta:
+            regressions.append({'case': key, 'baseline': expected, 'current': result['seconds'], 'ratio': ratio})
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarki cyklu handlowego")
+    parser.add_argument("--case", action="append", choices=list(CASES), help="Wybrane przypadki")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--record-live", metavar="SYMBOL", nargs="?", const="BTCUSDT")
+    args = parser.parse_args(argv)
+
+    if args.record_live:
+        record_live(args.record_live)
+        return 0
+    if not os.path.exists(FIXTURE_PATH):
+        save_fixture(generate_fixture())
+
+    current = run(args.case, args.sizes, args.repeat)
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.setdefault('results', {}).update(current['results'])
+        baseline['python'] = current['python']
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Zapisano linię bazową: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Brak linii bazowej - uruchom z --update-baseline")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(current, json.load(f), args.tolerance)
+    for r in regressions:
+        print(f"REGRESJA {r['case']}: {r['baseline'] * 1000:.2f} ms -> {r['current'] * 1000:.2f} ms (x{r['ratio']:.2f})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
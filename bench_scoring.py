@@ -0,0 +1,84 @@
+# bench_scoring.py
+import time
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from analyzer import CryptoAnalyzer
+
+SIZES = (100, 500, 1000, 2000)
+
+def make_rows(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'symbol': f"C{i}USDT",
+            'price': float(rng.uniform(0.01, 100)),
+            'rsi': float(rng.uniform(0, 100)),
+            'macd': float(rng.normal(0, 1)),
+            'adx': float(rng.uniform(0, 60)),
+            'bb_percent': float(rng.uniform(0, 1))
+        }
+        for i in range(n)
+    ]
+
+def make_sentiment(n: int, seed: int = 1) -> dict:
+    rng = np.random.default_rng(seed)
+    return {f"C{i}": float(rng.uniform(-1, 1)) for i in range(0, n, 2)}
+
+def make_analyzer(n: int) -> CryptoAnalyzer:
+    analyzer = CryptoAnalyzer.__new__(CryptoAnalyzer)
+    analyzer.config = SimpleNamespace(news_weight=0.2, analysis_top_k=n, mtf_weight=0.1)
+    analyzer.ticker_cache = SimpleNamespace(base_assets={f"C{i}USDT": f"C{i}" for i in range(n)})
+    analyzer.logger = None
+    return analyzer
+
+def legacy_pipeline(analyzer, rows, reddit, news):
+    """Poprzednia implementacja: wynik per wiersz, pełne sortowanie, iterrows + maska."""
+    for row in rows:
+        row['score'] = analyzer.calculate_score(row)
+    df = pd.DataFrame(rows)
+    df = df.sort_values('score', ascending=False).reset_index(drop=True)
+    for _, row in df.iterrows():
+        coin = row['symbol'].replace('USDT', '')
+        df.loc[df['symbol'] == row['symbol'], 'reddit_sentiment'] = reddit.get(coin, 0)
+        df.loc[df['symbol'] == row['symbol'], 'news_sentiment'] = news.get(coin, 0)
+    df['score'] = df['score'] * 0.8 + (df['reddit_sentiment'] + df['news_sentiment']) * 0.2
+    return df
+
+def columnar_pipeline(analyzer, rows, reddit, news):
+    df = pd.DataFrame(rows)
+    df['score'] = analyzer.calculate_scores(df)
+    df = analyzer.apply_sentiment(df, reddit, news)
+    return analyzer.process_results(df)
+
+def measure(func, *args, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes=SIZES, include_legacy: bool = True) -> list:
+    results = []
+    for n in sizes:
+        analyzer = make_analyzer(n)
+        rows = make_rows(n)
+        reddit, news = make_sentiment(n), make_sentiment(n, seed=2)
+        columnar = measure(columnar_pipeline, analyzer, [dict(r) for r in rows], reddit, news)
+        legacy = measure(legacy_pipeline, analyzer, [dict(r) for r in rows], reddit, news, repeat=1) if include_legacy else None
+        results.append({
+            'symbols': n,
+            'columnar_ms': columnar * 1000,
+            'columnar_us_per_symbol': columnar * 1e6 / n,
+            'legacy_ms': legacy * 1000 if legacy is not None else None
+        })
+    return results
+
+if __name__ == "__main__":
+    for r in run():
+        legacy = f"{r['legacy_ms']:10.1f} ms" if r['legacy_ms'] is not None else "-"
+        print(
+            f"{r['symbols']:5d} symboli | kolumnowo {r['columnar_ms']:7.2f} ms "
+            f"({r['columnar_us_per_symbol']:.2f} µs/symbol) | poprzednio {legacy}"
+        )
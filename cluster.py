@@ -0,0 +1,369 @@
+# cluster.py
+import argparse
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import secrets
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Wiersz z kilkuset świecami mieści się z zapasem
+_STREAM_LIMIT = 2 ** 22
+_AUTH_TIMEOUT = 5.0
+
+def parse_address(address: str) -> Tuple[str, ...]:
+    """'host:port' -> ('tcp', host, port), 'unix:/ścieżka' -> ('unix', ścieżka)."""
+    if address.startswith('unix:'):
+        return ('unix', address[len('unix:'):])
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"Nieprawidłowy adres węzła: {address}")
+    return ('tcp', host, int(port))
+
+def is_local(address: str) -> bool:
+    """Gniazdo unixowe albo TCP na adresie pętli zwrotnej."""
+    kind, *target = parse_address(address)
+    if kind == 'unix' or target[0] == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(target[0]).is_loopback
+    except ValueError:
+        return False
+
+def _digest(secret: str, nonce: str) -> str:
+    return hmac.new(secret.encode(), nonce.encode(), hashlib.sha256).hexdigest()
+
+async def _open(address: str, timeout: float):
+    kind, *target = parse_address(address)
+    if kind == 'unix':
+        connect = asyncio.open_unix_connection(target[0], limit=_STREAM_LIMIT)
+    else:
+        connect = asyncio.open_connection(target[0], target[1], limit=_STREAM_LIMIT)
+    return await asyncio.wait_for(connect, timeout)
+
+async def _send(writer: asyncio.StreamWriter, message: Dict) -> None:
+    # Jedna wiadomość JSON na linię; typy numpy rzutowane na float
+    writer.write(json.dumps(message, default=float).encode() + b'\n')
+    await writer.drain()
+
+async def _receive(reader: asyncio.StreamReader) -> Optional[Dict]:
+    line = await reader.readline()
+    return json.loads(line) if line else None
+
+class AnalysisWorker:
+    """
+    Węzeł roboczy: analizuje przysłane symbole własnym CryptoAnalyzer i odsyła
+    wiersze (ze zamkniętymi świecami dla zmienności) zaraz po policzeniu.
+    Połączenie zaczyna się od wyzwania HMAC ze wspólnym sekretem; bez sekretu
+    węzeł nasłuchuje tylko lokalnie (pętla zwrotna albo gniazdo unixowe).
+    """
+
+    def __init__(self, analyzer, address: str, secret: str = ""):
+        self.analyzer = analyzer
+        self.address = address
+        self.secret = secret
+        self.stats = {'jobs': 0, 'rows': 0, 'errors': 0, 'rejected': 0}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        """Uruchamia serwer; zwraca faktyczny adres (port 0 -> przydzielony)."""
+        if not self.secret and not is_local(self.address):
+            raise ValueError(f"Węzeł na {self.address} wymaga sekretu klastra (CLUSTER_SECRET)")
+        kind, *target = parse_address(self.address)
+        if kind == 'unix':
+            self._server = await asyncio.start_unix_server(self._handle, target[0], limit=_STREAM_LIMIT)
+        else:
+            self._server = await asyncio.start_server(self._handle, target[0], target[1], limit=_STREAM_LIMIT)
+            host, port = self._server.sockets[0].getsockname()[:2]
+            self.address = f"{host}:{port}"
+        logger.info("Węzeł analizy nasłuchuje na %s", self.address)
+        return self.address
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            if not await self._authenticate(reader, writer):
+                return
+            while (message := await _receive(reader)) is not None:
+                if message.get('op') == 'ping':
+                    await _send(writer, {'op': 'pong'})
+                elif message.get('op') == 'analyze':
+                    await self._run_job(writer, message['job'], message['symbols'])
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _authenticate(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        nonce = secrets.token_hex(16)
+        await _send(writer, {'op': 'hello', 'nonce': nonce})
+        try:
+            message = await asyncio.wait_for(_receive(reader), _AUTH_TIMEOUT)
+        except (asyncio.TimeoutError, ValueError):
+            message = None
+        if not message or message.get('op') != 'auth' or \
+                not hmac.compare_digest(str(message.get('mac', '')), _digest(self.secret, nonce)):
+            self.stats['rejected'] += 1
+            logger.warning("Odrzucono połączenie bez poprawnego uwierzytelnienia: %s", writer.get_extra_info('peername'))
+            return False
+        await _send(writer, {'op': 'ok'})
+        return True
+
+    async def _run_job(self, writer: asyncio.StreamWriter, job: int, symbols: List[str]) -> None:
+        self.stats['jobs'] += 1
+        for symbol in symbols:
+            try:
+                row = await asyncio.to_thread(self.analyze, symbol)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error("Błąd analizy %s: %s", symbol, e)
+                row = None
+            # Pusty wiersz też jest wysyłany - koordynator wie, że symbol jest załatwiony
+            await _send(writer, {'op': 'row', 'job': job, 'symbol': symbol, 'row': row})
+            if row:
+                self.stats['rows'] += 1
+        await _send(writer, {'op': 'done', 'job': job})
+
+    def analyze(self, symbol: str) -> Optional[Dict]:
+        row = self.analyzer.analyze_symbol(symbol)
+        if not row:
+            return None
+        candles = self.analyzer.closed_candles(symbol)
+        if candles is not None:
+            row['candles'] = candles
+        return row
+
+class _Node:
+    def __init__(self, address: str):
+        self.address = address
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.stats = {'shards': 0, 'rows': 0, 'timeouts': 0, 'failures': 0, 'last_shard_seconds': None}
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    def drop(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+class _Job:
+    """Stan jednego wywołania analyze: kolejka shardów i zebrane odpowiedzi."""
+
+    def __init__(self, symbols: List[str], shard_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        for i in range(0, len(symbols), shard_size):
+            self.queue.put_nowait((symbols[i:i + shard_size], 1))
+        self.pending = self.queue.qsize()
+        self.answered: Dict[str, Optional[Dict]] = {}
+        self.abandoned = set()
+        self.live = 0
+        if not self.pending:
+            self.queue.put_nowait(None)
+
+    def finish(self) -> None:
+        self.pending -= 1
+        if not self.pending:
+            self._release()
+
+    def leave(self) -> None:
+        self.live -= 1
+        if not self.live:
+            self._release()
+
+    def _release(self) -> None:
+        # Każdy czekający węzeł dostaje znacznik końca
+        for _ in range(max(self.live, 1)):
+            self.queue.put_nowait(None)
+
+class AnalysisCoordinator:
+    """
+    Dzieli symbole na małe shardy pobierane przez węzły w miarę ich wolnych mocy
+    (szybszy węzeł bierze więcej). Shard węzła, który przekroczył `shard_timeout`
+    lub zerwał połączenie, wraca do kolejki z symbolami bez odpowiedzi.
+    """
+
+    def __init__(
+        self,
+        addresses: Sequence[str],
+        shard_size: int = 25,
+        shard_timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_attempts: int = 3,
+        secret: str = ""
+    ):
+        self.nodes = [_Node(address) for address in addresses]
+        self.secret = secret
+        self.shard_size = max(1, shard_size)
+        self.shard_timeout = shard_timeout
+        self.connect_timeout = connect_timeout
+        self.max_attempts = max_attempts
+        self._job = 0
+
+    @property
+    def stats(self) -> Dict[str, Dict]:
+        return {node.address: dict(node.stats, connected=node.connected) for node in self.nodes}
+
+    async def _connect(self, node: _Node) -> bool:
+        if node.connected:
+            return True
+        try:
+            node.reader, node.writer = await _open(node.address, self.connect_timeout)
+            await self._handshake(node)
+            return True
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            node.stats['failures'] += 1
+            logger.warning("Węzeł %s niedostępny: %s", node.address, e)
+            node.drop()
+            return False
+
+    async def _handshake(self, node: _Node) -> None:
+        hello = await asyncio.wait_for(_receive(node.reader), self.connect_timeout)
+        if not hello or hello.get('op') != 'hello':
+            raise ConnectionRefusedError("brak powitania węzła")
+        await _send(node.writer, {'op': 'auth', 'mac': _digest(self.secret, hello['nonce'])})
+        reply = await asyncio.wait_for(_receive(node.reader), self.connect_timeout)
+        if not reply or reply.get('op') != 'ok':
+            raise ConnectionRefusedError("węzeł odrzucił uwierzytelnienie")
+
+    async def analyze(self, symbols: Sequence[str]) -> Tuple[List[Dict], List[str]]:
+        """
+        Zwraca (wiersze w kolejności `symbols`, symbole bez odpowiedzi żadnego węzła).
+        Pozostałe symbole wywołujący może policzyć lokalnie.
+        """
+        symbols = list(symbols)
+        state = _Job(symbols, self.shard_size)
+        connected = await asyncio.gather(*(self._connect(node) for node in self.nodes))
+        live = [node for node, ok in zip(self.nodes, connected) if ok]
+        state.live = len(live)
+        if live:
+            await asyncio.gather(*(self._drive(node, state) for node in live))
+
+        # Shardy, których nie miał już kto podjąć
+        while not state.queue.empty():
+            item = state.queue.get_nowait()
+            if item is not None:
+                state.abandoned.update(s for s in item[0] if s not in state.answered)
+        rows = [state.answered[s] for s in symbols if state.answered.get(s)]
+        leftover = [s for s in symbols if s in state.abandoned]
+        if leftover:
+            logger.warning("Koordynator: %d symboli bez odpowiedzi węzłów", len(leftover))
+        return rows, leftover
+
+    async def _drive(self, node: _Node, state: '_Job') -> None:
+        # Wolny węzeł czeka też na shardy zwrócone przez inne węzły
+        while (item := await state.queue.get()) is not None:
+            shard, attempt = item
+            self._job += 1
+            job = self._job
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self._run_shard(node, job, shard, state.answered), self.shard_timeout)
+                node.stats['shards'] += 1
+                node.stats['last_shard_seconds'] = time.monotonic() - started
+                state.finish()
+                continue
+            except asyncio.TimeoutError:
+                node.stats['timeouts'] += 1
+                logger.warning("Węzeł %s nie zdążył z shardem (%d symboli)", node.address, len(shard))
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                node.stats['failures'] += 1
+                logger.warning("Węzeł %s utracony: %s", node.address, e)
+            # Połączenie ma niedokończone zadanie - zamykane, węzeł wraca w kolejnym cyklu
+            node.drop()
+            remaining = [s for s in shard if s not in state.answered]
+            if remaining and attempt < self.max_attempts:
+                state.queue.put_nowait((remaining, attempt + 1))
+            else:
+                state.abandoned.update(remaining)
+                state.finish()
+            state.leave()
+            return
+
+    async def _run_shard(self, node: _Node, job: int, shard: List[str], answered: Dict) -> None:
+        await _send(node.writer, {'op': 'analyze', 'job': job, 'symbols': shard})
+        while True:
+            message = await _receive(node.reader)
+            if message is None:
+                raise ConnectionResetError("połączenie zamknięte przez węzeł")
+            if message.get('job') != job:
+                continue
+            if message['op'] == 'done':
+                return
+            if message['op'] == 'row':
+                answered[message['symbol']] = message['row']
+                if message['row']:
+                    node.stats['rows'] += 1
+
+    async def ping(self) -> Dict[str, Optional[float]]:
+        """Czas odpowiedzi każdego węzła (None - niedostępny); nie używać w trakcie analyze."""
+        async def one(node: _Node) -> Optional[float]:
+            if not await self._connect(node):
+                return None
+            started = time.monotonic()
+            try:
+                await _send(node.writer, {'op': 'ping'})
+                await asyncio.wait_for(_receive(node.reader), self.connect_timeout)
+                return time.monotonic() - started
+            except (OSError, asyncio.TimeoutError, ValueError):
+                node.drop()
+                return None
+        results = await asyncio.gather(*(one(node) for node in self.nodes))
+        return dict(zip((node.address for node in self.nodes), results))
+
+    def close(self) -> None:
+        for node in self.nodes:
+            node.drop()
+
+async def run_worker(address: str) -> None:
+    from config import load_config
+    from exchange import BinanceAPIHandler, TickerCache
+    from analyzer import CryptoAnalyzer
+
+    # Sentyment liczy koordynator - węzeł nie ładuje modelu
+    config = load_config().copy(update={'enable_news': False, 'cluster_workers': [], 'analysis_workers': 0})
+    api_handler = await asyncio.to_thread(BinanceAPIHandler, config, False)
+    analyzer = CryptoAnalyzer(
+        binance_client=api_handler.client,
+        reddit=None,
+        ticker_cache=TickerCache(api_handler),
+        config=config,
+        api_handler=api_handler
+    )
+    worker = AnalysisWorker(analyzer, address, secret=config.cluster_secret)
+    await worker.start()
+    try:
+        await worker.serve_forever()
+    finally:
+        await worker.close()
+
+def main() -> None:
+    from dotenv import load_dotenv
+    from logging_setup import setup_logging
+    parser = argparse.ArgumentParser(description="Węzeł roboczy analizy rynku")
+    parser.add_argument('--listen', default='127.0.0.1:7601', help="host:port lub unix:/ścieżka")
+    parser.add_argument('--log-config', default='logging_config.ini')
+    args = parser.parse_args()
+    setup_logging(args.log_config)
+    load_dotenv()
+    asyncio.run(run_worker(args.listen))
+
+if __name__ == "__main__":
+    main()
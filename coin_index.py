@@ -0,0 +1,135 @@
+# coin_index.py
+import logging
+import math
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AhoCorasick:
+    """Automat Aho-Corasick - wszystkie wzorce wyszukiwane w jednym przebiegu tekstu."""
+
+    def __init__(self, patterns: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[str, str]]] = [[]]
+        for pattern, value in patterns.items():
+            self._add(pattern, value)
+        self._build()
+
+    def _add(self, pattern: str, value: str) -> None:
+        node = 0
+        for char in pattern:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append((pattern, value))
+
+    def _build(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self.goto[node].items():
+                queue.append(nxt)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                self.output[nxt].extend(self.output[self.fail[nxt]])
+
+    def iter(self, text: str):
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for pattern, value in self.output[node]:
+                yield end - len(pattern) + 1, end + 1, value
+
+class CoinMentionExtractor:
+    """
+    Wykrywa wzmianki o monetach: tickery (wielkie litery, np. BTC lub $BTC)
+    oraz nazwy (bez rozróżniania wielkości liter), z kontrolą granic słów.
+    """
+
+    def __init__(self, base_assets: Iterable[str], aliases: Optional[Dict[str, List[str]]] = None):
+        assets = {a.upper() for a in base_assets}
+        self.assets = assets
+        self._tickers = AhoCorasick({a: a for a in assets if len(a) >= 2})
+        names = {}
+        for asset, asset_aliases in (aliases or {}).items():
+            if asset.upper() in assets:
+                for alias in asset_aliases:
+                    names[alias.lower()] = asset.upper()
+        self._names = AhoCorasick(names)
+
+    @staticmethod
+    def _bounded(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not before.isalnum() and not after.isalnum()
+
+    def extract(self, text: str) -> Set[str]:
+        coins = set()
+        for start, end, coin in self._tickers.iter(text):
+            if self._bounded(text, start, end):
+                coins.add(coin)
+        lowered = text.lower()
+        for start, end, coin in self._names.iter(lowered):
+            if self._bounded(lowered, start, end):
+                coins.add(coin)
+        return coins
+
+class CoinSentimentIndex:
+    """Kroczący, wygaszany w czasie agregat sentymentu per (moneta, źródło)."""
+
+    def __init__(self, half_life: float = 21600, prior_weight: float = 1.0):
+        self.decay = math.log(2) / half_life
+        self.prior_weight = prior_weight
+        # (moneta, źródło) -> [suma ważona, waga, czas ostatniej aktualizacji]
+        self._state: Dict[Tuple[str, str], List[float]] = {}
+
+    def add(self, coin: str, source: str, score: float, timestamp: Optional[float] = None) -> None:
+        timestamp = time.time() if timestamp is None else timestamp
+        # Ocena modelu [0, 1] przesunięta na [-1, 1]; 0 oznacza neutralny
+        value = (score - 0.5) * 2
+        state = self._state.get((coin, source))
+        if state is None:
+            self._state[(coin, source)] = [value, 1.0, timestamp]
+            return
+        if timestamp < state[2]:
+            # Wpis spóźniony: wygaszany do czasu agregatu, agregat bez zmian
+            weight = math.exp(-self.decay * (state[2] - timestamp))
+            state[0] += value * weight
+            state[1] += weight
+            return
+        factor = math.exp(-self.decay * (timestamp - state[2]))
+        state[0] = state[0] * factor + value
+        state[1] = state[1] * factor + 1.0
+        state[2] = timestamp
+
+    def score(self, coin: str, source: str, now: Optional[float] = None) -> float:
+        state = self._state.get((coin, source))
+        if state is None:
+            return 0.0
+        now = time.time() if now is None else now
+        factor = math.exp(-self.decay * max(0.0, now - state[2]))
+        return state[0] * factor / (state[1] * factor + self.prior_weight)
+
+    def snapshot(self, source: str, now: Optional[float] = None) -> Dict[str, float]:
+        now = time.time() if now is None else now
+        return {
+            coin: self.score(coin, src, now)
+            for coin, src in self._state
+            if src == source
+        }
+
+    def mentions(self, coin: str, source: str) -> float:
+        state = self._state.get((coin, source))
+        return state[1] if state else 0.0
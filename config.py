@@ -1,5 +1,6 @@
 # config.py
 import os
+from typing import Dict, List
 from pydantic import BaseModel, validator, Field
 from dotenv import load_dotenv
 
@@ -12,16 +13,112 @@ class BotConfig(BaseModel):
     reddit_client_secret: str = ""
     telegram_token: str = ""
     telegram_chat_id: str = ""
+    telegram_batch_window: float = 2.0
+    telegram_batch_max: int = 20
+    telegram_queue_size: int = 500
+    telegram_chat_rate: float = 1.0
+    telegram_global_rate: float = 30.0
+    telegram_max_retries: int = 5
+    telegram_flush_timeout: float = 5.0
     comment_limit: int = 100
     analysis_interval: int = 3600
+    max_analysis_symbols: int = 100
+    screen_enabled: bool = True
+    screen_min_quote_volume: float = 1_000_000.0
+    screen_max_spread: float = 0.002
+    screen_min_abs_change: float = 0.0
+    screen_max_abs_change: float = 30.0
+    analysis_top_k: int = 100
+    analysis_batch_size: int = 20
+    pipeline_queue_size: int = 2
+    candle_close_delay: float = 2.0
+    base_interval: str = "1h"
+    confirmation_intervals: List[str] = ["4h", "1d"]
+    candle_history: int = 1000
+    analysis_lookback: int = 100
+    mtf_weight: float = 0.1
+    analysis_workers: int = 0
+    analysis_start_method: str = "spawn"
+    cluster_workers: List[str] = []
+    cluster_shard_size: int = 25
+    cluster_shard_timeout: float = 30.0
+    cluster_connect_timeout: float = 5.0
     max_trade_usd: float = 5000.0
+    ws_heartbeat_interval: float = 5.0
+    ws_stall_timeout: float = 30.0
+    ws_stream_stall_timeout: float = 0.0
+    ws_backoff: float = 1.0
+    ws_max_backoff: float = 60.0
+    order_book_enabled: bool = False
+    order_book_depth: int = 100
+    order_book_max_symbols: int = 100
+    order_book_buffer: int = 1000
+    max_slippage: float = 0.01
     risk_tolerance: float = 0.15
     enable_news: bool = True
     api_rate_limit: int = 10
     api_rate_window: int = 5
+    # Wspólny budżet wagi REST dla procesów na hoście (pusty = limiter lokalny)
+    rate_limit_path: str = ""
+    rate_limit_weight: int = 1200
+    rate_limit_window: int = 60
     cryptopanic_api_key: str = ""
     reddit_timeout: int = 30
+    http_limit: int = 100
+    http_limit_per_host: int = 10
+    http_keepalive: float = 30.0
+    http_timeout: float = 15.0
+    http_retries: int = 3
+    http_backoff: float = 0.5
     news_weight: float = 0.2
+    sentiment_subreddits: List[str] = ["CryptoCurrency", "Bitcoin"]
+    sentiment_batch_size: int = 16
+    sentiment_queue_size: int = 64
+    news_history: int = 50
+    sentiment_half_life: int = 21600
+    sentiment_prior_weight: float = 1.0
+    coin_aliases: Dict[str, List[str]] = {
+        "BTC": ["bitcoin"],
+        "ETH": ["ethereum", "ether"],
+        "BNB": ["binance coin"],
+        "SOL": ["solana"],
+        "XRP": ["ripple"],
+        "ADA": ["cardano"],
+        "DOGE": ["dogecoin"],
+        "DOT": ["polkadot"],
+        "AVAX": ["avalanche"],
+        "LINK": ["chainlink"],
+        "LTC": ["litecoin"],
+        "TRX": ["tron"],
+        "SHIB": ["shiba inu"],
+    }
+    volatility_ewma_lambda: float = 0.94
+    volatility_atr_period: int = 14
+    volatility_ttl: int = 7200
+    default_volatility: float = 0.02
+    volatility_history: int = 100
+    max_drawdown: float = 0.2
+    stop_loss_multiplier: float = 2.0
+    take_profit_multiplier: float = 3.5
+    var_confidence: float = 0.95
+    max_var_ratio: float = 0.1
+    state_journal_path: str = "state.db"
+    journal_snapshot_every: int = 500
+    # Wyniki analizy każdego cyklu (pusty = bez zapisu)
+    snapshot_dir: str = "snapshots"
+    snapshot_retention_days: int = 30
+    gui_log_lines: int = 5000
+    gui_refresh_ms: int = 250
+    metrics_enabled: bool = False
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0
+    metrics_span_history: int = 200
+    account_name: str = "main"
+    api_key_env: str = ""
+    api_secret_env: str = ""
+    accounts_path: str = ""
+    market_price_ttl: float = 2.0
+    market_info_ttl: float = 3600.0
 
     @validator('telegram_chat_id')
     def validate_chat_id(cls, v):
@@ -37,12 +134,21 @@ class BotConfig(BaseModel):
 
     @property
     def binance_api_key(self):
+        if self.api_key_env:
+            return os.getenv(self.api_key_env)
         return os.getenv("TESTNET_API_KEY") if self.mode == "test" else os.getenv("BINANCE_API_KEY")
 
     @property
     def binance_api_secret(self):
+        if self.api_secret_env:
+            return os.getenv(self.api_secret_env)
         return os.getenv("TESTNET_API_SECRET") if self.mode == "test" else os.getenv("BINANCE_API_SECRET")
 
+    @property
+    def cluster_secret(self) -> str:
+        # Wspólny sekret koordynatora i węzłów analizy (cluster.py)
+        return os.getenv("CLUSTER_SECRET", "")
+
 def load_config() -> BotConfig:
     """Zwraca instancję konfiguracji z domyślnymi wartościami."""
     return BotConfig()
\ No newline at end of file
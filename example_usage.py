@@ -9,17 +9,16 @@ async def main():
     config = load_config()
     
     # Inicjalizacja klienta Binance
-    client = Client(
-        api_key=config.binance_api_key,
-        api_secret=config.binance_api_secret,
-        testnet=config.simulation_mode
-    )
+    api_handler = BinanceAPIHandler(config)
+    client = api_handler.client
     
     # Inicjalizacja komponentów
-    ticker_cache = TickerCache(client)
-    analyzer = CryptoAnalyzer(client, None, ticker_cache, config, None, None)
+    ticker_cache = TickerCache(api_handler)
+    ticker_cache.refresh_symbols()
+    analyzer = CryptoAnalyzer(client, None, ticker_cache, config, api_handler)
     optimizer = PortfolioOptimizer(client, analyzer, config)
-    risk_manager = RiskManager(optimizer)
+    risk_manager = RiskManager(optimizer, analyzer, config)
+    optimizer.set_risk_manager(risk_manager)
     
     # Cykl handlowy
     while True:
@@ -30,4 +29,4 @@ async def main():
         await asyncio.sleep(config.analysis_interval)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
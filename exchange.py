@@ -3,12 +3,14 @@ import logging
 import time
 from binance.client import Client
 from cachetools import TTLCache
-from utils import error_handler, DynamicRateLimiter
+from utils import error_handler
+from shared_limiter import EXCHANGE_INFO_WEIGHT, create_rate_limiter, observe_session, throttle
+from metrics import metrics, timed
 
 logger = logging.getLogger(__name__)
 
 class BinanceAPIHandler:
-    def __init__(self, config):
+    def __init__(self, config, synchronize: bool = True):
         self.client = Client(
             api_key=config.binance_api_key,
             api_secret=config.binance_api_secret,
@@ -16,12 +18,12 @@ class BinanceAPIHandler:
         )
         self.ticker_cache = TTLCache(maxsize=100, ttl=60)
         self.account_cache = TTLCache(maxsize=1, ttl=60)
-        self.limiter = DynamicRateLimiter(
-            max_calls=config.api_rate_limit,
-            window_seconds=config.api_rate_window
-        )
+        self.limiter = create_rate_limiter(config)
         self.time_offset = 0
-        self._synchronize_time()
+        metrics.instrument_session(self.client.session)
+        observe_session(self.limiter, self.client.session)
+        if synchronize:
+            self._synchronize_time()
 
     def _synchronize_time(self):
         try:
@@ -33,20 +35,27 @@ class BinanceAPIHandler:
 
     @error_handler
     def get_symbol_price(self, symbol: str) -> float:
-        if symbol not in self.ticker_cache:
+        if symbol in self.ticker_cache:
+            metrics.inc('cache_hits_total', cache='ticker')
+        else:
+            metrics.inc('cache_misses_total', cache='ticker')
             ticker = self.client.get_symbol_ticker(symbol=symbol)
             self.ticker_cache[symbol] = float(ticker['price'])
         return self.ticker_cache[symbol]
 
     @error_handler
     def get_account_balance(self) -> dict:
-        if 'account' not in self.account_cache:
+        if 'account' in self.account_cache:
+            metrics.inc('cache_hits_total', cache='account')
+        else:
+            metrics.inc('cache_misses_total', cache='account')
             self.account_cache['account'] = self.client.get_account()
         return self.account_cache['account']
 
     @error_handler
+    @timed('create_order')
     def create_order(self, symbol: str, side: str, quantity: float, price: float):
-        self.limiter.wait()
+        self.limiter.wait(priority='order')
         timestamp = int(time.time() * 1000) + self.time_offset
         return self.client.create_order(
             symbol=symbol,
@@ -62,15 +71,22 @@ class TickerCache:
     def __init__(self, handler: BinanceAPIHandler):
         self.handler = handler
         self.symbols = []
+        self.base_assets = {}
         self.last_update = 0
 
     @error_handler
     def refresh_symbols(self):
         if time.time() - self.last_update > 3600:
+            throttle(self.handler.limiter, EXCHANGE_INFO_WEIGHT, 'bulk')
             exchange_info = self.handler.client.get_exchange_info()
-            self.symbols = [
-                s['symbol'] for s in exchange_info['symbols']
+            trading = [
+                s for s in exchange_info['symbols']
                 if s['status'] == 'TRADING' and s['symbol'].endswith('USDT')
             ]
+            self.symbols = [s['symbol'] for s in trading]
+            self.base_assets = {
+                s['symbol']: s.get('baseAsset') or s['symbol'][:-len('USDT')]
+                for s in trading
+            }
             self.last_update = time.time()
             logger.info("Zaktualizowano listę symboli")
\ No newline at end of file
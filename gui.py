@@ -9,30 +9,38 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QLabel,
     QPushButton,
-    QTextEdit,
     QHBoxLayout,
-    QScrollArea,
-    QFrame
+    QFrame,
+    QTableView,
+    QHeaderView,
+    QLineEdit,
+    QAbstractItemView
 )
 from PySide6.QtCore import Qt, Slot, QTimer, QSize
 from PySide6.QtGui import QFont
 from qasync import QEventLoop, asyncSlot
 from websocket_handler import BinanceWebSocketManager
+from scheduler import AnalysisScheduler
+from gui_models import LogView, MarketTableModel, market_proxy
+from market_table import MarketTable
+from snapshot_store import SnapshotStore, format_top
 
 class TradingGUI(QMainWindow):
-    def __init__(self, optimizer, analyzer):
+    def __init__(self, optimizer, analyzer, snapshots=None):
         super().__init__()
         self.optimizer = optimizer
         self.analyzer = analyzer
+        self.snapshots = snapshots
         self.running = False
         self.dark_mode = True
-        self.price_labels = {}
         self.ws_manager = None
+        self.scheduler = None
         
         self.init_ui()
         self.init_websocket()
         
         QTimer.singleShot(100, lambda: self.schedule_async(self.update_portfolio()))
+        QTimer.singleShot(100, self.refresh_market)
 
     def init_ui(self):
         self.setWindowTitle("Crypto Trading Bot Pro")
@@ -60,18 +68,28 @@ class TradingGUI(QMainWindow):
         status_layout.addStretch()
         status_layout.addWidget(self.balance_label)
         
-        # Panel cen
-        price_scroll = QScrollArea()
-        price_widget = QWidget()
-        self.price_layout = QHBoxLayout()
-        price_widget.setLayout(self.price_layout)
-        price_scroll.setWidget(price_widget)
-        price_scroll.setWidgetResizable(True)
-        price_scroll.setFixedHeight(80)
+        # Tabela rynku - model/widok, rysowane tylko widoczne wiersze
+        config = self.analyzer.config
+        self.market_model = MarketTableModel(config.gui_refresh_ms, self)
+        self.market_proxy = market_proxy(self.market_model, self)
+        self.market_filter = QLineEdit()
+        self.market_filter.setPlaceholderText("Filtruj symbole...")
+        self.market_filter.textChanged.connect(self.market_proxy.setFilterFixedString)
+        self.market_view = QTableView()
+        self.market_view.setModel(self.market_proxy)
+        self.market_view.setSortingEnabled(True)
+        self.market_view.sortByColumn(MarketTable.COLUMNS.index('score'), Qt.DescendingOrder)
+        self.market_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.market_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.market_view.setAlternatingRowColors(True)
+        # Stała wysokość wierszy - widok nie mierzy wszystkich wierszy
+        self.market_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.market_view.verticalHeader().setDefaultSectionSize(22)
+        self.market_view.verticalHeader().hide()
+        self.market_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
 
-        # Konsola logów
-        self.log_console = QTextEdit()
-        self.log_console.setReadOnly(True)
+        # Konsola logów z limitem linii
+        self.log_console = LogView(config.gui_log_lines, config.gui_refresh_ms, self)
         self.log_console.setFont(QFont("Consolas", 10))
 
         # Panel sterowania
@@ -95,27 +113,28 @@ class TradingGUI(QMainWindow):
 
         # Składanie layoutu
         main_layout.addWidget(self.status_bar)
-        main_layout.addWidget(price_scroll)
-        main_layout.addWidget(self.log_console)
+        main_layout.addWidget(self.market_filter)
+        main_layout.addWidget(self.market_view, 3)
+        main_layout.addWidget(self.log_console, 2)
         main_layout.addWidget(control_frame)
         
         self.apply_theme()
 
     def init_websocket(self):
-        self.ws_manager = BinanceWebSocketManager(self.optimizer.client)
+        self.ws_manager = BinanceWebSocketManager(
+            self.optimizer.client,
+            self.analyzer.config,
+            limiter=self.optimizer.limiter,
+            time_offset=lambda: self.analyzer.api_handler.time_offset
+        )
         self.ws_manager.price_updated.connect(self.update_price_display)
+        self.ws_manager.candle_updated.connect(self.analyzer.on_candles)
         self.ws_manager.error_occurred.connect(lambda e: self.log(f"Błąd WS: {e}", error=True))
         
         # Rozpocznij WS dla głównych symboli
         symbols = self.analyzer.ticker_cache.valid_symbols[:10]
         self.schedule_async(self.ws_manager.start_symbol_ticker(symbols))
-        
-        # Dodaj etykiety cen
-        for symbol in symbols:
-            label = QLabel(f"{symbol}: ---")
-            label.setObjectName(f"price_{symbol}")
-            self.price_layout.addWidget(label)
-            self.price_labels[symbol] = label
+        self.schedule_async(self.ws_manager.start_kline_stream(symbols, self.analyzer.config.base_interval))
 
     @asyncSlot()
     async def start_trading(self):
@@ -124,22 +143,14 @@ class TradingGUI(QMainWindow):
         self.log("Rozpoczęto sesję handlową")
         
         try:
-            while self.running:
-                try:
-                    market_data = await self.analyzer.analyze_market()
-                    
-                    allocations = self.optimizer.calculate_allocation(market_data)
-                    orders = self.optimizer.generate_orders(allocations)
-                    
-                    self.log(f"Wygenerowano {len(orders)} zleceń")
-                    self.optimizer.execute_orders(orders)
-                    
-                    await self.update_portfolio()
-                    await asyncio.sleep(self.config.analysis_interval)
-                
-                except Exception as e:
-                    self.log(f"Błąd iteracji: {str(e)}", error=True)
-                    await asyncio.sleep(10)
+            self.scheduler = AnalysisScheduler(
+                self.analyzer,
+                self.optimizer,
+                self.analyzer.config,
+                reporter=self.on_cycle_report,
+                snapshots=self.snapshots
+            )
+            await self.scheduler.run()
         
         except Exception as e:
             self.log(f"Krytyczny błąd: {str(e)}", error=True)
@@ -147,9 +158,31 @@ class TradingGUI(QMainWindow):
         finally:
             self.stop_trading()
 
+    async def on_cycle_report(self, report: dict):
+        if 'error' in report:
+            self.log(f"Błąd iteracji: {report['error']}", error=True)
+            return
+        self.log(f"Wygenerowano {len(report['orders'])} zleceń ({report['duration']:.1f}s)")
+        if report['overrun']:
+            self.log(f"Cykl przekroczył interwał, pominięte cykle: {report['skipped']}", error=True)
+        self.refresh_market()
+        await self.update_portfolio()
+
+    def refresh_market(self):
+        # Stan rynku z zapisanych migawek - bez ponownej analizy (także po restarcie GUI)
+        if self.snapshots is None:
+            return
+        latest = self.snapshots.latest()
+        if latest.empty:
+            return
+        self.market_model.load_snapshot(latest)
+        self.log(f"Najlepsze ({len(latest)} symboli): {format_top(latest, 5)}")
+
     @Slot()
     def stop_trading(self):
         self.running = False
+        if self.scheduler:
+            self.scheduler.stop()
         self.toggle_controls(True)
         self.log("Zatrzymano sesję handlową")
 
@@ -175,17 +208,11 @@ class TradingGUI(QMainWindow):
 
     @Slot(dict)
     def update_price_display(self, prices: dict):
-        for symbol, price in prices.items():
-            if symbol in self.price_labels:
-                self.price_labels[symbol].setText(f"{symbol}: {price:.8f}")
+        self.market_model.update_prices(prices)
 
     def log(self, message: str, error: bool = False):
         timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {'⚠️' if error else '✅'} {message}"
-        self.log_console.append(log_entry)
-        self.log_console.verticalScrollBar().setValue(
-            self.log_console.verticalScrollBar().maximum()
-        )
+        self.log_console.append_line(f"[{timestamp}] {'⚠️' if error else '✅'} {message}")
 
     def toggle_theme(self):
         self.dark_mode = not self.dark_mode
@@ -199,8 +226,9 @@ class TradingGUI(QMainWindow):
                     color: #FFFFFF;
                     border: none;
                 }
-                QTextEdit {
+                QPlainTextEdit, QTableView {
                     background-color: #1E1E1E;
+                    alternate-background-color: #262626;
                 }
                 QPushButton {
                     background-color: #3A3A3A;
@@ -211,7 +239,7 @@ class TradingGUI(QMainWindow):
                 QPushButton:hover {
                     background-color: #4A4A4A;
                 }
-                QScrollArea {
+                QTableView, QLineEdit {
                     border: 1px solid #4A4A4A;
                 }
             """)
@@ -222,8 +250,9 @@ class TradingGUI(QMainWindow):
                     color: #000000;
                     border: none;
                 }
-                QTextEdit {
+                QPlainTextEdit, QTableView {
                     background-color: #F0F0F0;
+                    alternate-background-color: #E8E8E8;
                 }
                 QPushButton {
                     background-color: #E0E0E0;
@@ -234,7 +263,7 @@ class TradingGUI(QMainWindow):
                 QPushButton:hover {
                     background-color: #D0D0D0;
                 }
-                QScrollArea {
+                QTableView, QLineEdit {
                     border: 1px solid #CCCCCC;
                 }
             """)
@@ -247,7 +276,7 @@ class TradingGUI(QMainWindow):
             self.schedule_async(self.ws_manager.close())
         event.accept()
 
-def run_gui(optimizer, analyzer):
+def run_gui(optimizer, analyzer, snapshots=None):
     try:
         app = QApplication(sys.argv)
         app.setStyle("Fusion")
@@ -255,7 +284,7 @@ def run_gui(optimizer, analyzer):
         loop = QEventLoop(app)
         asyncio.set_event_loop(loop)
         
-        window = TradingGUI(optimizer, analyzer)
+        window = TradingGUI(optimizer, analyzer, snapshots)
         window.show()
         
         with loop:
@@ -277,5 +306,6 @@ if __name__ == "__main__":
     ticker_cache = TickerCache(client)
     analyzer = CryptoAnalyzer(client, None, ticker_cache, config, None, None)
     optimizer = PortfolioOptimizer(client, analyzer, config)
+    snapshots = SnapshotStore(config.snapshot_dir) if config.snapshot_dir else None
     
-    run_gui(optimizer, analyzer)
\ No newline at end of file
+    run_gui(optimizer, analyzer, snapshots)
\ No newline at end of file
@@ -0,0 +1,129 @@
+# gui_models.py
+import math
+from collections import deque
+from typing import Dict
+import pandas as pd
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt, QTimer
+from PySide6.QtWidgets import QPlainTextEdit
+from market_table import MarketTable
+
+# Surowa wartość do sortowania (tekst "0.10000000" sortowałby się leksykalnie)
+SORT_ROLE = Qt.UserRole + 1
+
+class MarketTableModel(QAbstractTableModel):
+    """
+    Tabela rynku dla QTableView: widok rysuje tylko widoczne wiersze, a ceny
+    z WebSocket są zbierane i wysyłane jednym dataChanged co `flush_interval` ms.
+    """
+
+    def __init__(self, flush_interval: int = 250, parent=None):
+        super().__init__(parent)
+        self.table = MarketTable()
+        self._pending: Dict[str, float] = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(flush_interval)
+        self._timer.timeout.connect(self._flush)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.table)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(MarketTable.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.table.text(index.row(), index.column())
+        if role == SORT_ROLE:
+            value = self.table.value(index.row(), index.column())
+            # Brak wartości na końcu przy sortowaniu malejącym po score
+            return float('-inf') if isinstance(value, float) and math.isnan(value) else value
+        if role == Qt.TextAlignmentRole and index.column() > 0:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return MarketTable.HEADERS[section]
+        return None
+
+    def _insert(self, symbols) -> None:
+        new = self.table.missing(symbols)
+        if not new:
+            return
+        first = len(self.table)
+        self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+        self.table.add(new)
+        self.endInsertRows()
+
+    def _changed(self, span, first_column: int, last_column: int) -> None:
+        if span is not None:
+            self.dataChanged.emit(
+                self.index(span[0], first_column),
+                self.index(span[1], last_column),
+                [Qt.DisplayRole, SORT_ROLE]
+            )
+
+    def update_prices(self, prices: Dict[str, float]) -> None:
+        self._pending.update(prices)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self) -> None:
+        prices, self._pending = self._pending, {}
+        self._insert(prices)
+        column = MarketTable.COLUMNS.index('price')
+        self._changed(self.table.set_column('price', prices), column, column)
+
+    def load_snapshot(self, df: pd.DataFrame) -> None:
+        """Wyniki ostatniej analizy (SnapshotStore.latest) - wszystkie kolumny naraz."""
+        if df.empty:
+            return
+        self._insert(df['symbol'])
+        self._changed(self.table.load(df), 1, len(MarketTable.COLUMNS) - 1)
+
+def market_proxy(model: MarketTableModel, parent=None) -> QSortFilterProxyModel:
+    """Sortowanie po surowych wartościach i filtr po symbolu."""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setSortRole(SORT_ROLE)
+    proxy.setFilterKeyColumn(0)
+    proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    proxy.setDynamicSortFilter(True)
+    return proxy
+
+class LogView(QPlainTextEdit):
+    """
+    Konsola logów o stałym rozmiarze: dokument trzyma co najwyżej `max_lines` linii
+    (najstarsze usuwane), wpisy dopisywane paczką co `flush_interval` ms.
+    """
+
+    def __init__(self, max_lines: int = 5000, flush_interval: int = 200, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        # Stos cofania rósłby z każdym wpisem
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(max_lines)
+        self._pending = deque(maxlen=max_lines)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(flush_interval)
+        self._timer.timeout.connect(self._flush)
+
+    def append_line(self, line: str) -> None:
+        self._pending.append(line)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        bar = self.verticalScrollBar()
+        # Przewijanie tylko gdy użytkownik jest na końcu - nie przerywa czytania starszych wpisów
+        follow = bar.value() >= bar.maximum() - 1
+        self.appendPlainText("\n".join(self._pending))
+        self._pending.clear()
+        if follow:
+            bar.setValue(bar.maximum())
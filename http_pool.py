@@ -0,0 +1,179 @@
+# http_pool.py
+import asyncio
+import logging
+import random
+import time
+from collections import namedtuple
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, Optional
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+HttpResponse = namedtuple('HttpResponse', ['status', 'headers', 'data'])
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Powtórzenie nie zmienia skutku; POST po przekroczeniu czasu mógł już dotrzeć do serwera
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Retry-After w sekundach albo jako data HTTP; None gdy nieczytelny (wtedy backoff)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logger.debug("Nieczytelny nagłówek Retry-After: %s", value)
+        return None
+    return max(0.0, moment.timestamp() - (time.time() if now is None else now))
+
+class HttpClientPool:
+    """Wspólna sesja aiohttp dla całego procesu: limity połączeń, keep-alive, ponowienia z jitterem."""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 15.0,
+        retries: int = 3,
+        backoff: float = 0.5
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'errors': 0,
+            'connections_created': 0,
+            'connections_reused': 0
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = None
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_create(session, context, params):
+            self.stats['connections_created'] += 1
+
+        async def on_reuse(session, context, params):
+            self.stats['connections_reused'] += 1
+
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    async def session(self) -> aiohttp.ClientSession:
+        if self._session is not None and not self._session.closed:
+            return self._session
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    trace_configs=[self._trace_config()]
+                )
+        return self._session
+
+    def _delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return retry_after
+        # Pełny jitter - rozprasza ponowienia wielu klientów
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    @staticmethod
+    async def _read(response: aiohttp.ClientResponse, parse: str) -> Any:
+        if parse == 'json':
+            return await response.json(content_type=None)
+        if parse == 'text':
+            return await response.text()
+        return await response.read()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        parse: str = 'json',
+        retries: Optional[int] = None,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        retry_errors: Optional[bool] = None,
+        **kwargs: Any
+    ) -> HttpResponse:
+        """
+        Błędy połączenia i przekroczenia czasu ponawiane są tylko dla metod idempotentnych,
+        chyba że wywołujący poda `retry_errors=True`. Nieudane nawiązanie połączenia
+        (żądanie nie zostało wysłane) ponawiane jest zawsze.
+        """
+        retries = self.retries if retries is None else retries
+        if retry_errors is None:
+            retry_errors = method.upper() in IDEMPOTENT_METHODS
+        retry_statuses = set(retry_statuses)
+        session = await self.session()
+        for attempt in range(retries + 1):
+            self.stats['requests'] += 1
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    if response.status in retry_statuses and attempt < retries:
+                        delay = self._delay(attempt, parse_retry_after(response.headers.get('Retry-After')))
+                        logger.warning(f"HTTP {response.status} {url} - ponowienie za {delay:.2f}s")
+                    else:
+                        return HttpResponse(response.status, dict(response.headers), await self._read(response, parse))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= retries or not (retry_errors or isinstance(e, aiohttp.ClientConnectorError)):
+                    self.stats['errors'] += 1
+                    raise
+                delay = self._delay(attempt)
+                logger.warning(f"Błąd HTTP {url}: {str(e)} - ponowienie za {delay:.2f}s")
+            self.stats['retries'] += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs: Any) -> HttpResponse:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> HttpResponse:
+        return await self.request('POST', url, **kwargs)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+_pool: Optional[HttpClientPool] = None
+
+def get_http_pool(config=None) -> HttpClientPool:
+    global _pool
+    if _pool is None:
+        settings: Dict[str, Any] = {}
+        if config is not None:
+            settings = {
+                'limit': config.http_limit,
+                'limit_per_host': config.http_limit_per_host,
+                'keepalive_timeout': config.http_keepalive,
+                'timeout': config.http_timeout,
+                'retries': config.http_retries,
+                'backoff': config.http_backoff
+            }
+        _pool = HttpClientPool(**settings)
+    return _pool
+
+async def close_http_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -0,0 +1,43 @@
+# indicators.py
+import numpy as np
+import pandas as pd
+from typing import TYPE_CHECKING, Dict
+from utils import lazy_import
+
+if TYPE_CHECKING:
+    from ta.volatility import BollingerBands
+
+ta_momentum = lazy_import('ta.momentum')
+ta_trend = lazy_import('ta.trend')
+ta_volatility = lazy_import('ta.volatility')
+
+# Funkcje bez stanu - wywoływane zarówno przez CryptoAnalyzer, jak i procesy robocze
+
+def compute_indicators(df: pd.DataFrame) -> Dict[str, float]:
+    rsi = ta_momentum.RSIIndicator(df['close'], window=14).rsi().iloc[-1]
+    macd = ta_trend.MACD(df['close']).macd_diff().iloc[-1]
+    adx = ta_trend.ADXIndicator(df['high'], df['low'], df['close']).adx().iloc[-1]
+    bb = ta_volatility.BollingerBands(df['close'], window=20, window_dev=2)
+    bb_percent = compute_bb_percent(df, bb)
+
+    return {
+        'rsi': round(rsi, 2),
+        'macd': round(macd, 4),
+        'adx': round(adx, 2),
+        'bb_percent': round(bb_percent, 2)
+    }
+
+def compute_bb_percent(df: pd.DataFrame, bb: 'BollingerBands') -> float:
+    hband = bb.bollinger_hband().iloc[-1]
+    lband = bb.bollinger_lband().iloc[-1]
+    current_close = df['close'].iloc[-1]
+    bb_diff = hband - lband
+    return (current_close - lband) / bb_diff if bb_diff != 0 else 0.0
+
+def trend_direction(close: np.ndarray) -> float:
+    """Znak histogramu MACD: -1, 0 lub 1 (0 przy zbyt krótkiej serii)."""
+    # MACD(12, 26, 9) potrzebuje co najmniej 34 słupków
+    if len(close) < 34:
+        return 0.0
+    macd = ta_trend.MACD(pd.Series(close)).macd_diff().iloc[-1]
+    return float(np.sign(macd)) if np.isfinite(macd) else 0.0
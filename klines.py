@@ -0,0 +1,49 @@
+# klines.py
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+# Tylko pola używane dalej: czasy w ms jako int64, OHLCV jako float64
+KLINE_DTYPE = np.dtype([
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64)
+])
+
+_PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+def parse_klines_array(klines: List[list], out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Surowa odpowiedź /api/v3/klines -> tablica strukturalna KLINE_DTYPE.
+    `out` pozwala wypełnić wcześniej zaalokowany bufor (np. przy resamplingu).
+    """
+    count = len(klines)
+    if out is None:
+        out = np.empty(count, dtype=KLINE_DTYPE)
+    else:
+        out = out[:count]
+    out['timestamp'] = [k[0] for k in klines]
+    out['close_time'] = [k[6] for k in klines]
+    for column, name in enumerate(_PRICE_FIELDS, 1):
+        try:
+            out[name] = [float(k[column]) for k in klines]
+        except (TypeError, ValueError):
+            # Uszkodzone wartości jak dawniej zamieniane na NaN
+            out[name] = pd.to_numeric([k[column] for k in klines], errors='coerce')
+    return out
+
+def klines_frame(array: np.ndarray) -> pd.DataFrame:
+    """DataFrame z widokami na kolumny tablicy - bez kopiowania danych."""
+    return pd.DataFrame({
+        'timestamp': array['timestamp'].view('datetime64[ms]'),
+        'open': array['open'],
+        'high': array['high'],
+        'low': array['low'],
+        'close': array['close'],
+        'volume': array['volume'],
+        'close_time': array['close_time']
+    }, copy=False)
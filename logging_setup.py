@@ -0,0 +1,144 @@
+# logging_setup.py
+import atexit
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+# Standardowe atrybuty LogRecord - wszystko inne trafia do JSON jako pole dodatkowe
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """Jeden rekord = jedna linia JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class CallSiteRateLimitFilter(logging.Filter):
+    """
+    Ogranicza powtarzające się ostrzeżenia i błędy z tego samego miejsca w kodzie:
+    najwyżej `burst` rekordów na `interval` sekund. Pierwszy rekord nowego okna
+    niesie liczbę pominiętych (`suppressed`).
+    """
+
+    def __init__(self, burst: int = 5, interval: float = 60.0, level: int = logging.WARNING, clock=time.monotonic):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.level = level
+        self.clock = clock
+        # (plik, linia) -> [początek okna, liczba w oknie, pominięte]
+        self.sites: Dict[Tuple[str, int], list] = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = self.clock()
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                self.sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if site[1] < self.burst:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Przygotowuje rekord w wątku wywołującym bez formatowania całej linii."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # Pełna kolejka nie może blokować pętli zdarzeń ani handlu
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Traceback jako tekst - obiekty wyjątku nie przechodzą przez kolejkę
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging(
+    config_path: Optional[str] = "logging_config.ini",
+    level: int = logging.INFO,
+    error_burst: int = 5,
+    error_interval: float = 60.0,
+    queue_size: int = 10000
+) -> logging.handlers.QueueListener:
+    """
+    Buduje handlery z pliku konfiguracyjnego (lub domyślny konsolowy), a następnie
+    przenosi je za QueueListener. Wątki aplikacji tylko wkładają rekord do kolejki.
+    """
+    global _listener
+    stop_logging()
+    root = logging.getLogger()
+    if config_path and os.path.exists(config_path):
+        logging.config.fileConfig(config_path, disable_existing_loggers=False)
+    else:
+        root.handlers.clear()
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+        root.setLevel(level)
+
+    handlers = list(root.handlers)
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(CallSiteRateLimitFilter(error_burst, error_interval))
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging() -> None:
+    """Opróżnia kolejkę i zatrzymuje wątek zapisu."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(stop_logging)
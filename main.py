@@ -1,20 +1,18 @@
 # main.py
 import logging
-logging.basicConfig(level=logging.DEBUG)
 import os
 import asyncio
 import threading
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 from functools import partial
-import asyncpraw
 from dotenv import load_dotenv
-from binance.client import Client
 from config import load_config
-from exchange import BinanceAPIHandler, TickerCache
-from analyzer import CryptoAnalyzer
-from optimizer import PortfolioOptimizer
-from risk_manager import RiskManager
+from scheduler import AnalysisScheduler
+from snapshot_store import format_top
+from startup import StartupProfiler, initialize_components
+from http_pool import close_http_pool
+from logging_setup import setup_logging
 
 os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 os.environ["PYTHONWARNINGS"] = "ignore::FutureWarning"
@@ -37,6 +35,12 @@ class CryptoApp(tk.Tk):
         self.analyzer = None
         self.optimizer = None
         self.risk_manager = None
+        self.journal = None
+        self.notifier = None
+        self.order_books = None
+        self.snapshots = None
+        self.scheduler = None
+        self.profiler = StartupProfiler()
         self.mode_var = tk.StringVar(value="test")
         self.config = load_config()
         
@@ -96,41 +100,13 @@ class CryptoApp(tk.Tk):
 
     async def initialize_components(self):
         try:
-            await self.async_update_status("Inicjalizacja klienta Binance...", 10)
-            self.api_handler = BinanceAPIHandler(self.config)
-            self.binance_client = self.api_handler.client
-
-            await self.async_update_status("Łączenie z Reddit...", 30)
-            self.reddit_client = await self.create_reddit_client()
-
-            await self.async_update_status("Inicjalizacja TickerCache...", 50)
-            self.ticker_cache = TickerCache(self.api_handler)
-
-            await self.async_update_status("Inicjalizacja analizatora...", 60)
-            self.analyzer = CryptoAnalyzer(
-                binance_client=self.binance_client,
-                reddit=self.reddit_client,
-                ticker_cache=self.ticker_cache,
-                config=self.config,
-                api_handler=self.api_handler,
-                cryptopanic_api_key=os.getenv("CRYPTOPANIC_API_KEY")
+            components = await initialize_components(
+                self.config,
+                self.profiler,
+                status=self.async_update_status
             )
-
-            await self.async_update_status("Inicjalizacja optymalizatora...", 70)
-            self.optimizer = PortfolioOptimizer(
-                client=self.binance_client,
-                analyzer=self.analyzer,
-                config=self.config
-            )
-
-            await self.async_update_status("Inicjalizacja menedżera ryzyka...", 80)
-            self.risk_manager = RiskManager(
-                optimizer=self.optimizer,
-                analyzer=self.analyzer,
-                config=self.config
-            )
-
-            self.optimizer.set_risk_manager(self.risk_manager)
+            for name, component in components.items():
+                setattr(self, name, component)
 
             await self.async_update_status("Gotowy do działania", 100, "green")
             self.start_btn.config(state=tk.NORMAL)
@@ -140,21 +116,6 @@ class CryptoApp(tk.Tk):
             self.start_btn.config(state=tk.DISABLED)
             raise
 
-    async def create_reddit_client(self):
-        if not self.config.enable_news or self.config.mode == "test":
-            return None
-
-        try:
-            return await asyncpraw.Reddit(
-                client_id=os.getenv("REDDIT_CLIENT_ID"),
-                client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
-                user_agent="crypto-bot/1.0",
-                timeout=30
-            ).__aenter__()
-        except Exception as e:
-            self.show_error(f"Błąd połączenia Reddit: {str(e)}")
-            return None
-
     async def _async_start_analysis(self):
         try:
             self.running = True
@@ -162,19 +123,15 @@ class CryptoApp(tk.Tk):
             self.stop_btn.config(state=tk.NORMAL)
             self.console.delete(1.0, tk.END)
 
-            while self.running:
-                await self.async_update_status("Analiza rynku...", 20)
-                market_data = await self.analyzer.analyze_market()
-                
-                await self.async_update_status("Generowanie zleceń...", 50)
-                allocations = self.optimizer.calculate_allocation(market_data)
-                orders = self.optimizer.generate_orders(allocations)
-                
-                await self.async_update_status("Wykonywanie zleceń...", 80)
-                self.optimizer.execute_orders(orders)
-                
-                await self.async_update_status("Cykl zakończony", 100, "green")
-                await asyncio.sleep(self.config.analysis_interval)
+            await self.async_update_status("Analiza rynku...", 20)
+            self.scheduler = AnalysisScheduler(
+                self.analyzer,
+                self.optimizer,
+                self.config,
+                reporter=self._on_cycle_report,
+                snapshots=self.snapshots
+            )
+            await self.scheduler.run()
 
         except Exception as e:
             self.show_error(f"Błąd analizy: {str(e)}")
@@ -183,8 +140,28 @@ class CryptoApp(tk.Tk):
             self.start_btn.config(state=tk.NORMAL)
             self.stop_btn.config(state=tk.DISABLED)
 
+    async def _on_cycle_report(self, report: dict):
+        if 'first_analysis' not in self.profiler.milestones:
+            self.profiler.mark("first_analysis")
+            self.after(0, partial(self.log, f"Profil startu: {self.profiler.report()}\n"))
+        if 'error' in report:
+            self.after(0, partial(self.log, f"\n⛔ Błąd cyklu {report['cycle']}: {report['error']}\n", 'error'))
+            return
+        message = (
+            f"Cykl {report['cycle']}: {report['symbols']} symboli, "
+            f"{len(report['orders'])} zleceń, {report['duration']:.1f}s"
+        )
+        if report['overrun']:
+            message += f" (przekroczenie, pominięte: {report['skipped']})"
+        if self.snapshots is not None and 'snapshot_cycle' in report:
+            message += f"\nNajlepsze: {format_top(self.snapshots.cycle(report['snapshot_cycle']))}"
+        self.after(0, partial(self.log, message + "\n", 'error' if report['overrun'] else 'success'))
+        await self.async_update_status("Cykl zakończony", 100, "green")
+
     def stop_analysis(self):
         self.running = False
+        if self.scheduler:
+            self.loop.call_soon_threadsafe(self.scheduler.stop)
         self.update_status("Analiza przerwana", 0, "red")
         self.log("Analiza przerwana przez użytkownika", tag='error')
 
@@ -208,9 +185,21 @@ class CryptoApp(tk.Tk):
     async def on_close(self):
         if self.reddit_client:
             await self.reddit_client.__aexit__(None, None, None)
+        if self.journal:
+            self.journal.close()
+        if self.notifier:
+            await self.notifier.close()
+        if self.order_books:
+            await self.order_books.close()
+        if self.analyzer:
+            self.analyzer.close()
+        if self.snapshots:
+            self.snapshots.close()
+        await close_http_pool()
         self.loop.call_soon_threadsafe(self.loop.stop)
         self.destroy()
 
 if __name__ == "__main__":
+    setup_logging("logging_config.ini")
     app = CryptoApp()
     app.mainloop()
\ No newline at end of file
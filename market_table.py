@@ -0,0 +1,69 @@
+# market_table.py
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class MarketTable:
+    """
+    Kolumnowe dane tabeli rynku dla modelu Qt: wiersz na symbol, dopisywany na końcu
+    (indeksy wierszy stabilne), aktualizacje zwracają zakres zmienionych wierszy.
+    """
+
+    COLUMNS = ('symbol', 'price', 'score', 'rsi', 'macd', 'adx', 'bb_percent', 'trend')
+    HEADERS = ('Symbol', 'Cena', 'Score', 'RSI', 'MACD', 'ADX', '%B', 'Trend')
+    FORMATS = (None, '{:.8f}', '{:.3f}', '{:.2f}', '{:.4f}', '{:.2f}', '{:.2f}', '{:+.2f}')
+
+    def __init__(self, capacity: int = 256):
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.values = np.full((capacity, len(self.COLUMNS) - 1), np.nan)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def missing(self, symbols: Iterable[str]) -> List[str]:
+        return [s for s in dict.fromkeys(symbols) if s not in self.index]
+
+    def add(self, symbols: Iterable[str]) -> None:
+        """Dopisuje nowe symbole; model Qt woła to między beginInsertRows a endInsertRows."""
+        new = self.missing(symbols)
+        size = len(self.symbols) + len(new)
+        if size > len(self.values):
+            grown = np.full((max(size, 2 * len(self.values)), self.values.shape[1]), np.nan)
+            grown[:len(self.symbols)] = self.values[:len(self.symbols)]
+            self.values = grown
+        for symbol in new:
+            self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+
+    def set_column(self, column: str, values: Dict[str, float]) -> Optional[Tuple[int, int]]:
+        """Wartości kolumny dla znanych symboli; zwraca (pierwszy, ostatni) zmieniony wiersz."""
+        rows = np.fromiter((self.index[s] for s in values if s in self.index), dtype=np.intp)
+        if not len(rows):
+            return None
+        data = np.fromiter((v for s, v in values.items() if s in self.index), dtype=float, count=len(rows))
+        self.values[rows, self.COLUMNS.index(column) - 1] = data
+        return int(rows.min()), int(rows.max())
+
+    def load(self, df: pd.DataFrame) -> Optional[Tuple[int, int]]:
+        """Kolumny z migawki analizy (SnapshotStore) dla symboli już w tabeli."""
+        rows = np.fromiter((self.index.get(s, -1) for s in df['symbol']), dtype=np.intp, count=len(df))
+        known = rows >= 0
+        if not known.any():
+            return None
+        for i, column in enumerate(self.COLUMNS[1:]):
+            if column in df:
+                self.values[rows[known], i] = df[column].to_numpy(dtype=float)[known]
+        return int(rows[known].min()), int(rows[known].max())
+
+    def value(self, row: int, column: int):
+        if column == 0:
+            return self.symbols[row]
+        return float(self.values[row, column - 1])
+
+    def text(self, row: int, column: int) -> str:
+        value = self.value(row, column)
+        if column == 0:
+            return value
+        return '' if math.isnan(value) else self.FORMATS[column].format(value)
@@ -0,0 +1,340 @@
+# metrics.py
+import bisect
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Progi histogramu opóźnień w sekundach (od 100 µs do 60 s)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Optional[Dict[str, Any]]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Przybliżony kwantyl - górna granica przedziału, w którym wypada."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            if total >= target:
+                return bound
+        return float('inf')
+
+class Meter:
+    """Licznik zdarzeń z częstotliwością liczoną w pełnych sekundach."""
+    __slots__ = ('total', 'second', 'current', 'rate')
+
+    def __init__(self):
+        self.total = 0
+        self.second = 0
+        self.current = 0
+        self.rate = 0.0
+
+    def mark(self, n: int = 1, now: Optional[float] = None) -> None:
+        second = int(time.time() if now is None else now)
+        if second != self.second:
+            self.rate = float(self.current) if second == self.second + 1 else 0.0
+            self.second = second
+            self.current = 0
+        self.current += n
+        self.total += n
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+# Bieżący span - kontekst dziedziczą zadania asyncio i asyncio.to_thread
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    __slots__ = ('registry', 'name', 'attributes', 'parent', 'start', 'duration', '_perf', '_token')
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, attributes: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.start = 0.0
+        self.duration = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._perf = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._perf
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+        self.registry._finish_span(self)
+        return False
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, labels: Labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+class MetricsRegistry:
+    """
+    Histogramy opóźnień, liczniki i spany cykli. Gdy pomiar jest wyłączony,
+    każda metoda kończy się na jednym sprawdzeniu flagi.
+    """
+
+    def __init__(self, enabled: bool = False, span_history: int = 200):
+        self.enabled = enabled
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.meters: Dict[str, Meter] = {}
+        self.spans = deque(maxlen=span_history)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool, span_history: Optional[int] = None) -> None:
+        self.enabled = enabled
+        if span_history is not None:
+            self.spans = deque(self.spans, maxlen=span_history)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+            self.meters.clear()
+            self.spans.clear()
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        self.gauges[(name, _labels(labels))] = value
+
+    def mark(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            meter = self.meters.get(name)
+            if meter is None:
+                meter = self.meters[name] = Meter()
+            meter.mark(n)
+
+    def timer(self, name: str, **labels: Any):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Timer(self, name, _labels(labels))
+
+    def span(self, name: str, **attributes: Any):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attributes)
+
+    def _finish_span(self, span: Span) -> None:
+        self.observe('span_seconds', span.duration, (('span', span.name),))
+        self.spans.append({
+            'name': span.name,
+            'parent': span.parent.name if span.parent else None,
+            'start': span.start,
+            'duration': span.duration,
+            'attributes': dict(span.attributes)
+        })
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """Dekorator mierzący czas funkcji (synchronicznej lub korutyny)."""
+        def decorator(func: Callable) -> Callable:
+            metric = name or func.__qualname__
+            labels = (('function', metric),)
+
+            if inspect.iscoroutinefunction(func):
+                async def measured(args, kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe('call_seconds', time.perf_counter() - start, labels)
+
+                @functools.wraps(func)
+                def async_wrapper(*args, **kwargs):
+                    # Wyłączony pomiar zwraca korutynę bez dodatkowej ramki
+                    if not self.enabled:
+                        return func(*args, **kwargs)
+                    return measured(args, kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe('call_seconds', time.perf_counter() - start, labels)
+            return wrapper
+        return decorator
+
+    def instrument_session(self, session) -> None:
+        """Hook odpowiedzi requests: waga REST Binance z nagłówka X-MBX-USED-WEIGHT-1M."""
+        last = {'weight': 0}
+
+        def on_response(response, *args, **kwargs):
+            if not self.enabled:
+                return response
+            endpoint = response.request.path_url.split('?', 1)[0] if response.request else ''
+            self.inc('rest_requests_total', endpoint=endpoint, status=response.status_code)
+            weight = response.headers.get('x-mbx-used-weight-1m')
+            if weight is not None and weight.isdigit():
+                used = int(weight)
+                # Spadek oznacza nowe okno minutowe
+                self.inc('rest_weight_total', used - last['weight'] if used >= last['weight'] else used)
+                last['weight'] = used
+                self.set_gauge('rest_used_weight_1m', used)
+            return response
+
+        session.hooks.setdefault('response', []).append(on_response)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': h.count,
+                    'sum': h.sum,
+                    'p50': h.quantile(0.5),
+                    'p99': h.quantile(0.99)
+                }
+                for (name, labels), h in self.histograms.items()
+            ]
+            counters = [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in self.counters.items()]
+            gauges = [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in self.gauges.items()]
+            meters = {n: {'total': m.total, 'per_second': m.rate} for n, m in self.meters.items()}
+            spans = list(self.spans)
+        return {
+            'enabled': self.enabled,
+            'histograms': histograms,
+            'counters': counters,
+            'gauges': gauges,
+            'meters': meters,
+            'spans': spans
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, prefix: str = 'bot_') -> str:
+        lines: List[str] = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{prefix}{name}{_format_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(f"{prefix}{name}{_format_labels(labels)} {value}")
+            for name, meter in sorted(self.meters.items()):
+                lines.append(f"{prefix}{name}_total {meter.total}")
+                lines.append(f"{prefix}{name}_per_second {meter.rate}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f"{prefix}{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {cumulative}")
+                lines.append(f"{prefix}{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {h.count}")
+                lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {h.sum}")
+                lines.append(f"{prefix}{name}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+timed = metrics.timed
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9108, registry: MetricsRegistry = metrics):
+    """Endpoint /metrics (format Prometheus) i /metrics.json."""
+    from aiohttp import web
+
+    async def prometheus(request):
+        return web.Response(text=registry.to_prometheus(), content_type='text/plain')
+
+    async def as_json(request):
+        return web.json_response(registry.snapshot())
+
+    app = web.Application()
+    app.router.add_get('/metrics', prometheus)
+    app.router.add_get('/metrics.json', as_json)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Metryki dostępne na http://{host}:{port}/metrics")
+    return runner
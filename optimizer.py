@@ -3,8 +3,9 @@ import logging
 import pandas as pd
 import numpy as np
 from decimal import Decimal, ROUND_DOWN
-from typing import Dict, List
-from utils import DynamicRateLimiter
+from typing import Dict, Iterable, List, Optional, Tuple
+from shared_limiter import create_rate_limiter
+from metrics import metrics, timed
 
 logger = logging.getLogger(__name__)
 
@@ -15,18 +16,48 @@ class PortfolioOptimizer:
         self.config = config
         self.limiter = self._get_limiter()
         self.risk_manager = None
+        self.notifier = None
+        self.order_books = None
 
     def _get_limiter(self):
         if self.analyzer and hasattr(self.analyzer, 'api_handler'):
             return self.analyzer.api_handler.limiter
-        return DynamicRateLimiter(
-            max_calls=self.config.api_rate_limit,
-            window_seconds=self.config.api_rate_window
-        )
+        return create_rate_limiter(self.config)
 
     def set_risk_manager(self, risk_manager):
         self.risk_manager = risk_manager
 
+    def set_notifier(self, notifier):
+        self.notifier = notifier
+
+    def set_order_books(self, order_books):
+        self.order_books = order_books
+
+    def _market_price(
+        self,
+        symbol: str,
+        side: str,
+        quantity: Optional[float] = None,
+        quote: Optional[float] = None
+    ) -> Tuple[float, Optional[float]]:
+        """
+        Szacowana cena wykonania i slippage z lokalnej książki zleceń; cena ostatniej
+        transakcji tylko bez zsynchronizowanej książki. Książka zbyt płytka dla zlecenia
+        daje slippage nieskończony - przekracza każdy limit.
+        """
+        if self.order_books is not None:
+            estimate = self.order_books.estimate_fill(symbol, side, quantity=quantity, quote=quote)
+            if estimate and estimate['complete']:
+                return estimate['price'], estimate['slippage']
+            if estimate is not None:
+                logger.warning("Książka %s zbyt płytka dla zlecenia %s", symbol, side)
+                if estimate['price'] is not None:
+                    return estimate['price'], float('inf')
+                ticker = self.client.get_symbol_ticker(symbol=symbol)
+                return float(ticker['price']), float('inf')
+        ticker = self.client.get_symbol_ticker(symbol=symbol)
+        return float(ticker['price']), None
+
     def load_portfolio(self) -> Dict[str, float]:
         try:
             self.limiter.wait()
@@ -40,11 +71,14 @@ class PortfolioOptimizer:
             logger.error(f"Błąd ładowania portfela: {str(e)}")
             return {}
 
-    def calculate_allocation(self, predictions: pd.DataFrame) -> Dict[str, float]:
+    def calculate_allocation(self, predictions: pd.DataFrame, budget: Optional[float] = None) -> Dict[str, float]:
+        if budget is None:
+            budget = self.config.max_trade_usd
+
         if predictions.empty:
             logger.warning("Brak danych predykcyjnych! Używam równomiernej alokacji")
             return {
-                symbol: self.config.max_trade_usd / 5 
+                symbol: budget / 5 
                 for symbol in self.analyzer.ticker_cache.symbols[:5]
             }
         
@@ -55,14 +89,20 @@ class PortfolioOptimizer:
         total_score = predictions['score'].sum()
         if total_score <= 0:
             logger.error("Suma wyników <= 0. Ustawiam domyślne alokacje.")
-            return {row['symbol']: self.config.max_trade_usd / len(predictions) for _, row in predictions.iterrows()}
+            return {row['symbol']: budget / len(predictions) for _, row in predictions.iterrows()}
 
         return {
-            row['symbol']: (row['score'] / total_score) * self.config.max_trade_usd
+            row['symbol']: (row['score'] / total_score) * budget
             for _, row in predictions.iterrows()
         }
 
-    def generate_orders(self, allocations: Dict[str, float]) -> List[Dict]:
+    @timed('generate_orders')
+    def generate_orders(
+        self,
+        allocations: Dict[str, float],
+        check_risk: bool = True,
+        exclude: Iterable[str] = ()
+    ) -> List[Dict]:
         if not self.risk_manager:
             raise RuntimeError("RiskManager nie został zainicjalizowany")
 
@@ -71,21 +111,30 @@ class PortfolioOptimizer:
         usdt_balance = portfolio.get('USDT', 0.0)
         valid_symbols = self.analyzer.ticker_cache.symbols
         
-        risk_orders = self.risk_manager.check_positions()
+        risk_orders = self.risk_manager.check_positions() if check_risk else []
         orders.extend(risk_orders)
+        if self.risk_manager.halted:
+            logger.warning("Protokół bezpieczeństwa aktywny - bez nowych zakupów")
+            allocations = {}
+        skipped = {o['symbol'] for o in risk_orders} | set(exclude)
 
         for symbol, amount in allocations.items():
             if symbol not in valid_symbols:
-                logger.warning(f"Symbol {symbol} nie jest dostępny. Pomijanie...")
+                logger.warning("Symbol %s nie jest dostępny. Pomijanie...", symbol)
                 continue
                 
-            if amount <= 0 or symbol in [o['symbol'] for o in risk_orders]:
+            if amount <= 0 or symbol in skipped:
                 continue
 
             try:
                 self.limiter.wait()
-                ticker = self.client.get_symbol_ticker(symbol=symbol)
-                price = float(ticker['price'])
+                price, slippage = self._market_price(symbol, 'BUY', quote=amount)
+                if slippage is not None and slippage > self.config.max_slippage:
+                    logger.warning(
+                        "Pomijam %s: szacowany slippage %.4f przekracza limit %.4f",
+                        symbol, slippage, self.config.max_slippage
+                    )
+                    continue
                 
                 info = self.client.get_symbol_info(symbol)
                 step_size = next(
@@ -102,13 +151,13 @@ class PortfolioOptimizer:
                         'symbol': symbol,
                         'side': 'BUY',
                         'quantity': adjusted_qty,
-                        'price': price
+                        'price': price,
+                        'slippage': slippage
                     })
-                    self.risk_manager.update_position(symbol, adjusted_qty, price)
                     usdt_balance -= amount
 
             except Exception as e:
-                logger.error(f"Błąd generowania zlecenia {symbol}: {str(e)}")
+                logger.error("Błąd generowania zlecenia %s: %s", symbol, e)
 
         return orders
 
@@ -129,23 +178,33 @@ class PortfolioOptimizer:
             logger.info("SYMULACJA ZAMÓWIEŃ:")
             for order in orders:
                 logger.info(
-                    f"{order['side']} {order['symbol']} "
-                    f"{order['quantity']} @ {order['price']}"
+                    "%s %s %s @ %s",
+                    order['side'], order['symbol'], order['quantity'], order['price']
                 )
+                self._on_order_filled(order)
             return
 
         for order in orders:
             try:
-                self.limiter.wait()
-                self.client.create_order(
-                    symbol=order['symbol'],
-                    side=order['side'],
-                    type='MARKET',
-                    quantity=order['quantity']
-                )
-                logger.info(f"WYKONANO: {order['side']} {order['symbol']}")
+                self.limiter.wait(priority='order')
+                with metrics.timer('call_seconds', function='create_order'):
+                    self.client.create_order(
+                        symbol=order['symbol'],
+                        side=order['side'],
+                        type='MARKET',
+                        quantity=order['quantity']
+                    )
+                logger.info("WYKONANO: %s %s", order['side'], order['symbol'])
+                self._on_order_filled(order)
             except Exception as e:
-                logger.error(f"Błąd wykonania zlecenia: {str(e)}")
+                logger.error("Błąd wykonania zlecenia: %s", e)
+
+    def _on_order_filled(self, order: Dict) -> None:
+        if self.risk_manager:
+            self.risk_manager.on_order_filled(order)
+        if self.notifier:
+            # Tylko kolejkowanie - wysyłka odbywa się w tle
+            self.notifier.notify_trade(order)
 
     def generate_emergency_orders(self) -> List[Dict]:
         portfolio = self.load_portfolio()
@@ -158,8 +217,8 @@ class PortfolioOptimizer:
             symbol = f"{asset}USDT"
             try:
                 self.limiter.wait()
-                ticker = self.client.get_symbol_ticker(symbol=symbol)
-                price = float(ticker['price'])
+                # Zlecenie awaryjne wykonywane niezależnie od slippage - tylko informacyjnie
+                price, slippage = self._market_price(symbol, 'SELL', quantity=amount)
                 
                 info = self.client.get_symbol_info(symbol)
                 step_size = next(
@@ -174,7 +233,8 @@ class PortfolioOptimizer:
                     'symbol': symbol,
                     'side': 'SELL',
                     'quantity': adjusted_qty,
-                    'price': price
+                    'price': price,
+                    'slippage': slippage
                 })
                 
             except Exception as e:
@@ -0,0 +1,322 @@
+# order_book.py
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from metrics import metrics
+from shared_limiter import depth_weight
+from stream_supervisor import StreamSupervisor
+
+logger = logging.getLogger(__name__)
+
+class SequenceGap(Exception):
+    """Brakujące zdarzenia w strumieniu różnic - książkę trzeba zsynchronizować od nowa."""
+
+def _levels(raw: Iterable) -> np.ndarray:
+    return np.array(raw, dtype=np.float64).reshape(-1, 2)
+
+class OrderBook:
+    """
+    Top-N poziomów jednej pary w posortowanych tablicach NumPy. Obie strony trzymane
+    rosnąco po kluczu (asks: cena, bids: -cena), więc aktualizacja to searchsorted + insert.
+    """
+
+    def __init__(self, symbol: str, depth: int = 100):
+        self.symbol = symbol
+        self.depth = depth
+        self.last_update_id: Optional[int] = None
+        self.synced = False
+        # (klucze, ilości) podmieniane jednym przypisaniem - odczyt z innego wątku
+        # (optymalizator w asyncio.to_thread) widzi zawsze spójną parę tablic
+        self._sides = {'bids': (np.empty(0), np.empty(0)), 'asks': (np.empty(0), np.empty(0))}
+        # Sumy skumulowane liczone leniwie dla konkretnej wersji strony
+        self._cumulative: Dict[str, tuple] = {}
+
+    @staticmethod
+    def _sign(side: str) -> float:
+        return -1.0 if side == 'bids' else 1.0
+
+    def prices(self, side: str) -> np.ndarray:
+        return self._sides[side][0] * self._sign(side)
+
+    def quantities(self, side: str) -> np.ndarray:
+        return self._sides[side][1]
+
+    def load_snapshot(self, snapshot: Dict) -> None:
+        """Odpowiedź /api/v3/depth: {'lastUpdateId', 'bids', 'asks'}."""
+        for side in ('bids', 'asks'):
+            levels = _levels(snapshot[side])
+            keys = levels[:, 0] * self._sign(side)
+            order = np.argsort(keys, kind='stable')[:self.depth]
+            self._sides[side] = (keys[order], levels[order, 1])
+        self.last_update_id = int(snapshot['lastUpdateId'])
+        self.synced = False
+
+    def apply_diff(self, event: Dict) -> bool:
+        """
+        Zdarzenie depthUpdate ('U' - pierwszy, 'u' - ostatni identyfikator). Zwraca False
+        dla zdarzeń starszych niż stan książki, SequenceGap przy brakującym zakresie.
+        """
+        first, last = int(event['U']), int(event['u'])
+        if self.last_update_id is None:
+            raise SequenceGap(f"{self.symbol}: brak migawki")
+        if last <= self.last_update_id:
+            return False
+        expected = self.last_update_id + 1
+        # Pierwsze zdarzenie po migawce może zaczynać się wcześniej, kolejne muszą być ciągłe
+        if first > expected or (self.synced and first != expected):
+            self.synced = False
+            raise SequenceGap(f"{self.symbol}: oczekiwano {expected}, otrzymano {first}-{last}")
+        self._update('bids', event['b'])
+        self._update('asks', event['a'])
+        self.last_update_id = last
+        self.synced = True
+        return True
+
+    def _update(self, side: str, raw: List) -> None:
+        if not raw:
+            return
+        levels = _levels(raw)
+        update_keys = levels[:, 0] * self._sign(side)
+        order = np.argsort(update_keys, kind='stable')
+        update_keys, update_qty = update_keys[order], levels[order, 1]
+
+        keys, qty = self._sides[side]
+        qty = qty.copy()
+        index = keys.searchsorted(update_keys)
+        if len(keys):
+            found = keys[np.minimum(index, len(keys) - 1)] == update_keys
+            qty[index[found]] = update_qty[found]
+        else:
+            found = np.zeros(len(update_keys), dtype=bool)
+
+        new = ~found & (update_qty > 0)
+        if new.any():
+            # Scalanie bez np.insert: pozycje nowych poziomów w tablicy wynikowej
+            positions = index[new] + np.arange(np.count_nonzero(new))
+            old = np.ones(len(keys) + len(positions), dtype=bool)
+            old[positions] = False
+            merged_keys, merged_qty = np.empty(len(old)), np.empty(len(old))
+            merged_keys[positions], merged_qty[positions] = update_keys[new], update_qty[new]
+            merged_keys[old], merged_qty[old] = keys, qty
+            keys, qty = merged_keys, merged_qty
+        if not qty.all():
+            keep = qty > 0
+            keys, qty = keys[keep], qty[keep]
+        self._sides[side] = (keys[:self.depth], qty[:self.depth])
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        keys = self._sides['bids'][0]
+        return float(-keys[0]) if len(keys) else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        keys = self._sides['asks'][0]
+        return float(keys[0]) if len(keys) else None
+
+    @property
+    def mid(self) -> Optional[float]:
+        bid, ask = self.best_bid, self.best_ask
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def _cumulative_side(self, side: str) -> tuple:
+        levels = self._sides[side]
+        cached = self._cumulative.get(side)
+        if cached is None or cached[0] is not levels:
+            keys, qty = levels
+            prices = keys * self._sign(side)
+            cached = (levels, (prices, qty, np.cumsum(qty), np.cumsum(prices * qty)))
+            self._cumulative[side] = cached
+        return cached[1]
+
+    def estimate_fill(self, side: str, quantity: Optional[float] = None, quote: Optional[float] = None) -> Dict:
+        """
+        Szacunek wykonania zlecenia rynkowego: BUY zbiera asks, SELL bids. Wielkość jako
+        ilość waluty bazowej (`quantity`) albo kwota w walucie kwotowanej (`quote`).
+        Slippage liczony względem ceny środkowej; `filled` < żądanej gdy brakuje głębokości.
+        """
+        book_side = 'asks' if side == 'BUY' else 'bids'
+        prices, qty, cum_qty, cum_quote = self._cumulative_side(book_side)
+        mid = self.mid
+        if not len(prices) or mid is None:
+            return {'price': None, 'slippage': None, 'filled': 0.0, 'levels': 0, 'complete': False}
+
+        cumulative, target = (cum_qty, quantity) if quantity is not None else (cum_quote, quote)
+        level = int(np.searchsorted(cumulative, target))
+        complete = level < len(prices)
+        if not complete:
+            filled_qty, filled_quote = float(cum_qty[-1]), float(cum_quote[-1])
+            level = len(prices) - 1
+        else:
+            before_qty = cum_qty[level - 1] if level else 0.0
+            before_quote = cum_quote[level - 1] if level else 0.0
+            # Ostatni poziom zbierany częściowo
+            if quantity is not None:
+                filled_qty = float(quantity)
+                filled_quote = float(before_quote + (quantity - before_qty) * prices[level])
+            else:
+                filled_quote = float(quote)
+                filled_qty = float(before_qty + (quote - before_quote) / prices[level])
+
+        price = filled_quote / filled_qty if filled_qty else None
+        slippage = None
+        if price is not None:
+            slippage = (price - mid) / mid if side == 'BUY' else (mid - price) / mid
+        return {
+            'price': price,
+            'slippage': slippage,
+            'filled': filled_qty,
+            'levels': level + 1,
+            'complete': complete
+        }
+
+class OrderBookManager:
+    """
+    Lokalne książki z migawki REST i strumienia `<symbol>@depth@100ms` (jedno połączenie
+    multiplex dla wszystkich par). Luka w numeracji zdarzeń -> ponowna migawka i
+    odtworzenie zbuforowanych różnic, zgodnie z procedurą opisaną w dokumentacji Binance.
+    """
+
+    def __init__(self, config, client=None, limiter=None):
+        self.config = config
+        self.client = client
+        self.limiter = limiter
+        self.depth = config.order_book_depth
+        self.books: Dict[str, OrderBook] = {}
+        self.symbols: List[str] = []
+        self.stats = {'events': 0, 'gaps': 0, 'resyncs': 0, 'errors': 0}
+        self._buffers: Dict[str, List[Dict]] = {}
+        self._resyncing: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.supervisor: Optional[StreamSupervisor] = None
+        self._owns_client = client is None
+
+    def book(self, symbol: str) -> Optional[OrderBook]:
+        """Książka tylko gdy jest zsynchronizowana ze strumieniem."""
+        book = self.books.get(symbol)
+        return book if book is not None and book.synced else None
+
+    def estimate_fill(self, symbol: str, side: str, quantity: Optional[float] = None, quote: Optional[float] = None) -> Optional[Dict]:
+        book = self.book(symbol)
+        if book is None:
+            return None
+        return book.estimate_fill(side, quantity=quantity, quote=quote)
+
+    def update_symbols(self, symbols: Iterable[str]) -> None:
+        """Zmiana zestawu par restartuje strumień; książki bez zmian synchronizują się same."""
+        symbols = list(dict.fromkeys(symbols))[:self.config.order_book_max_symbols]
+        if symbols == self.symbols and self._task is not None and not self._task.done():
+            return
+        self.symbols = symbols
+        for symbol in list(self.books):
+            if symbol not in symbols:
+                del self.books[symbol]
+                self._buffers.pop(symbol, None)
+        if self._task is not None:
+            self._task.cancel()
+        self._task = asyncio.get_running_loop().create_task(self._run(symbols))
+
+    async def _client(self):
+        if self.client is None:
+            from binance import AsyncClient
+            self.client = await AsyncClient.create(
+                api_key=self.config.binance_api_key,
+                api_secret=self.config.binance_api_secret,
+                testnet=self.config.simulation_mode
+            )
+        return self.client
+
+    async def _run(self, symbols: List[str]) -> None:
+        from binance import BinanceSocketManager
+        if not symbols:
+            return
+        client = await self._client()
+        streams = [f"{s.lower()}@depth@100ms" for s in symbols]
+        # Różnice po przerwie nie są uzupełniane przez REST - luka w numeracji
+        # wymusi nową migawkę przy pierwszym zdarzeniu
+        supervisor = StreamSupervisor(
+            'depth',
+            lambda: BinanceSocketManager(client).multiplex_socket(streams),
+            self._on_message,
+            heartbeat_interval=self.config.ws_heartbeat_interval,
+            stall_timeout=self.config.ws_stall_timeout,
+            backoff=self.config.ws_backoff,
+            max_backoff=self.config.ws_max_backoff
+        )
+        self.supervisor = supervisor
+        await supervisor.run()
+
+    def _on_message(self, message: Dict) -> None:
+        data = message.get('data', message) if isinstance(message, dict) else None
+        if data and data.get('e') == 'depthUpdate':
+            self.on_event(data)
+
+    def on_event(self, event: Dict) -> None:
+        symbol = event['s']
+        self.stats['events'] += 1
+        metrics.mark('depth_events')
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol, self.depth)
+        if symbol in self._resyncing or book.last_update_id is None:
+            self._buffer(symbol, event)
+            return
+        try:
+            book.apply_diff(event)
+        except SequenceGap as e:
+            self.stats['gaps'] += 1
+            logger.warning("Luka w strumieniu głębokości: %s", e)
+            self._buffer(symbol, event)
+
+    def _buffer(self, symbol: str, event: Dict) -> None:
+        buffer = self._buffers.setdefault(symbol, [])
+        buffer.append(event)
+        # Bufor ograniczony - przy długiej resynchronizacji liczą się najnowsze zdarzenia
+        del buffer[:-self.config.order_book_buffer]
+        if symbol not in self._resyncing:
+            self._resyncing[symbol] = asyncio.get_running_loop().create_task(self._resync(symbol))
+
+    async def _resync(self, symbol: str) -> None:
+        try:
+            client = await self._client()
+            if self.limiter is not None:
+                # Migawki po lukach to ruch masowy - ustępują zleceniom
+                await asyncio.to_thread(self.limiter.wait, depth_weight(self.depth), 'bulk')
+            snapshot = await client.get_order_book(symbol=symbol, limit=self.depth)
+            self.stats['resyncs'] += 1
+            self.load(symbol, snapshot)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error("Błąd migawki książki %s: %s", symbol, e)
+        finally:
+            self._resyncing.pop(symbol, None)
+
+    def load(self, symbol: str, snapshot: Dict) -> None:
+        """Migawka + odtworzenie zbuforowanych różnic; kolejna luka zaczyna synchronizację od nowa."""
+        book = self.books.setdefault(symbol, OrderBook(symbol, self.depth))
+        book.load_snapshot(snapshot)
+        buffered = self._buffers.pop(symbol, [])
+        for i, event in enumerate(buffered):
+            try:
+                book.apply_diff(event)
+            except SequenceGap:
+                # Bufor nie sięga migawki (ucięty lub migawka starsza) - kolejna próba
+                # przy następnym zdarzeniu, z zachowaniem nowszych różnic
+                self.stats['gaps'] += 1
+                book.last_update_id = None
+                self._buffers[symbol] = buffered[i:]
+                return
+
+    async def close(self) -> None:
+        tasks = [t for t in [self._task, *self._resyncing.values()] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._resyncing.clear()
+        if self._owns_client and self.client is not None:
+            await self.client.close_connection()
+            self.client = None
@@ -0,0 +1,130 @@
+# position_table.py
+import logging
+import numpy as np
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class PositionTable:
+    """Kolumnowa tabela pozycji - ocena ryzyka całego portfela w jednym przebiegu."""
+
+    COLUMNS = ('quantity', 'entry_price', 'current_price', 'volatility')
+
+    def __init__(self, capacity: int = 64):
+        self.symbols: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.size = 0
+        self.quantity = np.zeros(capacity)
+        self.entry_price = np.zeros(capacity)
+        self.current_price = np.zeros(capacity)
+        self.volatility = np.zeros(capacity)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.index
+
+    def _grow(self) -> None:
+        capacity = max(1, len(self.quantity)) * 2
+        for column in self.COLUMNS:
+            old = getattr(self, column)
+            new = np.zeros(capacity)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def upsert(self, symbol: str, quantity: float, entry_price: float) -> None:
+        i = self.index.get(symbol)
+        if i is None:
+            if self.size == len(self.quantity):
+                self._grow()
+            i = self.size
+            self.index[symbol] = i
+            self.symbols.append(symbol)
+            self.size += 1
+            self.current_price[i] = entry_price
+            self.volatility[i] = 0.0
+        self.quantity[i] = quantity
+        self.entry_price[i] = entry_price
+
+    def remove(self, symbol: str) -> None:
+        i = self.index.pop(symbol, None)
+        if i is None:
+            return
+        last = self.size - 1
+        if i != last:
+            # Przeniesienie ostatniego wiersza w miejsce usuniętego
+            moved = self.symbols[last]
+            for column in self.COLUMNS:
+                data = getattr(self, column)
+                data[i] = data[last]
+            self.symbols[i] = moved
+            self.index[moved] = i
+        self.symbols.pop()
+        self.size = last
+
+    def _gather(self, values: Dict[str, float], column: np.ndarray) -> None:
+        if not self.size:
+            return
+        new = np.fromiter(
+            (values.get(symbol, np.nan) for symbol in self.symbols),
+            dtype=float,
+            count=self.size
+        )
+        mask = ~np.isnan(new)
+        column[:self.size][mask] = new[mask]
+
+    def update_prices(self, prices: Dict[str, float]) -> None:
+        self._gather(prices, self.current_price)
+
+    def update_volatility(self, volatility: Dict[str, float]) -> None:
+        self._gather(volatility, self.volatility)
+
+    def evaluate(
+        self,
+        stop_loss_multiplier: float = 2.0,
+        take_profit_multiplier: float = 3.5,
+        baseline: Optional[float] = None,
+        cash: Optional[float] = 0.0
+    ) -> Dict:
+        """Ocena pozycji; drawdown całego konta (gotówka + pozycje) względem `baseline` z dziennika."""
+        n = self.size
+        quantity = self.quantity[:n]
+        entry = self.entry_price[:n]
+        current = self.current_price[:n]
+        volatility = self.volatility[:n]
+
+        pnl = (current - entry) * quantity
+        stop_loss = current <= entry * (1 - volatility * stop_loss_multiplier)
+        take_profit = ~stop_loss & (current >= entry * (1 + volatility * take_profit_multiplier))
+        exposure = quantity * current
+        # Bez salda gotówki (błąd API) wartość konta i drawdown nieznane
+        total_value = None if cash is None else cash + float(exposure.sum())
+        drawdown = None
+        if total_value is not None and baseline:
+            drawdown = (baseline - total_value) / baseline
+        return {
+            'pnl': pnl,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'exposure': exposure,
+            'value': float(exposure.sum()),
+            'cost': float((quantity * entry).sum()),
+            'unrealized_pnl': float(pnl.sum()),
+            'total_value': total_value,
+            'drawdown': drawdown
+        }
+
+    def historical_var(
+        self,
+        returns: np.ndarray,
+        confidence: float = 0.95,
+        exposure: Optional[np.ndarray] = None
+    ) -> float:
+        """VaR z symulacji historycznej; returns ma kształt (scenariusze, pozycje) i zawiera log-zwroty."""
+        if not self.size or returns.size == 0:
+            return 0.0
+        if exposure is None:
+            exposure = self.quantity[:self.size] * self.current_price[:self.size]
+        scenario_pnl = np.expm1(returns) @ exposure
+        return max(0.0, float(-np.quantile(scenario_pnl, 1 - confidence)))
@@ -1,44 +1,95 @@
 # risk_manager.py
 import logging
+import numpy as np
 from typing import Dict, Optional
 from decimal import Decimal, ROUND_DOWN
+from position_table import PositionTable
 
 logger = logging.getLogger(__name__)
 
 class RiskManager:
-    def __init__(self, optimizer, analyzer, config):
+    def __init__(self, optimizer, analyzer, config, journal=None):
         self.optimizer = optimizer
         self.analyzer = analyzer
         self.config = config
+        self.journal = journal
         self.initial_balance = None
         self.current_balance = None
         self.entry_prices = {}
         self.open_positions = {}
+        self.positions = PositionTable()
+        self.last_risk = None
+        # Po aktywacji protokołu bezpieczeństwa bez nowych zakupów do restartu
+        self.halted = False
 
-    def check_portfolio_health(self, current_value: float) -> bool:
+    def restore(self) -> bool:
+        if not self.journal:
+            return False
+        try:
+            state = self.journal.load()
+        except Exception as e:
+            logger.error(f"Błąd odtwarzania stanu: {str(e)}")
+            return False
+
+        for symbol, position in state['positions'].items():
+            quantity = Decimal(position['quantity'])
+            entry_price = Decimal(position['entry_price'])
+            self.entry_prices[symbol] = entry_price
+            self.open_positions[symbol] = {'quantity': quantity, 'entry_price': entry_price}
+            self.positions.upsert(symbol, float(quantity), float(entry_price))
+        self.initial_balance = state['initial_balance']
+        self.current_balance = state['current_balance']
+        return True
+
+    def _journal(self, method: str, *args):
+        if not self.journal:
+            return
+        try:
+            getattr(self.journal, method)(*args)
+        except Exception as e:
+            logger.error(f"Błąd zapisu dziennika stanu: {str(e)}")
+
+    def check_portfolio_health(self, current_value: float, drawdown: Optional[float] = None) -> bool:
         if not self.initial_balance:
             self.initial_balance = current_value
             self.current_balance = current_value
+            self._journal('record_balance', current_value, current_value)
             return True
-            
-        drawdown = (self.initial_balance - current_value) / self.initial_balance
+
+        if drawdown is None:
+            drawdown = (self.initial_balance - current_value) / self.initial_balance
         self.current_balance = current_value
+        self._journal('record_balance', None, current_value)
         
         if drawdown >= self.config.max_drawdown:
             logger.warning(f"Wykryto spadek wartości: {drawdown:.2%}")
             self.trigger_safety_measures()
             return False
+
+        if self.last_risk and current_value > 0:
+            var_ratio = self.last_risk['var'] / current_value
+            if var_ratio >= self.config.max_var_ratio:
+                logger.warning(f"VaR portfela przekracza limit: {var_ratio:.2%}")
+                self.trigger_safety_measures()
+                return False
         return True
 
     def trigger_safety_measures(self):
         logger.info("Aktywacja protokołu bezpieczeństwa")
+        self.halted = True
         emergency_orders = self.optimizer.generate_emergency_orders()
         self.optimizer.execute_orders(emergency_orders)
 
-    def dynamic_stop_loss(self, symbol: str) -> float:
+    def _get_current_price(self, symbol: str) -> Decimal:
+        return Decimal(self.optimizer.client.get_symbol_ticker(symbol=symbol)['price'])
+
+    def dynamic_stop_loss(self, symbol: str, current_price: Optional[Decimal] = None) -> float:
         volatility = self.analyzer.calculate_volatility(symbol)
-        current_price = Decimal(self.optimizer.client.get_symbol_ticker(symbol=symbol)['price'])
-        return float(current_price * (Decimal(1) - Decimal(volatility) * Decimal(2)))
+        reference_price = self.entry_prices.get(symbol) or current_price
+        if reference_price is None:
+            reference_price = self._get_current_price(symbol)
+        multiplier = Decimal(str(self.config.stop_loss_multiplier))
+        return float(reference_price * (Decimal(1) - Decimal(volatility) * multiplier))
 
     def dynamic_take_profit(self, symbol: str) -> Optional[float]:
         try:
@@ -47,7 +98,8 @@ class RiskManager:
                 return None
                 
             volatility = self.analyzer.calculate_volatility(symbol)
-            tp_price = entry_price * (Decimal(1) + Decimal(volatility) * Decimal(3.5))
+            multiplier = Decimal(str(self.config.take_profit_multiplier))
+            tp_price = entry_price * (Decimal(1) + Decimal(volatility) * multiplier)
             return float(tp_price)
         except Exception as e:
             logger.error(f"Błąd TP {symbol}: {str(e)}")
@@ -59,27 +111,106 @@ class RiskManager:
             'quantity': Decimal(str(quantity)),
             'entry_price': Decimal(str(price))
         }
+        self.positions.upsert(symbol, float(quantity), float(price))
+        self._journal('record_position', symbol, quantity, price)
 
-    def check_positions(self) -> list:
-        orders = []
-        for symbol, position in self.open_positions.items():
-            current_price = Decimal(self.optimizer.client.get_symbol_ticker(symbol=symbol)['price'])
-            
-            sl_level = Decimal(str(self.dynamic_stop_loss(symbol)))
-            if current_price <= sl_level:
-                orders.append(self._create_close_order(symbol, "STOP_LOSS"))
-                
-            tp_level = self.dynamic_take_profit(symbol)
-            if tp_level is not None and current_price >= Decimal(str(tp_level)):
-                orders.append(self._create_close_order(symbol, "TAKE_PROFIT"))
-        
+    def remove_position(self, symbol: str):
+        self.entry_prices.pop(symbol, None)
+        self.open_positions.pop(symbol, None)
+        self.positions.remove(symbol)
+        self._journal('record_close', symbol)
+
+    def on_order_filled(self, order: Dict):
+        # Pozycja powstaje dopiero z wykonania - odrzucone albo pominięte zlecenie nie zostawia śladu
+        self._journal('record_fill', order)
+        symbol = order['symbol']
+        if order['side'] == 'BUY':
+            quantity = Decimal(str(order['quantity']))
+            price = Decimal(str(order['price']))
+            held = self.open_positions.get(symbol)
+            if held:
+                # Dokupienie - średnia cena wejścia ważona ilością
+                total = held['quantity'] + quantity
+                price = (held['quantity'] * held['entry_price'] + quantity * price) / total
+                quantity = total
+            self.update_position(symbol, float(quantity), float(price))
+        elif order['side'] == 'SELL' and symbol in self.open_positions:
+            # Każda sprzedaż (SL/TP i awaryjna) zamyka całą pozycję
+            self.remove_position(symbol)
+
+    def _fetch_prices(self) -> Dict[str, float]:
+        # Jedno zapytanie o wszystkie ceny zamiast osobnego dla każdej pozycji
+        tickers = self.optimizer.client.get_all_tickers()
+        return {
+            t['symbol']: float(t['price'])
+            for t in tickers
+            if t['symbol'] in self.positions
+        }
+
+    def _cash(self) -> Optional[float]:
+        # Brak salda to brak oceny drawdownu - nie zero (fałszywy spadek wartości)
+        try:
+            account = self.optimizer.client.get_account()
+            return next(
+                (float(b['free']) + float(b.get('locked', 0)) for b in account['balances'] if b['asset'] == 'USDT'),
+                0.0
+            )
+        except Exception as e:
+            logger.error(f"Błąd pobierania salda USDT: {str(e)}")
+            return None
+
+    def evaluate_risk(self, prices: Optional[Dict[str, float]] = None) -> Dict:
+        if prices is None:
+            prices = self._fetch_prices()
+        symbols = self.positions.symbols
+        self.positions.update_prices(prices)
+        self.positions.update_volatility({
+            symbol: self.analyzer.calculate_volatility(symbol) for symbol in symbols
+        })
+
+        risk = self.positions.evaluate(
+            self.config.stop_loss_multiplier,
+            self.config.take_profit_multiplier,
+            baseline=self.initial_balance,
+            cash=self._cash()
+        )
+        try:
+            returns = self.analyzer.volatility.returns_matrix(symbols)
+            risk['var'] = self.positions.historical_var(returns, self.config.var_confidence, risk['exposure'])
+        except Exception as e:
+            logger.error(f"Błąd wyliczania VaR: {str(e)}")
+            risk['var'] = 0.0
+        self.last_risk = risk
+        return risk
+
+    def check_positions(self, prices: Optional[Dict[str, float]] = None) -> list:
+        """Zlecenia SL/TP; wcześniej ocena zdrowia portfela (drawdown, VaR) raz na cykl."""
+        if not len(self.positions):
+            return []
+
+        risk = self.evaluate_risk(prices)
+        if risk['total_value'] is not None and not self.check_portfolio_health(risk['total_value'], risk['drawdown']):
+            # Protokół bezpieczeństwa sprzedał już wszystkie aktywa
+            return []
+        symbols = self.positions.symbols
+        current = self.positions.current_price
+        orders = [
+            self._create_close_order(symbols[i], "STOP_LOSS", Decimal(str(current[i])))
+            for i in np.flatnonzero(risk['stop_loss'])
+        ]
+        orders.extend(
+            self._create_close_order(symbols[i], "TAKE_PROFIT", Decimal(str(current[i])))
+            for i in np.flatnonzero(risk['take_profit'])
+        )
         return orders
 
-    def _create_close_order(self, symbol: str, reason: str) -> dict:
+    def _create_close_order(self, symbol: str, reason: str, current_price: Optional[Decimal] = None) -> dict:
+        if current_price is None:
+            current_price = self._get_current_price(symbol)
         return {
             'symbol': symbol,
             'side': 'SELL',
             'quantity': float(self.open_positions[symbol]['quantity']),
-            'price': float(self.optimizer.client.get_symbol_ticker(symbol=symbol)['price']),
+            'price': float(current_price),
             'type': reason
         }
\ No newline at end of file
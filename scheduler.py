@@ -0,0 +1,245 @@
+# scheduler.py
+import asyncio
+import inspect
+import logging
+import math
+import time
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+class AnalysisScheduler:
+    """
+    Cykl analizy jako potok etapów (analiza -> alokacja/zlecenia -> wykonanie)
+    połączonych ograniczonymi kolejkami, wyrównany do zamknięcia świecy.
+    """
+
+    def __init__(
+        self,
+        analyzer,
+        optimizer,
+        config,
+        reporter: Optional[Callable[[Dict], object]] = None,
+        clock: Callable[[], float] = time.time,
+        snapshots=None
+    ):
+        self.analyzer = analyzer
+        self.config = config
+        self.snapshots = snapshots
+        # Jeden optymalizator albo {nazwa konta: optymalizator} - analiza wspólna, zlecenia per konto
+        if isinstance(optimizer, dict):
+            self.accounts = dict(optimizer)
+            self.budgets = {name: opt.config.max_trade_usd for name, opt in self.accounts.items()}
+        else:
+            self.accounts = {getattr(config, 'account_name', 'main'): optimizer}
+            self.budgets = {name: config.max_trade_usd for name in self.accounts}
+        self.optimizer = next(iter(self.accounts.values()))
+        self.reporter = reporter
+        self.clock = clock
+        self.running = False
+        self.cycle = 0
+        self.stats = {'cycles': 0, 'overruns': 0, 'skipped': 0, 'errors': 0, 'last_duration': 0.0}
+        self._stop_event = None
+
+    @property
+    def interval(self) -> float:
+        return float(self.config.analysis_interval)
+
+    def next_boundary(self, now: Optional[float] = None) -> float:
+        now = self.clock() if now is None else now
+        delay = self.config.candle_close_delay
+        boundary = math.floor((now - delay) / self.interval) * self.interval + delay
+        return boundary + self.interval
+
+    def stop(self) -> None:
+        self.running = False
+        if self._stop_event:
+            self._stop_event.set()
+
+    async def run(self, immediate: bool = True) -> None:
+        self.running = True
+        self._stop_event = asyncio.Event()
+        boundary = self.clock() if immediate else None
+
+        while self.running:
+            if boundary is None:
+                boundary = self.next_boundary()
+                if await self._sleep_until(boundary):
+                    break
+
+            started = self.clock()
+            report = {'cycle': self.cycle, 'boundary': boundary, 'started': started}
+            try:
+                report.update(await self.run_cycle())
+            except Exception as e:
+                self.stats['errors'] += 1
+                report['error'] = str(e)
+                logger.error(f"Błąd cyklu {self.cycle}: {str(e)}")
+
+            finished = self.clock()
+            self._account(report, boundary, started, finished)
+            await self._report(report)
+            self.cycle += 1
+            boundary = None
+
+        self.running = False
+
+    async def _sleep_until(self, deadline: float) -> bool:
+        timeout = deadline - self.clock()
+        if timeout <= 0:
+            return not self.running
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return not self.running
+
+    def _account(self, report: Dict, boundary: float, started: float, finished: float) -> None:
+        duration = finished - started
+        # Liczba granic świec, które minęły w trakcie cyklu (poza bieżącą)
+        skipped = max(0, int((finished - boundary) // self.interval))
+        report.update({
+            'duration': duration,
+            'lag': started - boundary,
+            'overrun': skipped > 0,
+            'skipped': skipped
+        })
+        self.stats['cycles'] += 1
+        self.stats['last_duration'] = duration
+        if skipped:
+            self.stats['overruns'] += 1
+            self.stats['skipped'] += skipped
+            logger.warning(
+                f"Cykl {self.cycle} przekroczył interwał: {duration:.1f}s, "
+                f"pominięte cykle: {skipped}"
+            )
+
+    async def _report(self, report: Dict) -> None:
+        if not self.reporter:
+            return
+        try:
+            result = self.reporter(report)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Błąd raportowania cyklu: {str(e)}")
+
+    def _batches(self, symbols: List[str]) -> List[List[str]]:
+        size = max(1, self.config.analysis_batch_size)
+        return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+    async def run_cycle(self) -> Dict:
+        with metrics.span('cycle', cycle=self.cycle) as span:
+            result = await self._run_cycle()
+            span.set(symbols=result['symbols'], orders=len(result['orders']))
+            return result
+
+    async def _run_cycle(self) -> Dict:
+        await asyncio.to_thread(self.analyzer.ticker_cache.refresh_symbols)
+        symbols = await asyncio.to_thread(self.analyzer.screen_universe)
+        # Książki zleceń wspólne dla wszystkich kont
+        order_books = getattr(self.optimizer, 'order_books', None)
+        if order_books is not None:
+            # Książki dla kandydatów tego cyklu; nowe pary synchronizują się w tle
+            order_books.update_symbols(symbols)
+        batches = self._batches(symbols)
+        analysis_queue = asyncio.Queue(maxsize=self.config.pipeline_queue_size)
+        order_queue = asyncio.Queue(maxsize=self.config.pipeline_queue_size)
+        frames = []
+        executed = []
+        by_account = {}
+
+        sentiment_task = None
+        if self.config.enable_news and not self.config.simulation_mode:
+            sentiment_task = asyncio.create_task(self.analyzer.fetch_sentiment())
+
+        async def analyze_stage():
+            try:
+                sentiment = None
+                for batch in batches:
+                    if sentiment_task is not None and sentiment is None:
+                        try:
+                            sentiment = await sentiment_task
+                        except Exception as e:
+                            logger.error(f"Błąd pobierania sentymentu: {str(e)}")
+                            sentiment = ({}, {})
+                    with metrics.span('analyze_batch', size=len(batch)):
+                        df = await self.analyzer.analyze_symbols(batch, sentiment=sentiment)
+                    await analysis_queue.put((batch, df))
+            finally:
+                await analysis_queue.put(_DONE)
+
+        async def order_stage():
+            try:
+                risk_symbols = {}
+                for name, optimizer in self.accounts.items():
+                    risk_orders = await asyncio.to_thread(optimizer.risk_manager.check_positions)
+                    risk_symbols[name] = {o['symbol'] for o in risk_orders}
+                    if risk_orders:
+                        await order_queue.put((name, risk_orders))
+
+                while (item := await analysis_queue.get()) is not _DONE:
+                    batch, df = item
+                    if df.empty:
+                        continue
+                    frames.append(df)
+                    for name, optimizer in self.accounts.items():
+                        budget = self.budgets[name] * len(batch) / len(symbols)
+                        with metrics.span('orders', size=len(batch), account=name):
+                            allocations = optimizer.calculate_allocation(df, budget=budget)
+                            orders = await asyncio.to_thread(
+                                optimizer.generate_orders,
+                                allocations,
+                                check_risk=False,
+                                exclude=risk_symbols[name]
+                            )
+                        if orders:
+                            await order_queue.put((name, orders))
+            finally:
+                await order_queue.put(_DONE)
+
+        async def execute_stage():
+            while (item := await order_queue.get()) is not _DONE:
+                name, orders = item
+                with metrics.span('execute', orders=len(orders), account=name):
+                    await asyncio.to_thread(self.accounts[name].execute_orders, orders)
+                executed.extend(orders)
+                by_account[name] = by_account.get(name, 0) + len(orders)
+
+        tasks = [
+            asyncio.create_task(analyze_stage()),
+            asyncio.create_task(order_stage()),
+            asyncio.create_task(execute_stage())
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            if sentiment_task is not None:
+                sentiment_task.cancel()
+            raise
+
+        results = (
+            pd.concat(frames, ignore_index=True)
+            if frames else pd.DataFrame(columns=['symbol', 'price', 'score'])
+        )
+        market_data = self.analyzer.process_results(results) if frames else results
+        report = {
+            'symbols': len(symbols),
+            'batches': len(batches),
+            'market_data': market_data,
+            'orders': executed,
+            'accounts': by_account
+        }
+        if self.snapshots is not None:
+            # Pełne wyniki (nie tylko top-k) dla GUI, raportów i analizy po fakcie
+            try:
+                report['snapshot_cycle'] = await asyncio.to_thread(self.snapshots.append, results, self.clock())
+            except Exception as e:
+                logger.error(f"Błąd zapisu migawki analizy: {str(e)}")
+        return report
@@ -1,27 +1,50 @@
 # sentiment.py
+import asyncio
 import logging
-import aiohttp
-import asyncpraw
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from typing import List, Dict, Any
+import math
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from utils import lazy_import
+from coin_index import CoinSentimentIndex
+from http_pool import get_http_pool
+from metrics import timed
+
+asyncpraw = lazy_import('asyncpraw')
+torch = lazy_import('torch')
+transformers = lazy_import('transformers')
 
 logger = logging.getLogger(__name__)
 
+_DONE = object()
+# Znacznik źródła przekazywany kolejką - zatwierdzany dopiero po ocenie poprzedzających tekstów
+_MARK = object()
+
 class SentimentAnalyzer:
-    def __init__(self, config):
+    def __init__(self, config, http_pool=None):
         self.config = config
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained("ElKulako/cryptobert")
-            self.model = AutoModelForSequenceClassification.from_pretrained("ElKulako/cryptobert")
+            self.tokenizer = transformers.AutoTokenizer.from_pretrained("ElKulako/cryptobert")
+            self.model = transformers.AutoModelForSequenceClassification.from_pretrained("ElKulako/cryptobert")
         except Exception as e:  # Nowy blok try-except
             logger.critical(f"Błąd ładowania modelu: {str(e)}")
             raise
         self.reddit = None
-        self.session = None
+        self.http = http_pool or get_http_pool(config)
+        # Znaczniki najnowszych przetworzonych elementów per źródło
+        self.high_water: Dict[str, Any] = {}
+        self.reddit_sentiment: Dict[str, Dict[str, float]] = {}
+        # subreddit -> [pozytywne, neutralne, negatywne, czas] - wygaszane jak indeks monet
+        self.reddit_counts: Dict[str, List[float]] = {}
+        self.recent_news = deque(maxlen=config.news_history)
+        self.extractor = None
+        self.coin_index = CoinSentimentIndex(
+            half_life=config.sentiment_half_life,
+            prior_weight=config.sentiment_prior_weight
+        )
 
     async def initialize(self):
-        self.session = aiohttp.ClientSession()
         if not self.config.simulation_mode:
             self.reddit = asyncpraw.Reddit(
                 client_id=self.config.reddit_client_id,
@@ -29,31 +52,152 @@ class SentimentAnalyzer:
                 user_agent="crypto-bot/1.0"
             )
 
-    async def analyze_reddit_comments(self, subreddits: List[str]) -> Dict[str, Dict]:
-        results = {}
+    async def ingest(
+        self,
+        subreddits: Optional[List[str]] = None,
+        news: bool = True
+    ) -> Tuple[Dict[str, Dict], List[Dict]]:
+        """
+        Pobiera subreddity i wiadomości współbieżnie, a teksty ocenia w mikropartiach
+        w trakcie pobierania. Przetwarzane są tylko elementy nowsze niż znacznik źródła.
+        """
+        subreddits = subreddits if subreddits is not None else self.config.sentiment_subreddits
+        queue = asyncio.Queue(maxsize=self.config.sentiment_queue_size)
+        producers = []
+        if self.reddit is not None:
+            producers += [self._fetch_subreddit(sub, queue) for sub in subreddits]
+        if news:
+            producers.append(self._fetch_news(queue))
+
+        counts: Dict[str, List[int]] = {}
+        news_items: List[Dict] = []
+        producer_tasks = [asyncio.create_task(p) for p in producers]
+        try:
+            await self._score_stream(queue, len(producer_tasks), counts, news_items)
+        finally:
+            for task in producer_tasks:
+                task.cancel()
+
+        now = time.time()
+        for sub, bucket in counts.items():
+            state = self.reddit_counts.get(sub)
+            if state is not None:
+                factor = math.exp(-self.coin_index.decay * max(0.0, now - state[3]))
+                bucket = [old * factor + new for old, new in zip(state, bucket)]
+            self.reddit_counts[sub] = [*bucket, now]
+            positive, neutral, negative = bucket
+            total = positive + neutral + negative
+            self.reddit_sentiment[sub] = {
+                "positive": positive/total,
+                "neutral": neutral/total,
+                "negative": negative/total
+            }
+        self.recent_news.extendleft(reversed(news_items))
+        return dict(self.reddit_sentiment), list(self.recent_news)
+
+    async def _score_stream(self, queue: asyncio.Queue, producers: int, counts: Dict, news_items: List[Dict]) -> None:
+        finished = 0
+        while finished < producers:
+            batch, marks = [], []
+            item = await queue.get()
+            while True:
+                if item is _DONE:
+                    finished += 1
+                elif item[0] is _MARK:
+                    marks.append(item[1:])
+                else:
+                    batch.append(item)
+                if len(batch) >= self.config.sentiment_batch_size or queue.empty():
+                    break
+                item = queue.get_nowait()
+            if not batch:
+                self.high_water.update(marks)
+                continue
+
+            scores = await asyncio.to_thread(self._score_batch, [text for _, text, _ in batch])
+            for (source, text, meta), score in zip(batch, scores):
+                if source == "cryptopanic":
+                    news_items.append({**meta, "sentiment": score})
+                    self._index_text(text, "news", score, meta)
+                else:
+                    bucket = counts.setdefault(source, [0, 0, 0])
+                    bucket[self._classify(score)] += 1
+                    self._index_text(text, "reddit", score, meta)
+            self.high_water.update(marks)
+
+    def _index_text(self, text: str, source: str, score: float, meta: Optional[Dict]) -> None:
+        coins = self.extractor.extract(text) if self.extractor else set()
+        meta = meta or {}
+        coins.update(meta.get("currencies") or ())
+        for coin in coins:
+            self.coin_index.add(coin, source, score, meta.get("timestamp"))
+
+    async def _fetch_subreddit(self, sub: str, queue: asyncio.Queue) -> None:
+        key = f"reddit:{sub}"
         try:
-            for sub in subreddits:
-                subreddit = await self.reddit.subreddit(sub)
-                comments = []
-                async for comment in subreddit.comments(limit=100):
-                    comments.append(comment.body)
-                
-                sentiment = self._analyze_batch(comments)
-                results[sub] = sentiment
+            last_seen = self.high_water.get(key, 0)
+            newest = last_seen
+            subreddit = await self.reddit.subreddit(sub)
+            async for comment in subreddit.comments(limit=self.config.comment_limit):
+                comment_id = int(comment.id, 36)
+                if comment_id <= last_seen:
+                    break
+                newest = max(newest, comment_id)
+                await queue.put((sub, comment.body, {"timestamp": getattr(comment, "created_utc", None)}))
+            await queue.put((_MARK, key, newest))
         except Exception as e:
-            logger.error(f"Błąd Reddit: {str(e)}")
-        return results
+            logger.error(f"Błąd Reddit ({sub}): {str(e)}")
+        finally:
+            await queue.put(_DONE)
+
+    async def _fetch_news(self, queue: asyncio.Queue) -> None:
+        key = "cryptopanic"
+        try:
+            url = "https://cryptopanic.com/api/v1/posts/"
+            params = {
+                "auth_token": self.config.cryptopanic_api_key,
+                "currencies": "BTC,ETH",
+                "kind": "news"
+            }
+            response = await self.http.get(url, params=params)
+            data = response.data or {}
+
+            last_seen = self.high_water.get(key, "")
+            newest = last_seen
+            for item in data.get("results", []):
+                published_at = item.get("published_at") or ""
+                if published_at <= last_seen:
+                    continue
+                newest = max(newest, published_at)
+                meta = self._news_meta(item)
+                await queue.put((key, self._news_text(item), {
+                    **meta,
+                    "currencies": [c.get("code") for c in item.get("currencies") or [] if c.get("code")],
+                    "timestamp": self._parse_time(meta["published_at"])
+                }))
+            await queue.put((_MARK, key, newest))
+        except Exception as e:
+            logger.error(f"Błąd CryptoPanic: {str(e)}")
+        finally:
+            await queue.put(_DONE)
+
+    async def analyze_reddit_comments(self, subreddits: List[str]) -> Dict[str, Dict]:
+        reddit_data, _ = await self.ingest(subreddits, news=False)
+        return {sub: reddit_data[sub] for sub in subreddits if sub in reddit_data}
+
+    @staticmethod
+    def _classify(score: float) -> int:
+        if score > 0.6:
+            return 0
+        if score < 0.4:
+            return 2
+        return 1
 
     def _analyze_batch(self, texts: List[str]) -> Dict[str, float]:
-        positive = neutral = negative = 0
-        for text in texts:
-            score = self._analyze_text(text)
-            if score > 0.6:
-                positive += 1
-            elif score < 0.4:
-                negative += 1
-            else:
-                neutral += 1
+        counts = [0, 0, 0]
+        for score in self._score_batch(texts):
+            counts[self._classify(score)] += 1
+        positive, neutral, negative = counts
         total = positive + neutral + negative
         return {
             "positive": positive/total if total > 0 else 0,
@@ -61,42 +205,56 @@ class SentimentAnalyzer:
             "negative": negative/total if total > 0 else 0
         }
 
-    def _analyze_text(self, text: str) -> float:
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
+    @timed('score_batch')
+    def _score_batch(self, texts: List[str]) -> List[float]:
+        if not texts:
+            return []
+        inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, max_length=512, padding=True)
         with torch.no_grad():
-            outputs = self.model(**inputs)
-        return torch.sigmoid(outputs.logits).item()
+            logits = self.model(**inputs).logits
+        if logits.shape[-1] == 1:
+            scores = torch.sigmoid(logits).squeeze(-1)
+        else:
+            # Prawdopodobieństwo ostatniej (pozytywnej) klasy
+            scores = torch.softmax(logits, dim=-1)[:, -1]
+        return scores.tolist()
+
+    @timed('analyze_text')
+    def _analyze_text(self, text: str) -> float:
+        return self._score_batch([text])[0]
 
     async def analyze_cryptopanic_news(self) -> List[Dict]:
+        _, news_data = await self.ingest([], news=True)
+        return news_data
+
+    @staticmethod
+    def _parse_time(value: Optional[str]) -> float:
         try:
-            url = "https://cryptopanic.com/api/v1/posts/"
-            params = {
-                "auth_token": self.config.cryptopanic_api_key,
-                "currencies": "BTC,ETH",
-                "kind": "news"
-            }
-            async with self.session.get(url, params=params) as response:
-                data = await response.json()
-                return self._process_news(data.get("results", []))
-        except Exception as e:
-            logger.error(f"Błąd CryptoPanic: {str(e)}")
-            return []
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except (AttributeError, ValueError):
+            return time.time()
+
+    @staticmethod
+    def _news_text(item: Dict) -> str:
+        return (item.get("title") or "") + " " + (item.get("description") or "")
+
+    @staticmethod
+    def _news_meta(item: Dict) -> Dict:
+        return {
+            "title": item.get("title"),
+            "url": item.get("url"),
+            "source": (item.get("source") or {}).get("title"),
+            "published_at": item.get("published_at")
+        }
 
     def _process_news(self, news: List[Dict]) -> List[Dict]:
-        processed = []
-        for item in news:
-            sentiment = self._analyze_text(item.get("title", "") + " " + item.get("description", ""))
-            processed.append({
-                "title": item.get("title"),
-                "url": item.get("url"),
-                "source": item.get("source", {}).get("title"),
-                "published_at": item.get("published_at"),
-                "sentiment": sentiment
-            })
-        return processed
+        scores = self._score_batch([self._news_text(item) for item in news])
+        return [
+            {**self._news_meta(item), "sentiment": score}
+            for item, score in zip(news, scores)
+        ]
 
     async def close(self):
-        if self.session:
-            await self.session.close()
+        # Sesja HTTP należy do wspólnej puli procesu i jest zamykana razem z nią
         if self.reddit:
-            await self.reddit.close()
\ No newline at end of file
+            await self.reddit.close()
@@ -0,0 +1,193 @@
+# service.py
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from config import load_config
+from scheduler import AnalysisScheduler
+from snapshot_store import format_top
+from startup import StartupProfiler, import_costs, initialize_components
+from http_pool import close_http_pool
+from metrics import start_metrics_server
+from logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+class TradingService:
+    """Tryb bezobsługowy (serwerowy) - pełny potok analizy na czystej pętli asyncio."""
+
+    def __init__(self, config):
+        self.config = config
+        self.api_handler = None
+        self.binance_client = None
+        self.ticker_cache = None
+        self.reddit_client = None
+        self.analyzer = None
+        self.optimizer = None
+        self.risk_manager = None
+        self.journal = None
+        self.http_pool = None
+        self.notifier = None
+        self.order_books = None
+        self.snapshots = None
+        self.metrics_server = None
+        self.scheduler = None
+        self.profiler = StartupProfiler()
+
+    async def initialize(self):
+        components = await initialize_components(self.config, self.profiler)
+        for name, component in components.items():
+            setattr(self, name, component)
+        await self.start_metrics_server()
+
+    async def start_metrics_server(self):
+        if self.config.metrics_enabled and self.config.metrics_port:
+            self.metrics_server = await start_metrics_server(
+                self.config.metrics_host,
+                self.config.metrics_port
+            )
+
+    def _on_cycle_report(self, report: Dict):
+        if 'first_analysis' not in self.profiler.milestones:
+            self.profiler.mark("first_analysis")
+            logger.info(f"Profil startu: {self.profiler.report()}")
+        if 'error' in report:
+            logger.error(f"Cykl {report['cycle']} zakończony błędem: {report['error']}")
+            return
+        logger.info(
+            f"Cykl {report['cycle']}: {report['symbols']} symboli, "
+            f"{len(report['orders'])} zleceń, {report['duration']:.1f}s"
+        )
+        if self.snapshots is not None and 'snapshot_cycle' in report:
+            top = format_top(self.snapshots.cycle(report['snapshot_cycle']))
+            logger.info(f"Migawka {report['snapshot_cycle']}: {top}")
+
+    def stop(self):
+        logger.info("Zatrzymywanie usługi...")
+        if self.scheduler:
+            self.scheduler.stop()
+
+    def _install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    async def run(self, once: bool = False):
+        try:
+            await self.initialize()
+            self.scheduler = self.create_scheduler()
+            if once:
+                self._on_cycle_report({'cycle': 0, **await self._run_once()})
+                return
+            self._install_signal_handlers()
+            await self.scheduler.run()
+        finally:
+            await self.close()
+
+    def create_scheduler(self) -> AnalysisScheduler:
+        return AnalysisScheduler(
+            self.analyzer,
+            self.optimizer,
+            self.config,
+            reporter=self._on_cycle_report,
+            snapshots=self.snapshots
+        )
+
+    async def _run_once(self) -> Dict:
+        started = asyncio.get_running_loop().time()
+        result = await self.scheduler.run_cycle()
+        result['duration'] = asyncio.get_running_loop().time() - started
+        return result
+
+    async def close(self):
+        if self.reddit_client:
+            await self.reddit_client.__aexit__(None, None, None)
+        if self.journal:
+            self.journal.close()
+        if self.notifier:
+            await self.notifier.close()
+        if self.order_books:
+            await self.order_books.close()
+        if self.analyzer:
+            self.analyzer.close()
+        if self.snapshots:
+            self.snapshots.close()
+        if self.metrics_server:
+            await self.metrics_server.cleanup()
+        if self.http_pool:
+            logger.info(f"Statystyki HTTP: {self.http_pool.stats}")
+        await close_http_pool()
+
+def measure_startup(module: str) -> Dict:
+    """Zimny start w osobnym procesie: czas importu i szczytowe RSS."""
+    code = (
+        "import json, resource, sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps({'seconds': time.perf_counter() - t, "
+        "'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "
+        "'modules': len(sys.modules), "
+        "'qt': 'PySide6' in sys.modules, 'tkinter': 'tkinter' in sys.modules, "
+        "'torch': 'torch' in sys.modules}))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()
+        return {'module': module, 'error': error[-1] if error else f"kod {proc.returncode}"}
+    return {'module': module, **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+def startup_report(modules: Optional[List[str]] = None) -> List[Dict]:
+    return [measure_startup(m) for m in (modules or ["service", "main", "gui"])]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Crypto Trading Bot - tryb bezobsługowy")
+    parser.add_argument("--mode", choices=["test", "prod"], default=None)
+    parser.add_argument("--log-config", default="logging_config.ini")
+    parser.add_argument("--once", action="store_true", help="Wykonaj jeden cykl i zakończ")
+    parser.add_argument("--accounts", default=None, help="Plik JSON z listą subkont (tryb wielokontowy)")
+    parser.add_argument(
+        "--measure-startup",
+        action="store_true",
+        help="Porównaj czas zimnego startu i RSS ze ścieżką GUI, pokaż koszt importów"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.measure_startup:
+        print(json.dumps({
+            'startup': startup_report(),
+            'import_costs': import_costs("service")
+        }, indent=2))
+        return
+
+    setup_logging(args.log_config)
+
+    load_dotenv()
+    config = load_config()
+    if args.mode:
+        config.mode = args.mode
+    accounts_path = args.accounts or config.accounts_path
+    if accounts_path:
+        from accounts import MultiAccountService, load_account_configs
+        service = MultiAccountService(config, load_account_configs(accounts_path, config))
+    else:
+        service = TradingService(config)
+    asyncio.run(service.run(once=args.once))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# shared_limiter.py
+import logging
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Sequence
+import numpy as np
+from metrics import metrics
+from utils import DynamicRateLimiter
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Klasy priorytetu: niższy indeks wygrywa
+PRIORITIES = ('order', 'default', 'bulk')
+# Część budżetu dostępna dla klasy - zapas ponad udział zostaje dla wyższych klas
+DEFAULT_SHARES = (1.0, 0.8, 0.5)
+
+_MAGIC = 0x524C4D31  # "RLM1"
+_HEADER = np.dtype([
+    ('magic', '<u4'),
+    ('window', '<u4'),
+    ('server_minute', '<i8'),
+    ('server_weight', '<f8'),
+    ('waiting', '<f8', (len(PRIORITIES),))
+])
+_BUCKET = np.dtype([('second', '<i8'), ('weight', '<f8')])
+
+# Wagi REST endpointów pobierających dane rynkowe
+TICKER_24H_ALL_WEIGHT = 80
+KLINES_WEIGHT = 2
+EXCHANGE_INFO_WEIGHT = 20
+
+def depth_weight(limit: int) -> int:
+    """Waga REST migawki książki zleceń (GET /api/v3/depth) dla danego limitu."""
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+class SharedRateLimiter:
+    """
+    Budżet wagi REST wspólny dla wszystkich procesów bota na hoście (ten sam klucz/IP):
+    kubełki sekundowe przesuwnego okna w pliku mapowanym w pamięć, zmiany pod blokadą
+    pliku. Zużycie zgłaszane przez giełdę (X-MBX-USED-WEIGHT-1M) podnosi licznik, więc
+    wywołania spoza limitera też się liczą.
+
+    Priorytety: klasa może zużyć tylko swój udział budżetu, a czekająca wyższa klasa
+    wstrzymuje niższe - zlecenia nie stoją w kolejce za uzupełnianiem historii.
+    Znacznik oczekiwania wygasa sam, więc proces zabity w trakcie czekania nie blokuje innych.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_weight: int = 1200,
+        window_seconds: int = 60,
+        shares: Sequence[float] = DEFAULT_SHARES,
+        poll: float = 0.05,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        if len(shares) != len(PRIORITIES):
+            raise ValueError(f"Oczekiwano {len(PRIORITIES)} udziałów, otrzymano {len(shares)}")
+        self.path = path
+        self.max_weight = max_weight
+        self.window = int(window_seconds)
+        self.shares = tuple(shares)
+        self.poll = poll
+        self.clock = clock
+        self.sleep = sleep
+        self._size = _HEADER.itemsize + _BUCKET.itemsize * self.window
+        # flock wyklucza procesy, nie wątki dzielące ten sam deskryptor
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size < self._size:
+                os.ftruncate(self._fd, self._size)
+        self._mmap = mmap.mmap(self._fd, self._size)
+        self._header = np.ndarray((), dtype=_HEADER, buffer=self._mmap)
+        self._buckets = np.ndarray((self.window,), dtype=_BUCKET, buffer=self._mmap, offset=_HEADER.itemsize)
+        with self._locked():
+            if self._header['magic'] != _MAGIC or self._header['window'] != self.window:
+                # Nowy plik albo inne okno - stan od zera
+                self._mmap[:] = bytes(self._size)
+                self._header['magic'] = _MAGIC
+                self._header['window'] = self.window
+
+    @contextmanager
+    def _locked(self):
+        # Mapowanie MAP_SHARED jest spójne między procesami - bez msync przy każdej zmianie
+        with self._thread_lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def _used(self, now: float) -> float:
+        second = int(now)
+        buckets = self._buckets
+        local = float(buckets['weight'][buckets['second'] > second - self.window].sum())
+        server = 0.0
+        if self._header['server_minute'] == second // 60:
+            server = float(self._header['server_weight'])
+        # Waga z nagłówka zawiera już wywołania policzone lokalnie
+        return max(local, server)
+
+    def _try_acquire(self, weight: float, rank: int) -> bool:
+        with self._locked():
+            now = self.clock()
+            waiting = self._header['waiting']
+            if (waiting[:rank] > now).any() or self._used(now) + weight > self.max_weight * self.shares[rank]:
+                # Znacznik odnawiany przy każdej próbie, wygasa po kilku okresach bez odnowienia
+                waiting[rank] = max(waiting[rank], now + 4 * self.poll)
+                return False
+            # Inne procesy tej klasy odnowią znacznik przy następnej próbie
+            waiting[rank] = 0.0
+            second = int(now)
+            slot = self._buckets[second % self.window]
+            if slot['second'] != second:
+                slot['second'] = second
+                slot['weight'] = 0.0
+            slot['weight'] += weight
+            return True
+
+    def wait(self, weight: int = 1, priority: str = 'default') -> float:
+        """Blokuje do zwolnienia budżetu `weight`; zwraca czas oczekiwania w sekundach."""
+        rank = PRIORITIES.index(priority)
+        # Pojedyncze wywołanie cięższe niż udział klasy i tak musi przejść
+        weight = min(weight, self.max_weight * self.shares[rank])
+        started = self.clock()
+        with metrics.timer('rate_limiter_wait_seconds', priority=priority):
+            if self._try_acquire(weight, rank):
+                return 0.0
+            while not self._try_acquire(weight, rank):
+                self.sleep(self.poll)
+        waited = self.clock() - started
+        if waited > 0:
+            logger.info("Oczekiwanie na budżet REST (%s): %.2fs", priority, waited)
+        return waited
+
+    def observe_used_weight(self, used: int) -> None:
+        """Zużycie minutowe zgłoszone przez giełdę - wspólne dla wszystkich procesów."""
+        with self._locked():
+            minute = int(self.clock()) // 60
+            header = self._header
+            if header['server_minute'] != minute:
+                header['server_minute'] = minute
+                header['server_weight'] = used
+            else:
+                header['server_weight'] = max(float(header['server_weight']), used)
+
+    def usage(self) -> Dict:
+        with self._locked():
+            now = self.clock()
+            return {
+                'used': self._used(now),
+                'max_weight': self.max_weight,
+                'waiting': [p for p, until in zip(PRIORITIES, self._header['waiting']) if until > now]
+            }
+
+    def close(self) -> None:
+        if self._mmap is None:
+            return
+        # Widoki numpy trzymają bufor mmap - muszą zniknąć przed zamknięciem
+        self._header = self._buckets = None
+        self._mmap.close()
+        self._mmap = None
+        os.close(self._fd)
+
+def create_rate_limiter(config):
+    """Limiter wspólny między procesami, gdy ustawiono rate_limit_path; inaczej lokalny."""
+    if config.rate_limit_path:
+        return SharedRateLimiter(
+            config.rate_limit_path,
+            max_weight=config.rate_limit_weight,
+            window_seconds=config.rate_limit_window
+        )
+    return DynamicRateLimiter(
+        max_calls=config.api_rate_limit,
+        window_seconds=config.api_rate_window
+    )
+
+def throttle(limiter, weight: int, priority: str = 'default') -> None:
+    """
+    Oczekiwanie na wagę ciężkiego zapytania o dane rynkowe. Tylko limiter wspólny
+    liczy wagę - lokalny DynamicRateLimiter (wywołania na okno) chroni ścieżkę zleceń
+    i zablokowałby pobieranie setek świec.
+    """
+    if hasattr(limiter, 'observe_used_weight'):
+        limiter.wait(weight, priority)
+
+def observe_session(limiter, session) -> None:
+    """Hook odpowiedzi: zużycie wagi z nagłówka trafia do limitera współdzielonego."""
+    if not hasattr(limiter, 'observe_used_weight'):
+        return
+
+    def on_response(response, *args, **kwargs):
+        weight = response.headers.get('x-mbx-used-weight-1m')
+        if weight is not None and weight.isdigit():
+            limiter.observe_used_weight(int(weight))
+        return response
+
+    session.hooks.setdefault('response', []).append(on_response)
@@ -0,0 +1,215 @@
+# snapshot_store.py
+import argparse
+import glob
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DTYPE = np.dtype([
+    ('cycle', '<i8'),
+    ('ts', '<f8'),
+    ('symbol', 'S20'),
+    ('price', '<f8'),
+    ('score', '<f8'),
+    ('rsi', '<f4'),
+    ('macd', '<f4'),
+    ('adx', '<f4'),
+    ('bb_percent', '<f4'),
+    ('trend', '<f4'),
+    ('reddit_sentiment', '<f4'),
+    ('news_sentiment', '<f4')
+])
+_SYMBOL_BYTES = SNAPSHOT_DTYPE['symbol'].itemsize
+_VALUE_COLUMNS = [name for name in SNAPSHOT_DTYPE.names if name not in ('cycle', 'ts', 'symbol', 'trend')]
+
+def _day(ts: float) -> str:
+    return time.strftime('%Y%m%d', time.gmtime(ts))
+
+class SnapshotStore:
+    """
+    Wyniki analizy każdego cyklu jako szereg czasowy: rekordy stałej długości
+    dopisywane do pliku dnia (UTC), czytane przez np.memmap bez kopiowania.
+    Numer cyklu nadaje magazyn i jest ciągły między uruchomieniami.
+    """
+
+    def __init__(self, directory: str, retention_days: int = 30):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self._maps: Dict[str, np.ndarray] = {}
+        os.makedirs(directory, exist_ok=True)
+        self.last_cycle: Optional[int] = None
+        for path in reversed(self._files()):
+            records = self._records(path, repair=True)
+            if len(records):
+                self.last_cycle = int(records['cycle'][-1])
+                break
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, f"analysis-{day}.bin")
+
+    def _files(self, start: Optional[float] = None, end: Optional[float] = None) -> List[str]:
+        files = sorted(glob.glob(os.path.join(self.directory, 'analysis-*.bin')))
+        if start is not None:
+            files = [f for f in files if self._path(_day(start)) <= f]
+        if end is not None:
+            files = [f for f in files if f <= self._path(_day(end))]
+        return files
+
+    def _records(self, path: str, repair: bool = False) -> np.ndarray:
+        size = os.path.getsize(path)
+        extra = size % SNAPSHOT_DTYPE.itemsize
+        if extra:
+            # Zapis w toku albo niedokończony po awarii; przy otwarciu magazynu obcinany,
+            # żeby kolejne rekordy zaczynały się na granicy
+            size -= extra
+            if repair:
+                logger.warning("Obcięto niepełny rekord w %s", path)
+                os.truncate(path, size)
+        count = size // SNAPSHOT_DTYPE.itemsize
+        cached = self._maps.get(path)
+        if cached is not None and len(cached) == count:
+            return cached
+        if not count:
+            return np.empty(0, dtype=SNAPSHOT_DTYPE)
+        records = np.memmap(path, dtype=SNAPSHOT_DTYPE, mode='r', shape=(count,))
+        self._maps[path] = records
+        return records
+
+    def append(self, results: pd.DataFrame, ts: Optional[float] = None) -> int:
+        """Dopisuje wyniki cyklu (wszystkie przeanalizowane symbole); zwraca numer cyklu."""
+        ts = time.time() if ts is None else ts
+        # Symbole w UTF-8 (giełda ma też nazwy spoza ASCII); za długie nie mieszczą się w rekordzie
+        symbols = [str(s).encode('utf-8') for s in results['symbol']] if len(results) else []
+        fits = np.fromiter((len(s) <= _SYMBOL_BYTES for s in symbols), dtype=bool, count=len(symbols))
+        if not fits.all():
+            logger.warning(
+                "Pominięto symbole dłuższe niż %d bajtów: %s",
+                _SYMBOL_BYTES, [s.decode('utf-8') for s, ok in zip(symbols, fits) if not ok]
+            )
+            results = results[fits]
+            symbols = [s for s, ok in zip(symbols, fits) if ok]
+        records = np.zeros(len(results), dtype=SNAPSHOT_DTYPE)
+        records['ts'] = ts
+        if len(results):
+            records['symbol'] = symbols
+        for name in _VALUE_COLUMNS:
+            records[name] = results[name].to_numpy(dtype=float) if name in results else np.nan
+        trends = [c for c in results.columns if c.startswith('trend_')]
+        records['trend'] = results[trends].mean(axis=1).to_numpy(dtype=float) if trends else np.nan
+
+        with self.lock:
+            cycle = 0 if self.last_cycle is None else self.last_cycle + 1
+            records['cycle'] = cycle
+            path = self._path(_day(ts))
+            new_day = not os.path.exists(path)
+            with open(path, 'ab') as f:
+                f.write(records.tobytes())
+            self.last_cycle = cycle
+            if new_day:
+                self._prune(ts)
+        return cycle
+
+    def _prune(self, now: float) -> None:
+        oldest = self._path(_day(now - self.retention_days * 86400))
+        for path in self._files():
+            if path < oldest:
+                self._maps.pop(path, None)
+                os.remove(path)
+                logger.info("Usunięto stare migawki analizy: %s", path)
+
+    @staticmethod
+    def frame(records: np.ndarray) -> pd.DataFrame:
+        # Kopia - ramka nie trzyma mapowania pliku
+        data = {name: np.array(records[name]) for name in SNAPSHOT_DTYPE.names}
+        data['symbol'] = np.char.decode(data['symbol'], 'utf-8')
+        return pd.DataFrame(data)
+
+    def cycle(self, number: Optional[int] = None) -> pd.DataFrame:
+        """Wiersze cyklu `number` (domyślnie ostatniego)."""
+        number = self.last_cycle if number is None else number
+        if number is not None:
+            for path in reversed(self._files()):
+                records = self._records(path)
+                if not len(records) or records['cycle'][0] > number:
+                    continue
+                if records['cycle'][-1] < number:
+                    break
+                cycles = records['cycle']
+                lo, hi = np.searchsorted(cycles, number), np.searchsorted(cycles, number, side='right')
+                return self.frame(records[lo:hi])
+        return self.frame(np.empty(0, dtype=SNAPSHOT_DTYPE))
+
+    def latest(self, max_age: float = 86400, now: Optional[float] = None) -> pd.DataFrame:
+        """Najnowszy wiersz każdego symbolu z ostatnich `max_age` sekund, od najwyższego score."""
+        cutoff = (time.time() if now is None else now) - max_age
+        parts = []
+        for path in reversed(self._files(start=cutoff)):
+            records = self._records(path)
+            if not len(records):
+                continue
+            parts.append(records[records['ts'] >= cutoff])
+            if records['ts'][0] < cutoff:
+                break
+        if not parts:
+            return self.frame(np.empty(0, dtype=SNAPSHOT_DTYPE))
+        newest_first = np.concatenate(parts[::-1])[::-1]
+        _, first = np.unique(newest_first['symbol'], return_index=True)
+        rows = newest_first[first]
+        return self.frame(rows[np.argsort(-rows['score'], kind='stable')]).reset_index(drop=True)
+
+    def history(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> pd.DataFrame:
+        """Wiersze symbolu w kolejności cykli, opcjonalnie w przedziale czasu [start, end]."""
+        key = symbol.encode('utf-8')
+        parts = []
+        for path in self._files(start, end):
+            records = self._records(path)
+            mask = records['symbol'] == key
+            if start is not None:
+                mask &= records['ts'] >= start
+            if end is not None:
+                mask &= records['ts'] <= end
+            parts.append(records[mask])
+        if not parts:
+            return self.frame(np.empty(0, dtype=SNAPSHOT_DTYPE))
+        return self.frame(np.concatenate(parts))
+
+    def close(self) -> None:
+        with self.lock:
+            self._maps.clear()
+
+def format_top(df: pd.DataFrame, count: int = 3) -> str:
+    """'BTCUSDT 0.812, ETHUSDT 0.774' - najlepsze symbole wiersza raportu."""
+    top = df.nlargest(count, 'score')
+    return ", ".join(f"{symbol} {score:.3f}" for symbol, score in zip(top['symbol'], top['score']))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Zapytania do migawek analizy rynku")
+    parser.add_argument('--dir', default='snapshots')
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument('--latest', action='store_true', help="najnowszy wiersz każdego symbolu")
+    query.add_argument('--symbol', help="historia symbolu")
+    query.add_argument('--cycle', type=int, help="wyniki cyklu o numerze N")
+    parser.add_argument('--hours', type=float, default=24.0, help="zakres czasu dla --latest/--symbol")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.dir)
+    if args.symbol:
+        df = store.history(args.symbol, start=time.time() - args.hours * 3600)
+    elif args.cycle is not None:
+        df = store.cycle(args.cycle)
+    elif args.latest:
+        df = store.latest(max_age=args.hours * 3600)
+    else:
+        df = store.cycle()
+    df['ts'] = pd.to_datetime(df['ts'], unit='s', utc=True)
+    print(df.to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# startup.py
+import asyncio
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+from exchange import BinanceAPIHandler, TickerCache
+from analyzer import CryptoAnalyzer
+from optimizer import PortfolioOptimizer
+from risk_manager import RiskManager
+from state_journal import StateJournal
+from http_pool import get_http_pool
+from telegram_handler import TelegramNotifier
+from order_book import OrderBookManager
+from snapshot_store import SnapshotStore
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\| (\s*)(\S+)")
+
+class StartupProfiler:
+    """Czasy faz inicjalizacji i kamienie milowe liczone od startu procesu."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.milestones: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    async def timed(self, name: str, awaitable: Awaitable):
+        with self.phase(name):
+            return await awaitable
+
+    def mark(self, name: str) -> None:
+        if name not in self.milestones:
+            self.milestones[name] = time.perf_counter() - self.started
+
+    def report(self) -> Dict:
+        return {
+            'phases': {k: round(v, 4) for k, v in self.phases.items()},
+            'milestones': {k: round(v, 4) for k, v in self.milestones.items()}
+        }
+
+def import_costs(module: str = "service", top: int = 20) -> List[Dict]:
+    """Koszt importu per pakiet najwyższego poziomu (python -X importtime)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    self_us = defaultdict(int)
+    cumulative_us = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, _, name = match.groups()
+        package = name.split('.')[0]
+        self_us[package] += int(own)
+        if name == package:
+            cumulative_us[package] = max(cumulative_us.get(package, 0), int(cumulative))
+    costs = [
+        {'package': package, 'self_ms': us / 1000, 'cumulative_ms': cumulative_us.get(package, 0) / 1000}
+        for package, us in self_us.items()
+    ]
+    return sorted(costs, key=lambda c: c['self_ms'], reverse=True)[:top]
+
+async def create_reddit_client(config):
+    if not config.enable_news or config.mode == "test":
+        return None
+
+    try:
+        import asyncpraw
+        return await asyncpraw.Reddit(
+            client_id=os.getenv("REDDIT_CLIENT_ID"),
+            client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
+            user_agent="crypto-bot/1.0",
+            timeout=config.reddit_timeout
+        ).__aenter__()
+    except Exception as e:
+        logger.error(f"Błąd połączenia Reddit: {str(e)}")
+        return None
+
+def load_sentiment_model(config):
+    if not config.enable_news or config.simulation_mode:
+        return None
+    from sentiment import SentimentAnalyzer
+    return SentimentAnalyzer(config)
+
+def build_account(
+    config,
+    analyzer,
+    client,
+    http_pool,
+    order_books=None,
+    profiler: Optional[StartupProfiler] = None
+) -> Dict:
+    """Komponenty jednego konta: optymalizator, menedżer ryzyka z dziennikiem stanu, powiadomienia."""
+    profiler = profiler or StartupProfiler()
+    optimizer = PortfolioOptimizer(
+        client=client,
+        analyzer=analyzer,
+        config=config
+    )
+    with profiler.phase("state_restore"):
+        journal = StateJournal(
+            config.state_journal_path,
+            snapshot_every=config.journal_snapshot_every
+        )
+        risk_manager = RiskManager(
+            optimizer=optimizer,
+            analyzer=analyzer,
+            config=config,
+            journal=journal
+        )
+        risk_manager.restore()
+        optimizer.set_risk_manager(risk_manager)
+
+    notifier = None
+    if config.telegram_token and config.telegram_chat_id:
+        notifier = TelegramNotifier(config, http_pool=http_pool)
+        notifier.start()
+        optimizer.set_notifier(notifier)
+
+    if order_books is not None:
+        optimizer.set_order_books(order_books)
+    return {
+        'optimizer': optimizer,
+        'risk_manager': risk_manager,
+        'journal': journal,
+        'notifier': notifier
+    }
+
+async def initialize_components(
+    config,
+    profiler: Optional[StartupProfiler] = None,
+    status: Optional[Callable[[str, int], Awaitable]] = None,
+    account: bool = True
+) -> Dict:
+    """
+    Buduje komponenty bota. Niezależne kroki (synchronizacja czasu, exchangeInfo,
+    logowanie do Reddit, ładowanie modelu) wykonywane są współbieżnie.
+    `account=False` - tylko wspólna warstwa rynkowa (konta buduje build_account).
+    """
+    profiler = profiler or StartupProfiler()
+    metrics.configure(config.metrics_enabled, config.metrics_span_history)
+    http_pool = get_http_pool(config)
+
+    async def report(text: str, progress: int):
+        if status:
+            await status(text, progress)
+
+    async def binance_setup():
+        api_handler = await profiler.timed(
+            "binance_client",
+            asyncio.to_thread(BinanceAPIHandler, config, False)
+        )
+        await report("Synchronizacja czasu i listy symboli...", 40)
+        ticker_cache = TickerCache(api_handler)
+        await asyncio.gather(
+            profiler.timed("time_sync", asyncio.to_thread(api_handler._synchronize_time)),
+            profiler.timed("exchange_info", asyncio.to_thread(ticker_cache.refresh_symbols))
+        )
+        return api_handler, ticker_cache
+
+    await report("Inicjalizacja klienta Binance, Reddit i modelu...", 10)
+    with profiler.phase("initialize_components"):
+        (api_handler, ticker_cache), reddit_client, sentiment_analyzer = await asyncio.gather(
+            binance_setup(),
+            profiler.timed("reddit_auth", create_reddit_client(config)),
+            profiler.timed("model_load", asyncio.to_thread(load_sentiment_model, config))
+        )
+
+        await report("Inicjalizacja analizatora...", 60)
+        with profiler.phase("components"):
+            analyzer = CryptoAnalyzer(
+                binance_client=api_handler.client,
+                reddit=reddit_client,
+                ticker_cache=ticker_cache,
+                config=config,
+                api_handler=api_handler,
+                cryptopanic_api_key=os.getenv("CRYPTOPANIC_API_KEY"),
+                sentiment_analyzer=sentiment_analyzer
+            )
+
+        order_books = None
+        if config.order_book_enabled:
+            order_books = OrderBookManager(config, limiter=api_handler.limiter)
+        snapshots = None
+        if config.snapshot_dir:
+            snapshots = SnapshotStore(config.snapshot_dir, config.snapshot_retention_days)
+
+        components = {}
+        if account:
+            await report("Inicjalizacja menedżera ryzyka...", 80)
+            components = build_account(config, analyzer, api_handler.client, http_pool, order_books, profiler)
+
+    profiler.mark("initialized")
+    logger.info(f"Profil startu: {profiler.report()}")
+    return {
+        'api_handler': api_handler,
+        'binance_client': api_handler.client,
+        'ticker_cache': ticker_cache,
+        'reddit_client': reddit_client,
+        'analyzer': analyzer,
+        'http_pool': http_pool,
+        'order_books': order_books,
+        'snapshots': snapshots,
+        **components
+    }
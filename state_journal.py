@@ -0,0 +1,157 @@
+# state_journal.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class StateJournal:
+    """Dziennik stanu (append-only, SQLite WAL) z okresowymi migawkami."""
+
+    def __init__(self, path: str = "state.db", snapshot_every: int = 500):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                last_event_id INTEGER NOT NULL,
+                state TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fills (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                symbol TEXT NOT NULL,
+                side TEXT NOT NULL,
+                quantity TEXT NOT NULL,
+                price TEXT NOT NULL,
+                reason TEXT
+            );
+        """)
+        self.state = self._empty_state()
+        self.last_event_id = 0
+        self.events_since_snapshot = 0
+
+    @staticmethod
+    def _empty_state() -> Dict[str, Any]:
+        return {'positions': {}, 'initial_balance': None, 'current_balance': None}
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], kind: str, payload: Dict[str, Any]) -> None:
+        if kind == 'position':
+            state['positions'][payload['symbol']] = {
+                'quantity': payload['quantity'],
+                'entry_price': payload['entry_price']
+            }
+        elif kind == 'close':
+            state['positions'].pop(payload['symbol'], None)
+        elif kind == 'balance':
+            state['initial_balance'] = payload.get('initial_balance', state['initial_balance'])
+            state['current_balance'] = payload.get('current_balance', state['current_balance'])
+
+    def load(self) -> Dict[str, Any]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_event_id, state FROM snapshots ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+            state = json.loads(row[1]) if row else self._empty_state()
+            last_event_id = row[0] if row else 0
+
+            events = self.conn.execute(
+                "SELECT id, kind, payload FROM events WHERE id > ? ORDER BY id",
+                (last_event_id,)
+            ).fetchall()
+            for event_id, kind, payload in events:
+                self._apply(state, kind, json.loads(payload))
+                last_event_id = event_id
+
+            self.state = state
+            self.last_event_id = last_event_id
+            self.events_since_snapshot = len(events)
+        logger.info(f"Odtworzono stan: {len(state['positions'])} pozycji, {len(events)} zdarzeń po migawce")
+        return state
+
+    def _append(self, kind: str, payload: Dict[str, Any]) -> None:
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO events (ts, kind, payload) VALUES (?, ?, ?)",
+                (time.time(), kind, json.dumps(payload))
+            )
+            self.last_event_id = cursor.lastrowid
+            self._apply(self.state, kind, payload)
+            self.events_since_snapshot += 1
+            if self.events_since_snapshot >= self.snapshot_every:
+                self._snapshot()
+
+    def _snapshot(self) -> None:
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.execute(
+                "INSERT INTO snapshots (ts, last_event_id, state) VALUES (?, ?, ?)",
+                (time.time(), self.last_event_id, json.dumps(self.state))
+            )
+            # Kompaktowanie - zdarzenia zawarte w migawce nie są już potrzebne
+            self.conn.execute("DELETE FROM events WHERE id <= ?", (self.last_event_id,))
+            self.conn.execute(
+                "DELETE FROM snapshots WHERE id < (SELECT MAX(id) FROM snapshots)"
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.events_since_snapshot = 0
+
+    def snapshot(self) -> None:
+        with self.lock:
+            self._snapshot()
+
+    def record_position(self, symbol: str, quantity, entry_price) -> None:
+        self._append('position', {
+            'symbol': symbol,
+            'quantity': str(quantity),
+            'entry_price': str(entry_price)
+        })
+
+    def record_close(self, symbol: str) -> None:
+        self._append('close', {'symbol': symbol})
+
+    def record_balance(self, initial_balance: Optional[float] = None, current_balance: Optional[float] = None) -> None:
+        payload = {}
+        if initial_balance is not None:
+            payload['initial_balance'] = initial_balance
+        if current_balance is not None:
+            payload['current_balance'] = current_balance
+        self._append('balance', payload)
+
+    def record_fill(self, order: Dict) -> None:
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO fills (ts, symbol, side, quantity, price, reason) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(),
+                    order['symbol'],
+                    order['side'],
+                    str(order['quantity']),
+                    str(order.get('price')),
+                    order.get('type')
+                )
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            if self.events_since_snapshot:
+                self._snapshot()
+            self.conn.close()
@@ -0,0 +1,174 @@
+# stream_supervisor.py
+import asyncio
+import logging
+import random
+import time
+from typing import AsyncContextManager, Awaitable, Callable, Dict, Iterable, List, Optional
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class StreamStalled(Exception):
+    """Połączenie otwarte, ale bez wiadomości dłużej niż stall_timeout."""
+
+class StreamSupervisor:
+    """
+    Nadzór nad jednym połączeniem WebSocket (pojedynczy strumień albo multiplex):
+    - heartbeat co `heartbeat_interval`: wiek ostatniej wiadomości całego połączenia
+      i każdego strumienia osobno (metryka ws_message_age_seconds),
+    - cisza połączenia > `stall_timeout` -> zerwanie i ponowne połączenie,
+    - cisza jednego strumienia > `stream_stall_timeout` -> uzupełnienie przez REST bez
+      zrywania połączenia,
+    - ponowne połączenia bez limitu prób, z pełnym jitterem (do `max_backoff`),
+    - po ponownym połączeniu `backfill(strumienie, od_ms, do_ms)` dokładnie dla okna przerwy
+      każdego strumienia (od czasu ostatniego zdarzenia do czasu pierwszego nowego).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], AsyncContextManager],
+        on_message: Callable[[Dict], None],
+        streams: Iterable[str] = (),
+        backfill: Optional[Callable[[List[str], int, int], Awaitable]] = None,
+        heartbeat_interval: float = 5.0,
+        stall_timeout: float = 30.0,
+        stream_stall_timeout: Optional[float] = None,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+        time_offset: Optional[Callable[[], int]] = None
+    ):
+        self.name = name
+        self.connect = connect
+        self.on_message = on_message
+        self.streams = list(streams)
+        self.backfill = backfill
+        self.heartbeat_interval = heartbeat_interval
+        self.stall_timeout = stall_timeout
+        self.stream_stall_timeout = stream_stall_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        # Różnica czasu giełdy i lokalnego (ms), np. BinanceAPIHandler.time_offset
+        self.time_offset = time_offset
+        self.running = False
+        self.stats = {
+            'connects': 0,
+            'reconnects': 0,
+            'messages': 0,
+            'stalls': 0,
+            'stream_stalls': 0,
+            'errors': 0,
+            'backfills': 0
+        }
+        # Czas ostatniego zdarzenia (ms, zawsze czas giełdy) per strumień
+        self.last_event: Dict[str, int] = {}
+        self._last_message = 0.0
+        self._last_heartbeat = 0.0
+        self._attempt = 0
+
+    def _now_ms(self) -> int:
+        """Bieżący czas giełdy - ten sam zegar co pole 'E' zdarzeń."""
+        offset = self.time_offset() if self.time_offset is not None else 0
+        return int(self.clock() * 1000) + offset
+
+    def delay(self, attempt: int) -> float:
+        # Pełny jitter: klienci po awarii giełdy nie łączą się jednocześnie
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def run(self) -> None:
+        self.running = True
+        while self.running:
+            try:
+                await self._session()
+            except asyncio.CancelledError:
+                raise
+            except StreamStalled as e:
+                self.stats['stalls'] += 1
+                logger.warning("Strumień %s: %s, ponowne połączenie", self.name, e)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error("Błąd strumienia %s: %s", self.name, e)
+            if not self.running:
+                break
+            delay = self.delay(self._attempt)
+            self._attempt += 1
+            self.stats['reconnects'] += 1
+            logger.info("Strumień %s: próba %d za %.1fs", self.name, self._attempt, delay)
+            await self.sleep(delay)
+
+    def stop(self) -> None:
+        self.running = False
+
+    async def _session(self) -> None:
+        async with self.connect() as stream:
+            self.stats['connects'] += 1
+            self._last_message = self.clock()
+            # Okna przerwy liczone od stanu sprzed zerwania
+            pending_gap = dict(self.last_event)
+            while self.running:
+                try:
+                    message = await asyncio.wait_for(stream.recv(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    message = None
+                if message is not None:
+                    await self._handle(message, pending_gap)
+                await self._heartbeat()
+
+    async def _handle(self, message: Dict, pending_gap: Dict[str, int]) -> None:
+        if isinstance(message, dict) and message.get('e') == 'error':
+            # ReconnectingWebsocket z python-binance zgłasza utratę połączenia wiadomością
+            raise ConnectionError(message.get('m', 'błąd połączenia'))
+        data = message.get('data', message) if isinstance(message, dict) else message
+        stream = message.get('stream', self.name) if isinstance(message, dict) else self.name
+        event_ms = int(data['E']) if isinstance(data, dict) and 'E' in data else self._now_ms()
+
+        self.stats['messages'] += 1
+        self._last_message = self.clock()
+        self._attempt = 0
+
+        gap_start = pending_gap.pop(stream, None)
+        if gap_start is not None and event_ms > gap_start + 1:
+            await self._backfill([stream], gap_start, event_ms)
+        self.last_event[stream] = event_ms
+        self.on_message(message)
+
+    async def _heartbeat(self) -> None:
+        now = self.clock()
+        # Przy szybkim strumieniu sprawdzenie nie częściej niż co heartbeat_interval
+        if now - self._last_heartbeat < self.heartbeat_interval:
+            return
+        self._last_heartbeat = now
+        age = now - self._last_message
+        metrics.set_gauge('ws_message_age_seconds', age, stream=self.name)
+        if age > self.stall_timeout:
+            raise StreamStalled(f"brak wiadomości od {age:.0f}s")
+        if self.stream_stall_timeout is None:
+            return
+        now_ms = self._now_ms()
+        limit_ms = self.stream_stall_timeout * 1000
+        silent = [
+            s for s in self.streams
+            if s in self.last_event and now_ms - self.last_event[s] > limit_ms
+        ]
+        for stream in silent:
+            self.stats['stream_stalls'] += 1
+            await self._backfill([stream], self.last_event[stream], now_ms)
+            self.last_event[stream] = now_ms
+
+    async def _backfill(self, streams: List[str], start_ms: int, end_ms: int) -> None:
+        if self.backfill is None:
+            return
+        try:
+            await self.backfill(streams, start_ms, end_ms)
+            self.stats['backfills'] += 1
+            logger.info(
+                "Strumień %s: uzupełniono %d strumieni za okno %d-%d",
+                self.name, len(streams), start_ms, end_ms
+            )
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error("Błąd uzupełniania luki %s: %s", self.name, e)
@@ -1,46 +1,218 @@
 # telegram_handler.py
+import asyncio
 import logging
-import aiohttp
+import time
 from config import BotConfig
-from typing import Dict, List
+from http_pool import get_http_pool
+from typing import Callable, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+_STOP = object()
+
+class TokenBucket:
+    """Kubełek żetonów: `rate` żetonów na sekundę, maksymalnie `capacity` naraz."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    def _refill(self) -> float:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def delay(self) -> float:
+        now = self._refill()
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        # Blokada po 429 - Telegram podaje czas w retry_after
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+        self.tokens = 0.0
+
+# Globalny limit Telegrama (~30 wiadomości/s) dzielony przez wszystkie czaty procesu
+_global_bucket: Optional[TokenBucket] = None
+
+def get_global_bucket(rate: float = 30.0) -> TokenBucket:
+    global _global_bucket
+    if _global_bucket is None:
+        _global_bucket = TokenBucket(rate)
+    return _global_bucket
+
 class TelegramNotifier:
-    def __init__(self, config: BotConfig):
+    """
+    Powiadomienia wysyłane przez kolejkę i zadanie w tle. Alerty transakcji
+    z krótkiego okna łączone są w jedną wiadomość; wysyłka nie blokuje handlu.
+    """
+
+    def __init__(self, config: BotConfig, http_pool=None, global_bucket: Optional[TokenBucket] = None):
         self.token = config.telegram_token
         self.chat_id = config.telegram_chat_id
-        
+
         if not self.chat_id.lstrip('-').isdigit():  # Nowa walidacja
             raise ValueError("Nieprawidłowy Chat ID")
-        
+
         self.base_url = f"https://api.telegram.org/bot{self.token}"
-        self.session = aiohttp.ClientSession()
+        self.config = config
+        self.http = http_pool or get_http_pool(config)
+        self.chat_bucket = TokenBucket(config.telegram_chat_rate, capacity=1.0)
+        self.global_bucket = global_bucket or get_global_bucket(config.telegram_global_rate)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=config.telegram_queue_size)
+        self.stats = {'sent': 0, 'merged': 0, 'dropped': 0, 'rate_limited': 0, 'failed': 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
 
-    async def send(self, message: str):
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._task = self._loop.create_task(self._run())
+
+    def _enqueue(self, item) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            logger.warning("Kolejka Telegram pełna - powiadomienie odrzucone")
+
+    def notify(self, message: str) -> None:
+        """Dodaje wiadomość do kolejki; bezpieczne także z wątków roboczych."""
+        self._submit(('text', message))
+
+    def notify_trade(self, order: Dict) -> None:
+        self._submit(('trade', dict(order)))
+
+    def _submit(self, item) -> None:
+        if self._loop is None:
+            self._enqueue(item)
+            return
         try:
-            async with self.session.post(
-                f"{self.base_url}/sendMessage",
-                params={
-                    "chat_id": self.chat_id,
-                    "text": message,
-                    "parse_mode": "Markdown",
-                    "disable_web_page_preview": True
-                }
-            ) as response:
-                await response.read()
-        except Exception as e:
-            logger.error(f"Błąd Telegram: {str(e)}")
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._enqueue(item)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._enqueue, item)
+
+    async def send(self, message: str):
+        self.notify(message)
 
     async def send_trade_alert(self, order: Dict):
-        text = (
-            f"🚨 **Nowa transakcja**\n"
+        self.notify_trade(order)
+
+    async def _run(self) -> None:
+        deferred: List = []
+        while True:
+            item = deferred.pop(0) if deferred else await self.queue.get()
+            if item is _STOP:
+                break
+            kind, payload = item
+            try:
+                if kind == 'trade':
+                    trades, deferred = await self._collect_trades(payload)
+                    await self._deliver(self._format_trades(trades))
+                else:
+                    await self._deliver(payload)
+            except Exception as e:
+                logger.error(f"Błąd wysyłki Telegram: {str(e)}")
+
+    async def _collect_trades(self, first: Dict):
+        """
+        Zbiera alerty transakcji nadchodzące w oknie `telegram_batch_window`. Inna
+        wiadomość kończy zbieranie - wychodzi po zebranych, przed późniejszymi alertami.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.telegram_batch_window
+        trades, deferred = [first], []
+        while len(trades) < self.config.telegram_batch_max:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is not _STOP and item[0] == 'trade':
+                trades.append(item[1])
+            else:
+                deferred.append(item)
+                break
+        self.stats['merged'] += len(trades) - 1
+        return trades, deferred
+
+    async def _acquire(self) -> None:
+        while True:
+            wait = max(self.chat_bucket.delay(), self.global_bucket.delay())
+            if wait <= 0:
+                self.chat_bucket.consume()
+                self.global_bucket.consume()
+                return
+            await asyncio.sleep(wait)
+
+    async def _deliver(self, message: str) -> bool:
+        for _ in range(self.config.telegram_max_retries + 1):
+            await self._acquire()
+            try:
+                # 429 obsługujemy sami - retry_after przychodzi w treści odpowiedzi;
+                # błędy sieci nie są ponawiane (sendMessage nie jest idempotentne - duplikaty)
+                response = await self.http.post(
+                    f"{self.base_url}/sendMessage",
+                    params={
+                        "chat_id": self.chat_id,
+                        "text": message,
+                        "parse_mode": "Markdown",
+                        "disable_web_page_preview": "true"
+                    },
+                    retry_statuses=(500, 502, 503, 504)
+                )
+            except Exception as e:
+                logger.error(f"Błąd Telegram: {str(e)}")
+                break
+            if response.status != 429:
+                if response.status == 200:
+                    self.stats['sent'] += 1
+                    return True
+                logger.error(f"Błąd Telegram: HTTP {response.status} {response.data}")
+                break
+            self.stats['rate_limited'] += 1
+            retry_after = ((response.data or {}).get('parameters') or {}).get('retry_after', 1)
+            logger.warning(f"Limit Telegram - ponowienie za {retry_after}s")
+            self.chat_bucket.block(float(retry_after))
+        self.stats['failed'] += 1
+        return False
+
+    @staticmethod
+    def _format_trade(order: Dict) -> str:
+        return (
             f"Symbol: `{order['symbol']}`\n"
             f"Typ: `{order['side']}`\n"
             f"Ilość: `{order['quantity']:.6f}`\n"
             f"Cena: `{order['price']:.2f}`"
         )
-        await self.send(text)
+
+    def _format_trades(self, trades: List[Dict]) -> str:
+        if len(trades) == 1:
+            return "🚨 **Nowa transakcja**\n" + self._format_trade(trades[0])
+        lines = [f"🚨 **Nowe transakcje ({len(trades)})**"]
+        for order in trades:
+            lines.append(
+                f"• `{order['side']}` `{order['symbol']}` "
+                f"{order['quantity']:.6f} @ {order['price']:.2f}"
+            )
+        return "\n".join(lines)
 
     async def send_sentiment_report(self, sentiment_data: Dict, news_data: List[Dict]):
         report = "📈 **Raport Sentymentu Rynkowego**\n\n"
@@ -50,15 +222,24 @@ class TelegramNotifier:
                 f"- r/{sub}:\n"
                 f"  😊 {data['positive']:.1%} | 😐 {data['neutral']:.1%} | 😠 {data['negative']:.1%}\n"
             )
-        
+
         report += "\n📰 **Najważniejsze wiadomości**\n"
         for i, news in enumerate(news_data[:3], 1):
             report += (
                 f"{i}. [{news['title']}]({news['url']})\n"
                 f"   ⚖️ Sentyment: {'✅' if news['sentiment'] > 0 else '⚠️' if news['sentiment'] == 0 else '❌'}\n"
             )
-        
+
         await self.send(report)
 
     async def close(self):
-        await self.session.close()
\ No newline at end of file
+        # Dosyła kolejkę w limicie czasu; sesja HTTP należy do wspólnej puli
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.put(_STOP), self.config.telegram_flush_timeout)
+            await asyncio.wait_for(self._task, self.config.telegram_flush_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Nie wysłano wszystkich powiadomień Telegram przed zamknięciem")
+            self._task.cancel()
+        self._task = None
@@ -0,0 +1,37 @@
+import json
+from unittest.mock import MagicMock
+from accounts import AccountClient, MarketDataPlane, load_account_configs
+from config import BotConfig
+
+def test_market_plane_shares_market_data_between_accounts():
+    now = [0.0]
+    market_client = MagicMock()
+    market_client.get_symbol_ticker.side_effect = lambda symbol: {'symbol': symbol, 'price': '1.0'}
+    market = MarketDataPlane(market_client, price_ttl=2.0, timer=lambda: now[0])
+    accounts = [AccountClient(MagicMock(), market) for _ in range(5)]
+
+    for account in accounts:
+        assert account.get_symbol_ticker(symbol='BTCUSDT')['price'] == '1.0'
+        account.get_symbol_info('BTCUSDT')
+        account.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity=1)
+    assert market_client.get_symbol_ticker.call_count == 1
+    assert market_client.get_symbol_info.call_count == 1
+    # Zlecenia zawsze kluczem własnego konta
+    assert all(a.client.create_order.call_count == 1 for a in accounts)
+    assert market.stats == {'hits': 8, 'misses': 2}
+
+    now[0] = 3.0
+    accounts[0].get_symbol_ticker(symbol='BTCUSDT')
+    assert market_client.get_symbol_ticker.call_count == 2
+
+def test_account_configs_override_base(tmp_path):
+    path = tmp_path / 'accounts.json'
+    path.write_text(json.dumps([
+        {'account_name': 'sub1', 'api_key_env': 'SUB1_KEY', 'max_trade_usd': 1000},
+        {'account_name': 'sub2', 'state_journal_path': 'custom.db'}
+    ]))
+    base = BotConfig(max_trade_usd=5000, risk_tolerance=0.2)
+    sub1, sub2 = load_account_configs(str(path), base)
+    assert sub1.max_trade_usd == 1000 and sub1.risk_tolerance == 0.2
+    assert sub1.state_journal_path == 'state_sub1.db' and sub2.state_journal_path == 'custom.db'
+    assert sub2.max_trade_usd == 5000
@@ -0,0 +1,47 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pytest
+from analysis_pool import AnalysisPool, analyze_in_process
+from bench_cycle import generate_fixture
+from indicators import compute_indicators, trend_direction
+from klines import klines_frame, parse_klines_array
+from timeframes import resample
+
+def test_pool_matches_in_process_and_keeps_order():
+    base = parse_klines_array(generate_fixture(length=300))
+    candidates = []
+    for i in range(5):
+        window = base[i * 10:i * 10 + 200]
+        candidates.append((f"S{i}USDT", window, [resample(window, 4 * 3_600_000)]))
+
+    pool = AnalysisPool(2)
+    try:
+        results = pool.analyze(candidates, ['4h'])
+    finally:
+        pool.close()
+
+    assert [r['symbol'] for r in results] == [c[0] for c in candidates]
+    for (symbol, window, (h4,)), row in zip(candidates, results):
+        expected = compute_indicators(klines_frame(window))
+        for key, value in expected.items():
+            assert np.isclose(row[key], value, equal_nan=True), (symbol, key)
+        assert row['trend_4h'] == trend_direction(h4['close'].copy())
+
+def test_pool_recovers_after_worker_death():
+    base = parse_klines_array(generate_fixture(length=200))
+    candidates = [('AUSDT', base, [resample(base, 4 * 3_600_000)])]
+    expected = analyze_in_process(candidates, ['4h'])
+
+    pool = AnalysisPool(1)
+    try:
+        assert pool.analyze(candidates, ['4h']) == expected
+        for process in list(pool.executor._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        with pytest.raises(BrokenProcessPool):
+            pool.analyze(candidates, ['4h'])
+        # Następne wywołanie na nowej puli
+        assert pool.analyze(candidates, ['4h']) == expected
+    finally:
+        pool.close()
@@ -0,0 +1,76 @@
+import pandas as pd
+from bench_scoring import make_analyzer
+
+def test_columnar_scoring_and_sentiment_join():
+    analyzer = make_analyzer(3)
+    analyzer.config.analysis_top_k = 2
+    analyzer.ticker_cache.base_assets = {'C0USDT': 'C0', 'C1USDT': 'C1'}
+    df = pd.DataFrame([
+        {'symbol': 'C0USDT', 'rsi': 50.0, 'macd': 0.0, 'bb_percent': 0.5},
+        {'symbol': 'C1USDT', 'rsi': 30.0, 'macd': 0.1, 'bb_percent': 0.2},
+        {'symbol': 'C2USDT', 'rsi': 80.0, 'macd': -0.1, 'bb_percent': 0.9},
+    ])
+    df['score'] = analyzer.calculate_scores(df)
+    for _, row in df.iterrows():
+        assert abs(row['score'] - analyzer.calculate_score(row)) < 1e-12
+
+    df = analyzer.apply_sentiment(df, {'C0': 1.0}, {'C2': -0.5})
+    assert df['reddit_sentiment'].tolist() == [1.0, 0.0, 0.0]
+    assert df['news_sentiment'].tolist() == [0.0, 0.0, -0.5]
+
+    top = analyzer.process_results(df)
+    assert top['symbol'].tolist() == ['C0USDT', 'C1USDT']
+
+def test_parse_klines_matches_legacy_parser_without_copy():
+    import numpy as np
+    from bench_cycle import generate_fixture, legacy_parse_klines
+    from klines import klines_frame, parse_klines_array
+    klines = generate_fixture(length=50)
+    klines[3][2] = ""
+
+    df = make_analyzer(1).parse_klines(klines)
+    legacy = legacy_parse_klines(klines)
+    for column in ['open', 'high', 'low', 'close', 'volume']:
+        assert np.array_equal(df[column].to_numpy(), legacy[column].to_numpy(), equal_nan=True)
+    assert (df['timestamp'] == legacy['timestamp']).all()
+    assert df['close_time'].dtype == np.int64
+
+    array = parse_klines_array(klines)
+    frame = klines_frame(array)
+    assert np.shares_memory(frame['close'].to_numpy(), array)
+    assert np.shares_memory(frame['timestamp'].to_numpy(), array)
+
+def test_stream_candles_are_applied_by_analysis_thread():
+    from bench_cycle import FakeClient, load_fixture, make_analyzer as make_cycle_analyzer, make_config, symbol_klines
+    from klines import parse_klines_array
+    client = FakeClient(symbol_klines(load_fixture(), 1))
+    analyzer = make_cycle_analyzer(client, make_config(1))
+    symbol = next(iter(client.klines))
+    series = analyzer.get_candles(symbol)
+    last = series.last_open_time
+
+    candle = parse_klines_array(client.klines[symbol][-1:])
+    candle['timestamp'] += 3600_000
+    candle['close_time'] += 3600_000
+    analyzer.on_candles(symbol, candle)
+    # Seria bez zmian do czasu następnej analizy symbolu
+    assert series.last_open_time == last
+    analyzer.get_candles(symbol)
+    assert series.last_open_time == last + 3600_000
+
+def test_stale_series_is_reloaded_in_full():
+    from bench_cycle import FakeClient, load_fixture, make_analyzer as make_cycle_analyzer, make_config, symbol_klines
+    client = FakeClient(symbol_klines(load_fixture(), 1))
+    calls = []
+    get_klines = client.get_klines
+    client.get_klines = lambda **params: calls.append(params) or get_klines(**params)
+    analyzer = make_cycle_analyzer(client, make_config(1))
+    symbol = next(iter(client.klines))
+    old = analyzer.get_candles(symbol)
+
+    analyzer.get_candles(symbol)
+    assert 'startTime' in calls[-1]
+    # Przerwa dłuższa niż candle_history świec
+    analyzer.clock = lambda: (old.last_open_time + (analyzer.config.candle_history + 1) * old.base_ms) / 1000
+    assert analyzer.get_candles(symbol) is not old
+    assert 'startTime' not in calls[-1]
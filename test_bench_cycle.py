@@ -0,0 +1,24 @@
+import bench_cycle
+
+def test_compare_uses_calibrated_times():
+    baseline = {'results': {
+        'a[10]': {'seconds': 1.0, 'relative': 100.0},
+        'b[10]': {'seconds': 1.0, 'relative': 100.0},
+        'c[10]': None
+    }}
+    # Maszyna dwa razy wolniejsza: 'a' w normie, 'b' ponad tolerancją
+    current = {'results': {
+        'a[10]': {'seconds': 2.2, 'relative': 110.0},
+        'b[10]': {'seconds': 3.0, 'relative': 150.0},
+        'c[10]': {'seconds': 5.0, 'relative': 250.0}
+    }}
+    regressions = bench_cycle.compare(current, baseline, tolerance=0.3)
+    assert [r['case'] for r in regressions] == ['b[10]']
+    assert regressions[0]['ratio'] == 1.5
+    assert regressions[0]['baseline'] == 2.0
+
+def test_fixture_windows_per_symbol():
+    klines = bench_cycle.symbol_klines(bench_cycle.generate_fixture(length=150), 3)
+    assert list(klines) == ['S0USDT', 'S1USDT', 'S2USDT']
+    assert all(len(k) == bench_cycle.KLINES_PER_SYMBOL for k in klines.values())
+    assert klines['S0USDT'][0][0] != klines['S1USDT'][0][0]
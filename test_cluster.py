@@ -0,0 +1,75 @@
+import asyncio
+import time
+import pandas as pd
+import pytest
+from cluster import AnalysisCoordinator, AnalysisWorker, _send
+
+class FakeAnalyzer:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def analyze_symbol(self, symbol):
+        time.sleep(self.delay)
+        return {'symbol': symbol, 'price': 1.0, 'rsi': 50.0, 'macd': 0.0, 'bb_percent': 0.5}
+
+    def closed_candles(self, symbol):
+        return [[1, 2], [1.0, 1.0], [1.0, 1.0], [1.0, 1.0]]
+
+class DyingWorker(AnalysisWorker):
+    async def _run_job(self, writer, job, symbols):
+        # Jeden wiersz, potem zerwane połączenie
+        await _send(writer, {'op': 'row', 'job': job, 'symbol': symbols[0], 'row': self.analyze(symbols[0])})
+        writer.transport.abort()
+
+async def _run_cluster(tmp_path):
+    workers = [
+        AnalysisWorker(FakeAnalyzer(), '127.0.0.1:0'),
+        AnalysisWorker(FakeAnalyzer(delay=0.5), '127.0.0.1:0'),
+        DyingWorker(FakeAnalyzer(), f"unix:{tmp_path / 'dying.sock'}")
+    ]
+    addresses = [await w.start() for w in workers]
+    coordinator = AnalysisCoordinator(addresses + ['127.0.0.1:1'], shard_size=3, shard_timeout=0.3, connect_timeout=1)
+    symbols = [f"S{i}USDT" for i in range(20)]
+    try:
+        rows, leftover = await coordinator.analyze(symbols)
+    finally:
+        coordinator.close()
+        for w in workers:
+            await w.close()
+    return symbols, rows, leftover, coordinator.stats, addresses
+
+def test_coordinator_rebalances_slow_and_dead_workers(tmp_path):
+    symbols, rows, leftover, stats, addresses = asyncio.run(_run_cluster(tmp_path))
+
+    assert [r['symbol'] for r in rows] == symbols
+    assert leftover == []
+    assert all(r['candles'] and 'score' not in r for r in rows)
+    fast, slow, dying = addresses
+    assert stats[slow]['timeouts'] >= 1
+    assert stats[dying]['failures'] == 1 and stats[dying]['rows'] == 1
+    assert stats['127.0.0.1:1']['failures'] == 1
+    # Większość pracy przejął szybki węzeł
+    assert stats[fast]['rows'] >= 15
+    assert not pd.DataFrame(rows).empty
+
+async def _run_secret(secret):
+    worker = AnalysisWorker(FakeAnalyzer(), '127.0.0.1:0', secret='s3cret')
+    address = await worker.start()
+    coordinator = AnalysisCoordinator([address], connect_timeout=1, secret=secret)
+    try:
+        rows, leftover = await coordinator.analyze(['AUSDT'])
+    finally:
+        coordinator.close()
+        await worker.close()
+    return rows, leftover, worker.stats
+
+def test_worker_requires_shared_secret():
+    rows, leftover, stats = asyncio.run(_run_secret('s3cret'))
+    assert [r['symbol'] for r in rows] == ['AUSDT'] and stats['rejected'] == 0
+
+    rows, leftover, stats = asyncio.run(_run_secret('wrong'))
+    assert rows == [] and leftover == ['AUSDT'] and stats['rejected'] == 1 and stats['jobs'] == 0
+
+    # Bez sekretu tylko adresy lokalne
+    with pytest.raises(ValueError):
+        asyncio.run(AnalysisWorker(FakeAnalyzer(), '0.0.0.0:0').start())
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from aiohttp import web
+from http_pool import HttpClientPool, parse_retry_after
+
+async def _run_pool():
+    calls = {'count': 0}
+
+    async def handler(request):
+        calls['count'] += 1
+        if calls['count'] == 1:
+            return web.json_response({'error': 'busy'}, status=503, headers={'Retry-After': '0'})
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_get('/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    pool = HttpClientPool(retries=2, backoff=0)
+    try:
+        first = await pool.get(f"http://127.0.0.1:{port}/")
+        second = await pool.get(f"http://127.0.0.1:{port}/")
+    finally:
+        await pool.close()
+        await runner.cleanup()
+    return first, second, pool.stats
+
+def test_pool_retries_and_reuses_connections():
+    first, second, stats = asyncio.run(_run_pool())
+    assert first.status == 200 and first.data == {'ok': True}
+    assert second.data == {'ok': True}
+    assert stats['requests'] == 3
+    assert stats['retries'] == 1
+    assert stats['connections_created'] == 1
+    assert stats['connections_reused'] == 2
+
+async def _run_slow_post(retry_errors):
+    calls = {'count': 0}
+
+    async def handler(request):
+        calls['count'] += 1
+        await asyncio.sleep(1.0)
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_post('/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    pool = HttpClientPool(retries=2, backoff=0, timeout=0.2)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.post(f"http://127.0.0.1:{port}/", retry_errors=retry_errors)
+    finally:
+        await pool.close()
+        await runner.cleanup()
+    return calls['count']
+
+def test_post_timeout_is_not_retried_unless_requested():
+    assert asyncio.run(_run_slow_post(None)) == 1
+    assert asyncio.run(_run_slow_post(True)) == 3
+
+def test_retry_after_seconds_and_http_date():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:10 GMT', now=1445412480.0) == 10.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT', now=1445412490.0) == 0.0
+    assert parse_retry_after('soon') is None
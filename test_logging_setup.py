@@ -0,0 +1,36 @@
+import json
+import logging
+from logging_setup import CallSiteRateLimitFilter, JsonFormatter, StructuredQueueHandler
+
+def make_record(level=logging.ERROR, lineno=10, msg="Błąd %s", args=("BTCUSDT",)):
+    return logging.LogRecord("bot", level, "analyzer.py", lineno, msg, args, None)
+
+def test_repeated_errors_are_rate_limited_per_call_site():
+    now = [0.0]
+    limiter = CallSiteRateLimitFilter(burst=2, interval=60, clock=lambda: now[0])
+    passed = [limiter.filter(make_record()) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert limiter.filter(make_record(lineno=11))
+    assert limiter.filter(make_record(level=logging.INFO))
+
+    now[0] = 61
+    record = make_record()
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+
+def test_queued_record_is_structured_json():
+    handler = StructuredQueueHandler(None)
+    try:
+        raise ValueError("zły format")
+    except ValueError:
+        import sys
+        record = make_record()
+        record.exc_info = sys.exc_info()
+    record.symbol = "BTCUSDT"
+    prepared = handler.prepare(record)
+    assert prepared.exc_info is None and prepared.args is None
+
+    entry = json.loads(JsonFormatter().format(prepared))
+    assert entry["message"] == "Błąd BTCUSDT"
+    assert entry["symbol"] == "BTCUSDT"
+    assert "ValueError: zły format" in entry["exc"]
@@ -0,0 +1,18 @@
+import pandas as pd
+from market_table import MarketTable
+
+def test_rows_stay_stable_and_updates_report_span():
+    table = MarketTable(capacity=2)
+    table.add(['AUSDT', 'BUSDT', 'CUSDT', 'AUSDT'])
+    assert table.symbols == ['AUSDT', 'BUSDT', 'CUSDT'] and len(table.values) >= 3
+    assert table.missing(['CUSDT', 'DUSDT']) == ['DUSDT']
+
+    assert table.set_column('price', {'CUSDT': 2.5, 'BUSDT': 1.0, 'XUSDT': 9.0}) == (1, 2)
+    assert table.text(2, 1) == '2.50000000'
+    assert table.text(0, 1) == ''
+    assert table.set_column('price', {'XUSDT': 9.0}) is None
+
+    span = table.load(pd.DataFrame({'symbol': ['AUSDT', 'ZUSDT'], 'score': [0.5, 0.9], 'trend': [1.0, 0.0]}))
+    assert span == (0, 0)
+    assert table.value(0, MarketTable.COLUMNS.index('score')) == 0.5
+    assert table.text(0, MarketTable.COLUMNS.index('trend')) == '+1.00'
@@ -0,0 +1,44 @@
+import asyncio
+import time
+from metrics import MetricsRegistry
+
+def test_disabled_registry_records_nothing_and_is_cheap():
+    registry = MetricsRegistry(enabled=False)
+    func = registry.timed('noop')(lambda x: x)
+
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for i in range(10000):
+            func(i)
+            registry.inc('calls')
+        best = min(best, (time.perf_counter() - start) / 10000)
+    assert best < 2e-6
+    assert registry.histograms == {} and registry.counters == {}
+
+def test_enabled_registry_histograms_spans_and_exposition():
+    registry = MetricsRegistry(enabled=True)
+
+    @registry.timed('work')
+    async def work():
+        with registry.span('inner'):
+            await asyncio.sleep(0)
+        return 42
+
+    async def cycle():
+        with registry.span('cycle', cycle=1):
+            return await work()
+
+    assert asyncio.run(cycle()) == 42
+    registry.inc('cache_hits_total', cache='ticker')
+    registry.mark('ws_messages', 3)
+
+    spans = {s['name']: s for s in registry.spans}
+    assert spans['inner']['parent'] == 'cycle'
+    assert spans['cycle']['attributes'] == {'cycle': 1}
+
+    text = registry.to_prometheus()
+    assert 'bot_cache_hits_total{cache="ticker"} 1' in text
+    assert 'bot_call_seconds_count{function="work"} 1' in text
+    assert 'bot_ws_messages_total 3' in text
+    assert registry.snapshot()['meters']['ws_messages']['total'] == 3
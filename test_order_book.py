@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import pytest
+from order_book import OrderBook, OrderBookManager, SequenceGap
+
+SNAPSHOT = {
+    'lastUpdateId': 10,
+    'bids': [['99', '1'], ['98', '2'], ['97', '3']],
+    'asks': [['101', '1'], ['102', '2'], ['103', '3']]
+}
+
+def diff(first, last, bids=(), asks=()):
+    return {'e': 'depthUpdate', 's': 'BTCUSDT', 'U': first, 'u': last, 'b': list(bids), 'a': list(asks)}
+
+def test_diffs_update_sorted_levels_and_detect_gaps():
+    book = OrderBook('BTCUSDT', depth=3)
+    book.load_snapshot(SNAPSHOT)
+    assert book.apply_diff(diff(5, 9)) is False
+    assert book.apply_diff(diff(8, 12, bids=[['99', '0'], ['99.5', '4']], asks=[['100.5', '1'], ['103', '0']]))
+    assert book.prices('bids').tolist() == [99.5, 98.0, 97.0]
+    assert book.prices('asks').tolist() == [100.5, 101.0, 102.0]
+    assert book.synced and book.mid == 100.0
+    with pytest.raises(SequenceGap):
+        book.apply_diff(diff(14, 15))
+    assert not book.synced
+
+def test_fill_estimate_walks_levels():
+    book = OrderBook('BTCUSDT')
+    book.load_snapshot(SNAPSHOT)
+    buy = book.estimate_fill('BUY', quantity=2)
+    assert buy['price'] == pytest.approx(101.5) and buy['levels'] == 2 and buy['complete']
+    assert buy['slippage'] == pytest.approx(1.5 / 100)
+    sell = book.estimate_fill('SELL', quote=99 + 98)
+    assert sell['filled'] == pytest.approx(2.0)
+    assert not book.estimate_fill('BUY', quantity=10)['complete']
+
+def test_manager_resyncs_from_snapshot_and_buffer():
+    snapshots = [dict(SNAPSHOT)]
+
+    async def get_order_book(symbol, limit):
+        return snapshots.pop(0)
+
+    async def run():
+        config = SimpleNamespace(order_book_depth=100, order_book_max_symbols=10, order_book_buffer=100)
+        manager = OrderBookManager(config, client=SimpleNamespace(get_order_book=get_order_book))
+        manager.on_event(diff(9, 11, asks=[['100.5', '1']]))
+        assert manager.book('BTCUSDT') is None
+        await asyncio.gather(*manager._resyncing.values())
+        manager.on_event(diff(12, 12, bids=[['99.5', '1']]))
+        book = manager.book('BTCUSDT')
+        assert book.best_ask == 100.5 and book.best_bid == 99.5
+
+        # Luka -> książka niedostępna do czasu nowej migawki
+        snapshots.append({'lastUpdateId': 20, 'bids': [['99', '1']], 'asks': [['101', '1']]})
+        manager.on_event(diff(15, 16))
+        assert manager.book('BTCUSDT') is None
+        manager.on_event(diff(17, 21, asks=[['100', '2']]))
+        await asyncio.gather(*manager._resyncing.values())
+        assert manager.book('BTCUSDT').best_ask == 100.0
+        return manager.stats
+
+    stats = asyncio.run(run())
+    assert stats['gaps'] == 1 and stats['resyncs'] == 2
+
+def test_thin_synced_book_blocks_buy():
+    from optimizer import PortfolioOptimizer
+    config = SimpleNamespace(max_slippage=0.01, rate_limit_path="", api_rate_limit=10 ** 6, api_rate_window=1)
+    client = MagicMock()
+    client.get_symbol_ticker.return_value = {'price': '100'}
+    client.get_symbol_info.return_value = {'filters': [{'filterType': 'LOT_SIZE', 'stepSize': '0.001'}]}
+    client.get_account.return_value = {'balances': [{'asset': 'USDT', 'free': '10000'}]}
+    optimizer = PortfolioOptimizer(client, MagicMock(spec=[]), config)
+    optimizer.analyzer = MagicMock()
+    optimizer.analyzer.ticker_cache.symbols = ['BTCUSDT']
+    optimizer.risk_manager = MagicMock(halted=False)
+    optimizer.order_books = MagicMock()
+    # Cała strona asks warta ~100 USDT
+    optimizer.order_books.estimate_fill.return_value = {
+        'price': 100.5, 'slippage': 0.005, 'filled': 1.0, 'levels': 1, 'complete': False
+    }
+    assert optimizer.generate_orders({'BTCUSDT': 1000.0}, check_risk=False) == []
+
+    # Bez zsynchronizowanej książki - cena z tickera
+    optimizer.order_books.estimate_fill.return_value = None
+    orders = optimizer.generate_orders({'BTCUSDT': 1000.0}, check_risk=False)
+    assert orders[0]['price'] == 100.0 and orders[0]['slippage'] is None
@@ -0,0 +1,120 @@
+import numpy as np
+from unittest.mock import MagicMock
+from position_table import PositionTable
+from risk_manager import RiskManager
+from state_journal import StateJournal
+
+class MockConfig:
+    stop_loss_multiplier = 2.0
+    take_profit_multiplier = 3.5
+    var_confidence = 0.95
+    max_drawdown = 0.2
+    max_var_ratio = 0.1
+
+def test_position_table_remove_keeps_rows_aligned():
+    table = PositionTable(capacity=2)
+    for i, symbol in enumerate(['AUSDT', 'BUSDT', 'CUSDT']):
+        table.upsert(symbol, i + 1, 10.0 * (i + 1))
+    table.remove('AUSDT')
+
+    assert len(table) == 2
+    assert table.symbols[table.index['CUSDT']] == 'CUSDT'
+    assert table.quantity[table.index['CUSDT']] == 3
+    assert table.entry_price[table.index['BUSDT']] == 20.0
+
+def test_check_positions_vectorized():
+    optimizer = MagicMock()
+    optimizer.client.get_all_tickers.return_value = [
+        {'symbol': 'BTCUSDT', 'price': '90'},
+        {'symbol': 'ETHUSDT', 'price': '120'},
+        {'symbol': 'XRPUSDT', 'price': '101'},
+        {'symbol': 'DOGEUSDT', 'price': '1'},
+    ]
+    analyzer = MagicMock()
+    analyzer.calculate_volatility.return_value = 0.02
+    analyzer.volatility.returns_matrix.side_effect = lambda symbols: np.full((20, len(symbols)), -0.01)
+
+    risk_manager = RiskManager(optimizer, analyzer, MockConfig())
+    for symbol in ['BTCUSDT', 'ETHUSDT', 'XRPUSDT']:
+        risk_manager.update_position(symbol, 1.0, 100.0)
+
+    orders = risk_manager.check_positions()
+    by_symbol = {o['symbol']: o['type'] for o in orders}
+    assert by_symbol == {'BTCUSDT': 'STOP_LOSS', 'ETHUSDT': 'TAKE_PROFIT'}
+    assert risk_manager.last_risk['unrealized_pnl'] == 11.0
+    assert risk_manager.last_risk['var'] > 0
+
+def test_state_journal_recovery(tmp_path):
+    path = str(tmp_path / "state.db")
+    journal = StateJournal(path, snapshot_every=3)
+    risk_manager = RiskManager(MagicMock(), MagicMock(), MockConfig(), journal=journal)
+    risk_manager.check_portfolio_health(1000.0)
+    risk_manager.update_position('BTCUSDT', 0.5, 100.0)
+    risk_manager.update_position('ETHUSDT', 2.0, 50.0)
+    risk_manager.update_position('XRPUSDT', 10.0, 1.0)
+    risk_manager.on_order_filled({'symbol': 'ETHUSDT', 'side': 'SELL', 'quantity': 2.0, 'price': 60.0, 'type': 'TAKE_PROFIT'})
+    journal.conn.close()
+
+    restored = RiskManager(MagicMock(), MagicMock(), MockConfig(), journal=StateJournal(path))
+    assert restored.restore()
+    assert restored.initial_balance == 1000.0
+    assert set(restored.open_positions) == {'BTCUSDT', 'XRPUSDT'}
+    assert str(restored.entry_prices['BTCUSDT']) == '100.0'
+    assert restored.positions.quantity[restored.positions.index['XRPUSDT']] == 10.0
+
+def test_only_filled_orders_create_positions(tmp_path):
+    from optimizer import PortfolioOptimizer
+    config = MagicMock(simulation_mode=False, max_slippage=0.01, rate_limit_path="")
+    client = MagicMock()
+    client.get_symbol_ticker.return_value = {'price': '100'}
+    client.create_order.side_effect = [Exception("odrzucone"), {'status': 'FILLED'}]
+    analyzer = MagicMock(spec=[])
+    optimizer = PortfolioOptimizer(client, analyzer, config)
+    optimizer.limiter = MagicMock()
+    journal = StateJournal(str(tmp_path / "state.db"))
+    risk_manager = RiskManager(optimizer, analyzer, MockConfig(), journal=journal)
+    optimizer.set_risk_manager(risk_manager)
+
+    optimizer.execute_orders([
+        {'symbol': 'BTCUSDT', 'side': 'BUY', 'quantity': 1.0, 'price': 100.0},
+        {'symbol': 'ETHUSDT', 'side': 'BUY', 'quantity': 2.0, 'price': 50.0}
+    ])
+    assert set(StateJournal(journal.path).load()['positions']) == {'ETHUSDT'}
+
+    # Sprzedaż awaryjna (bez typu) też zamyka pozycję
+    client.create_order.side_effect = None
+    optimizer.execute_orders([{'symbol': 'ETHUSDT', 'side': 'SELL', 'quantity': 2.0, 'price': 55.0}])
+    assert StateJournal(journal.path).load()['positions'] == {}
+
+def test_health_check_runs_each_cycle_and_acts_on_var():
+    optimizer = MagicMock()
+    optimizer.client.get_account.return_value = {'balances': [{'asset': 'USDT', 'free': '500', 'locked': '0'}]}
+    analyzer = MagicMock()
+    analyzer.calculate_volatility.return_value = 0.5
+    analyzer.volatility.returns_matrix.side_effect = lambda symbols: np.zeros((20, len(symbols)))
+    risk_manager = RiskManager(optimizer, analyzer, MockConfig())
+    risk_manager.initial_balance = 1000.0
+    risk_manager.update_position('BTCUSDT', 5.0, 100.0)
+
+    # 500 USDT + pozycja 500 -> bez spadku
+    assert risk_manager.check_positions({'BTCUSDT': 100.0}) == []
+    assert risk_manager.last_risk['drawdown'] == 0.0 and not risk_manager.halted
+
+    # Pozycja warta 470 -> drawdown 3%, poniżej limitu; VaR ~30% wartości przekracza limit
+    analyzer.volatility.returns_matrix.side_effect = lambda symbols: np.full((20, len(symbols)), -1.0)
+    assert risk_manager.check_positions({'BTCUSDT': 94.0}) == []
+    assert np.isclose(risk_manager.last_risk['drawdown'], 0.03)
+    assert risk_manager.halted
+    optimizer.generate_emergency_orders.assert_called_once()
+
+def test_returns_matrix_aligned_by_candle_time():
+    from volatility import VolatilityTracker
+    tracker = VolatilityTracker(history=10)
+    tracker.update('OLD', [1, 2, 3, 4], [1] * 4, [1] * 4, [100, 110, 121, 133.1])
+    # Młodsza seria zaczyna się później i nie ma świecy 4
+    tracker.update('NEW', [2, 3], [1] * 2, [1] * 2, [10, 20])
+
+    matrix = tracker.returns_matrix(['OLD', 'NEW'])
+    assert matrix.shape == (3, 2)
+    assert np.isclose(matrix[1, 1], np.log(2)) and matrix[2, 1] == 0.0
+    assert np.allclose(matrix[:, 0], np.log(1.1))
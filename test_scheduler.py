@@ -0,0 +1,78 @@
+import asyncio
+import pandas as pd
+from unittest.mock import MagicMock
+from scheduler import AnalysisScheduler
+
+class MockConfig:
+    analysis_interval = 3600
+    candle_close_delay = 2.0
+    max_analysis_symbols = 100
+    analysis_batch_size = 2
+    pipeline_queue_size = 1
+    max_trade_usd = 1000.0
+    enable_news = False
+    simulation_mode = True
+
+class FakeAnalyzer:
+    def __init__(self, symbols):
+        self.ticker_cache = MagicMock(symbols=symbols)
+        self.config = MockConfig()
+
+    def screen_universe(self):
+        return self.ticker_cache.symbols[:self.config.max_analysis_symbols]
+
+    async def analyze_symbols(self, symbols, sentiment=None):
+        await asyncio.sleep(0)
+        return pd.DataFrame({'symbol': symbols, 'price': 1.0, 'score': 1.0})
+
+    def process_results(self, df):
+        return df.sort_values('score', ascending=False).reset_index(drop=True)
+
+def test_pipeline_cycle_runs_all_batches():
+    analyzer = FakeAnalyzer(['AUSDT', 'BUSDT', 'CUSDT', 'DUSDT', 'EUSDT'])
+    optimizer = MagicMock()
+    optimizer.risk_manager.check_positions.return_value = []
+    optimizer.calculate_allocation.side_effect = lambda df, budget: {s: budget / len(df) for s in df['symbol']}
+    optimizer.generate_orders.side_effect = lambda allocations, **kwargs: [
+        {'symbol': s, 'side': 'BUY', 'quantity': 1.0, 'price': a} for s, a in allocations.items()
+    ]
+
+    scheduler = AnalysisScheduler(analyzer, optimizer, MockConfig())
+    result = asyncio.run(scheduler.run_cycle())
+
+    assert result['batches'] == 3
+    assert len(result['market_data']) == 5
+    assert sorted(o['symbol'] for o in result['orders']) == analyzer.ticker_cache.symbols
+    assert sum(o['price'] for o in result['orders']) == 1000.0
+    assert optimizer.execute_orders.call_count == 3
+
+def test_candle_alignment_and_overrun():
+    scheduler = AnalysisScheduler(MagicMock(), MagicMock(), MockConfig(), clock=lambda: 7300.0)
+    assert scheduler.next_boundary() == 10802.0
+
+    report = {}
+    scheduler._account(report, boundary=7202.0, started=7203.0, finished=7202.0 + 2.5 * 3600)
+    assert report['overrun'] and report['skipped'] == 2
+    assert scheduler.stats['overruns'] == 1
+
+def test_shared_analysis_feeds_every_account():
+    analyzer = FakeAnalyzer(['AUSDT', 'BUSDT', 'CUSDT', 'DUSDT'])
+    optimizers = {}
+    for name, budget in [('sub1', 100.0), ('sub2', 300.0)]:
+        optimizer = MagicMock()
+        optimizer.config.max_trade_usd = budget
+        optimizer.risk_manager.check_positions.return_value = []
+        optimizer.calculate_allocation.side_effect = lambda df, budget: {s: budget / len(df) for s in df['symbol']}
+        optimizer.generate_orders.side_effect = lambda allocations, **kwargs: [
+            {'symbol': s, 'side': 'BUY', 'quantity': 1.0, 'price': a} for s, a in allocations.items()
+        ]
+        optimizers[name] = optimizer
+
+    scheduler = AnalysisScheduler(analyzer, optimizers, MockConfig())
+    result = asyncio.run(scheduler.run_cycle())
+
+    assert result['accounts'] == {'sub1': 4, 'sub2': 4}
+    assert len(result['market_data']) == 4
+    for name, budget in [('sub1', 100.0), ('sub2', 300.0)]:
+        executed = [o for call in optimizers[name].execute_orders.call_args_list for o in call.args[0]]
+        assert sum(o['price'] for o in executed) == budget
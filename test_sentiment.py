@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from collections import deque
+from types import SimpleNamespace
+from sentiment import SentimentAnalyzer
+from coin_index import CoinMentionExtractor, CoinSentimentIndex
+
+class MockConfig:
+    sentiment_subreddits = ["CryptoCurrency", "Bitcoin"]
+    sentiment_batch_size = 2
+    sentiment_queue_size = 4
+    comment_limit = 100
+    news_history = 50
+    cryptopanic_api_key = ""
+
+class FakeSubreddit:
+    def __init__(self, comments):
+        self._comments = comments
+
+    async def comments(self, limit):
+        for comment in self._comments[:limit]:
+            await asyncio.sleep(0)
+            yield comment
+
+class FakeReddit:
+    def __init__(self, data):
+        self.data = data
+
+    async def subreddit(self, name):
+        return FakeSubreddit(self.data[name])
+
+def make_analyzer(reddit):
+    analyzer = SentimentAnalyzer.__new__(SentimentAnalyzer)
+    analyzer.config = MockConfig()
+    analyzer.reddit = reddit
+    analyzer.http = None
+    analyzer.high_water = {}
+    analyzer.reddit_sentiment = {}
+    analyzer.reddit_counts = {}
+    analyzer.recent_news = deque(maxlen=50)
+    analyzer.extractor = None
+    analyzer.coin_index = CoinSentimentIndex()
+    analyzer.scored = []
+
+    def score_batch(texts):
+        analyzer.scored.extend(texts)
+        return [0.9 if "moon" in t else 0.1 for t in texts]
+
+    analyzer._score_batch = score_batch
+    return analyzer
+
+def comment(cid, body):
+    return SimpleNamespace(id=cid, body=body)
+
+def test_ingest_streams_and_skips_seen_items():
+    data = {
+        "CryptoCurrency": [comment("c3", "to the moon"), comment("c2", "dump"), comment("c1", "moon")],
+        "Bitcoin": [comment("b2", "moon"), comment("b1", "crash")],
+    }
+    analyzer = make_analyzer(FakeReddit(data))
+
+    reddit, _ = asyncio.run(analyzer.ingest(news=False))
+    assert len(analyzer.scored) == 5
+    assert reddit["CryptoCurrency"]["positive"] == 2 / 3
+    assert reddit["Bitcoin"]["negative"] == 0.5
+
+    data["Bitcoin"].insert(0, comment("b3", "moon again"))
+    analyzer.scored.clear()
+    reddit, _ = asyncio.run(analyzer.ingest(news=False))
+    assert analyzer.scored == ["moon again"]
+    # Nowy komentarz dolicza się do dotychczasowych, nie zastępuje ich
+    assert reddit["Bitcoin"]["positive"] == pytest.approx(2 / 3)
+    assert reddit["CryptoCurrency"]["positive"] == 2 / 3
+
+def test_high_water_advances_only_after_scoring():
+    data = {"CryptoCurrency": [comment("c2", "moon"), comment("c1", "dump")], "Bitcoin": []}
+    analyzer = make_analyzer(FakeReddit(data))
+    score_batch = analyzer._score_batch
+
+    def failing(texts):
+        raise RuntimeError("model")
+
+    analyzer._score_batch = failing
+    with pytest.raises(RuntimeError):
+        asyncio.run(analyzer.ingest(["CryptoCurrency"], news=False))
+    assert "reddit:CryptoCurrency" not in analyzer.high_water
+
+    # Ponowna próba ocenia te same komentarze
+    analyzer._score_batch = score_batch
+    asyncio.run(analyzer.ingest(["CryptoCurrency"], news=False))
+    assert sorted(analyzer.scored) == ["dump", "moon"]
+    assert analyzer.high_water["reddit:CryptoCurrency"] == int("c2", 36)
+
+def test_coin_mentions_and_decayed_index():
+    extractor = CoinMentionExtractor(
+        ["BTC", "ETH", "ONE", "SOL"],
+        {"BTC": ["bitcoin"], "ETH": ["ethereum"], "DOGE": ["dogecoin"]}
+    )
+    assert extractor.extract("Bitcoin and $ETH pump, one more BTCUSDT?") == {"BTC", "ETH"}
+    assert extractor.extract("dogecoin solana") == set()
+
+    index = CoinSentimentIndex(half_life=3600, prior_weight=1.0)
+    index.add("BTC", "reddit", 1.0, timestamp=0)
+    index.add("BTC", "reddit", 1.0, timestamp=0)
+    assert index.score("BTC", "reddit", now=0) == 2 / 3
+    assert index.score("BTC", "reddit", now=3600) < index.score("BTC", "reddit", now=0)
+    assert index.snapshot("news", now=0) == {}
+
+def test_out_of_order_items_are_decayed_to_aggregate_time():
+    in_order = CoinSentimentIndex(half_life=3600, prior_weight=1.0)
+    in_order.add("BTC", "news", 0.0, timestamp=0)
+    in_order.add("BTC", "news", 1.0, timestamp=3600)
+
+    late = CoinSentimentIndex(half_life=3600, prior_weight=1.0)
+    late.add("BTC", "news", 1.0, timestamp=3600)
+    late.add("BTC", "news", 0.0, timestamp=0)
+
+    # Kolejność nadejścia nie zmienia wyniku; stary wpis waży połowę
+    assert abs(late.score("BTC", "news", now=3600) - in_order.score("BTC", "news", now=3600)) < 1e-12
+    assert late.mentions("BTC", "news") == 1.5
@@ -0,0 +1,71 @@
+import multiprocessing
+from shared_limiter import SharedRateLimiter
+
+def _spend(path, calls, queue):
+    limiter = SharedRateLimiter(path, max_weight=10 ** 6, window_seconds=60)
+    for _ in range(calls):
+        limiter.wait(weight=2)
+    limiter.close()
+    queue.put(calls)
+
+def test_budget_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'limit.bin')
+    SharedRateLimiter(path, max_weight=10 ** 6).close()
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    workers = [ctx.Process(target=_spend, args=(path, 50, queue)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    assert sum(queue.get() for _ in workers) == 150
+
+    limiter = SharedRateLimiter(path, max_weight=10 ** 6)
+    assert limiter.usage()['used'] == 300
+    limiter.close()
+
+def test_lower_priority_yields_and_server_weight_counts(tmp_path):
+    now = [1000.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    path = str(tmp_path / 'limit.bin')
+    limiter = SharedRateLimiter(path, max_weight=100, window_seconds=10, poll=0.5, clock=lambda: now[0], sleep=sleep)
+    other = SharedRateLimiter(path, max_weight=100, window_seconds=10, poll=0.5, clock=lambda: now[0], sleep=sleep)
+
+    # Udział 'bulk' (50%) wyczerpany - zlecenie wciąż przechodzi od razu
+    assert limiter.wait(50, 'bulk') == 0
+    assert other.wait(40, 'order') == 0
+    assert limiter.usage()['used'] == 90
+
+    # Waga z nagłówka giełdy wyższa niż policzona lokalnie
+    other.observe_used_weight(95)
+    assert limiter.usage()['used'] == 95
+
+    # 'default' czeka na wyjście kubełków z okna (nowa minuta zeruje wagę z giełdy)
+    waited = limiter.wait(10, 'default')
+    assert waited >= 10 and slept
+
+    # Czekające zlecenie blokuje niższą klasę mimo wolnego udziału
+    now[0] += 20
+    other._header['waiting'][0] = now[0] + 1.0
+    slept.clear()
+    limiter.wait(1, 'bulk')
+    assert sum(slept) >= 1.0
+    limiter.close()
+    other.close()
+
+def test_market_data_fetches_draw_from_shared_budget(tmp_path):
+    from bench_cycle import FakeClient, load_fixture, make_analyzer, make_config, symbol_klines
+    analyzer = make_analyzer(FakeClient(symbol_klines(load_fixture(), 3)), make_config(3))
+    analyzer.limiter = SharedRateLimiter(str(tmp_path / 'limit.bin'), max_weight=10 ** 6)
+
+    for symbol in list(analyzer.client.klines):
+        analyzer.get_candles(symbol)
+    analyzer.get_candles(symbol)
+    # Trzy pełne historie i jedno dociągnięcie po wadze 2
+    assert analyzer.limiter.usage()['used'] == 8
+    analyzer.limiter.close()
@@ -0,0 +1,75 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from unittest.mock import MagicMock
+from scheduler import AnalysisScheduler
+from snapshot_store import SNAPSHOT_DTYPE, SnapshotStore
+from test_scheduler import FakeAnalyzer, MockConfig
+
+DAY = 86400.0
+
+def _results(symbols, score):
+    return pd.DataFrame({
+        'symbol': symbols,
+        'price': 1.0,
+        'rsi': 50.0,
+        'macd': 0.1,
+        'adx': 20.0,
+        'bb_percent': 0.5,
+        'trend_4h': 1,
+        'trend_1d': -1,
+        'score': [score + i for i in range(len(symbols))]
+    })
+
+def test_queries_across_days_and_restart(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    assert store.append(_results(['AUSDT', 'BUSDT'], 0.0), ts=10 * DAY) == 0
+    assert store.append(_results(['BUSDT'], 5.0), ts=10 * DAY + 3600) == 1
+    assert store.append(_results(['AUSDT', 'CUSDT'], 2.0), ts=11 * DAY) == 2
+    assert len(list(tmp_path.iterdir())) == 2
+
+    cycle = store.cycle(1)
+    assert list(cycle['symbol']) == ['BUSDT'] and cycle['score'][0] == 5.0
+    assert list(store.cycle()['symbol']) == ['AUSDT', 'CUSDT']
+    assert np.isnan(cycle['news_sentiment'][0]) and cycle['trend'][0] == 0.0
+
+    # Najnowszy wiersz każdego symbolu, od najwyższego score
+    latest = store.latest(max_age=2 * DAY, now=11 * DAY)
+    assert list(latest['symbol']) == ['BUSDT', 'CUSDT', 'AUSDT']
+    assert list(latest['cycle']) == [1, 2, 2]
+
+    history = store.history('AUSDT')
+    assert list(history['cycle']) == [0, 2]
+    assert list(store.history('AUSDT', start=10 * DAY + 1)['cycle']) == [2]
+    store.close()
+
+    # Niedokończony zapis po awarii jest obcinany, numeracja cykli trwa dalej
+    with open(tmp_path / 'analysis-19700112.bin', 'ab') as f:
+        f.write(b'\x00' * (SNAPSHOT_DTYPE.itemsize // 2))
+    reopened = SnapshotStore(str(tmp_path))
+    assert reopened.append(_results(['AUSDT'], 1.0), ts=11 * DAY + 60) == 3
+    assert list(reopened.history('AUSDT')['cycle']) == [0, 2, 3]
+
+def test_retention_and_scheduler_append(tmp_path):
+    store = SnapshotStore(str(tmp_path), retention_days=1)
+    store.append(_results(['AUSDT'], 0.0), ts=10 * DAY)
+    store.append(_results(['AUSDT'], 0.0), ts=13 * DAY)
+    assert [p.name for p in tmp_path.iterdir()] == ['analysis-19700114.bin']
+
+    analyzer = FakeAnalyzer(['AUSDT', 'BUSDT', 'CUSDT'])
+    optimizer = MagicMock()
+    optimizer.risk_manager.check_positions.return_value = []
+    optimizer.calculate_allocation.return_value = {}
+    optimizer.generate_orders.return_value = []
+    scheduler = AnalysisScheduler(analyzer, optimizer, MockConfig(), clock=lambda: 13 * DAY + 60, snapshots=store)
+    result = asyncio.run(scheduler.run_cycle())
+
+    assert result['snapshot_cycle'] == 2
+    assert sorted(store.cycle(2)['symbol']) == ['AUSDT', 'BUSDT', 'CUSDT']
+
+def test_non_ascii_symbols_and_too_long_rows(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.append(_results(['币安人生USDT', 'AUSDT', 'X' * 21], 0.0), ts=10 * DAY)
+    # Za długi symbol pominięty, reszta cyklu zapisana
+    assert list(store.cycle()['symbol']) == ['币安人生USDT', 'AUSDT']
+    assert list(store.history('币安人生USDT')['score']) == [0.0]
@@ -0,0 +1,100 @@
+import asyncio
+from stream_supervisor import StreamSupervisor
+
+class FakeSocket:
+    def __init__(self, messages=(), fail=False):
+        self.messages = list(messages)
+        self.fail = fail
+
+    async def __aenter__(self):
+        if self.fail:
+            raise OSError("connection refused")
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def recv(self):
+        if not self.messages:
+            # Połączenie wisi bez danych
+            await asyncio.sleep(3600)
+        message = self.messages.pop(0)
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+def tick(stream, event_time):
+    return {'stream': stream, 'data': {'e': '24hrTicker', 'E': event_time, 's': stream.upper(), 'c': '1'}}
+
+def test_supervisor_reconnects_without_cap_and_backfills_gap_windows():
+    sessions = [
+        FakeSocket([tick('a', 1000), tick('b', 1000), ConnectionError("reset")]),
+        *[FakeSocket(fail=True) for _ in range(4)],
+        FakeSocket(),
+        FakeSocket([tick('a', 5000), tick('b', 6000)])
+    ]
+    received, backfills, delays = [], [], []
+
+    async def backfill(streams, start, end):
+        backfills.append((streams, start, end))
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    def on_message(message):
+        received.append(message['stream'])
+        if len(received) == 4:
+            supervisor.stop()
+
+    supervisor = StreamSupervisor(
+        'ticker',
+        lambda: sessions.pop(0),
+        on_message,
+        streams=['a', 'b'],
+        backfill=backfill,
+        heartbeat_interval=0.02,
+        stall_timeout=0.1,
+        backoff=1.0,
+        max_backoff=8.0,
+        sleep=fake_sleep
+    )
+    asyncio.run(asyncio.wait_for(supervisor.run(), 5))
+
+    assert received == ['a', 'b', 'a', 'b']
+    assert backfills == [(['a'], 1000, 5000), (['b'], 1000, 6000)]
+    assert supervisor.stats['errors'] == 5 and supervisor.stats['stalls'] == 1
+    assert supervisor.stats['connects'] == 3 and len(delays) == 6
+    # Pełny jitter ograniczony rosnącym (do max_backoff) oknem
+    assert all(0 <= d <= min(8.0, 2 ** i) for i, d in enumerate(delays))
+
+def test_stream_stall_uses_exchange_clock():
+    now = [1000.0]
+    backfills = []
+
+    async def backfill(streams, start, end):
+        backfills.append((streams, start, end))
+
+    # Zegar giełdy 50 s za lokalnym
+    supervisor = StreamSupervisor(
+        'ticker',
+        None,
+        lambda message: None,
+        streams=['a'],
+        backfill=backfill,
+        heartbeat_interval=1.0,
+        stall_timeout=3600,
+        stream_stall_timeout=10,
+        clock=lambda: now[0],
+        time_offset=lambda: -50_000
+    )
+
+    async def scenario():
+        await supervisor._handle(tick('a', 950_000), {})
+        await supervisor._heartbeat()
+        assert backfills == []
+        now[0] += 20
+        await supervisor._heartbeat()
+
+    asyncio.run(scenario())
+    assert backfills == [(['a'], 950_000, 970_000)]
+    assert supervisor.last_event['a'] == 970_000
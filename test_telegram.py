@@ -0,0 +1,70 @@
+import asyncio
+from http_pool import HttpResponse
+from telegram_handler import TelegramNotifier, TokenBucket
+
+class MockConfig:
+    telegram_token = "token"
+    telegram_chat_id = "123"
+    telegram_batch_window = 0.05
+    telegram_batch_max = 20
+    telegram_queue_size = 10
+    telegram_chat_rate = 100.0
+    telegram_global_rate = 100.0
+    telegram_max_retries = 3
+    telegram_flush_timeout = 1.0
+
+class FakePool:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    async def post(self, url, params=None, **kwargs):
+        self.sent.append(params["text"])
+        return self.responses.pop(0) if self.responses else HttpResponse(200, {}, {"ok": True})
+
+def order(symbol):
+    return {'symbol': symbol, 'side': 'BUY', 'quantity': 1.0, 'price': 10.0}
+
+async def _run_notifier(pool):
+    notifier = TelegramNotifier(MockConfig(), http_pool=pool, global_bucket=TokenBucket(100.0))
+    notifier.start()
+    for symbol in ("BTCUSDT", "ETHUSDT", "SOLUSDT"):
+        notifier.notify_trade(order(symbol))
+    await notifier.send("raport")
+    await notifier.close()
+    return notifier
+
+def test_trades_merged_and_429_retried():
+    limited = HttpResponse(429, {}, {"ok": False, "parameters": {"retry_after": 0}})
+    pool = FakePool([limited])
+    notifier = asyncio.run(_run_notifier(pool))
+
+    assert len(pool.sent) == 3
+    assert pool.sent[0] == pool.sent[1]
+    assert "Nowe transakcje (3)" in pool.sent[1]
+    assert pool.sent[2] == "raport"
+    assert notifier.stats == {'sent': 2, 'merged': 2, 'dropped': 0, 'rate_limited': 1, 'failed': 0}
+
+def test_token_bucket_limits_rate():
+    now = [0.0]
+    bucket = TokenBucket(1.0, capacity=1.0, clock=lambda: now[0])
+    assert bucket.delay() == 0
+    bucket.consume()
+    assert bucket.delay() == 1.0
+    now[0] = 1.0
+    bucket.block(5)
+    assert bucket.delay() == 5.0
+
+def test_other_messages_keep_their_place_between_trades():
+    async def run(pool):
+        notifier = TelegramNotifier(MockConfig(), http_pool=pool, global_bucket=TokenBucket(100.0))
+        notifier.start()
+        notifier.notify_trade(order("BTCUSDT"))
+        await notifier.send("raport")
+        notifier.notify_trade(order("ETHUSDT"))
+        await notifier.close()
+
+    pool = FakePool([])
+    asyncio.run(run(pool))
+    assert len(pool.sent) == 3
+    assert "BTCUSDT" in pool.sent[0] and pool.sent[1] == "raport" and "ETHUSDT" in pool.sent[2]
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from bench_cycle import generate_fixture
+from klines import klines_frame, parse_klines_array
+from timeframes import CandleSeries, resample
+
+def test_resample_matches_pandas_and_skips_partial_head():
+    base = parse_klines_array(generate_fixture(length=200))[3:]
+    bars = klines_frame(resample(base, 4 * 3_600_000))
+
+    df = klines_frame(base).set_index('timestamp')
+    expected = df.resample('4h').agg({
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+    }).iloc[1:]
+    assert bars['timestamp'].tolist() == expected.index.tolist()
+    for column in ['open', 'high', 'low', 'close', 'volume']:
+        assert np.allclose(bars[column].to_numpy(), expected[column].to_numpy())
+
+def test_incremental_update_equals_full_resample():
+    base = parse_klines_array(generate_fixture(length=300))
+    series = CandleSeries('1h', ['4h', '1d'], history=1000)
+    series.update(base[:150].copy())
+    # Ostatnia świeca przychodzi ponownie (była niezamknięta) razem z nowymi
+    for start in range(149, 300, 7):
+        series.update(base[start:start + 8].copy())
+
+    assert np.array_equal(series.array(), base)
+    for interval, ms in [('4h', 4 * 3_600_000), ('1d', 86_400_000)]:
+        assert np.array_equal(series.array(interval), resample(base, ms))
@@ -0,0 +1,28 @@
+from universe import screen_tickers
+
+def ticker(symbol, volume, bid, ask, change):
+    return {
+        'symbol': symbol,
+        'quoteVolume': str(volume),
+        'bidPrice': str(bid),
+        'askPrice': str(ask),
+        'priceChangePercent': str(change)
+    }
+
+def test_screen_filters_and_ranks_by_quote_volume():
+    tickers = [
+        ticker('AUSDT', 5e6, 99.9, 100.1, 2.0),
+        ticker('BUSDT', 9e6, 10.0, 10.5, 1.0),     # spread za szeroki
+        ticker('CUSDT', 2e5, 1.0, 1.0001, 3.0),    # za mały wolumen
+        ticker('DUSDT', 8e6, 5.0, 5.001, -45.0),   # zbyt duża zmiana ceny
+        ticker('EUSDT', 7e6, 2.0, 2.001, -4.0),
+        ticker('FUSDT', 6e6, 0.0, 0.0, 1.0),       # brak notowań
+        ticker('GBTC', 9e9, 1.0, 1.0001, 1.0),     # spoza listy symboli
+        ticker('HUSDT', 6.5e6, 3.0, 3.001, 0.5),
+    ]
+    symbols = ['AUSDT', 'BUSDT', 'CUSDT', 'DUSDT', 'EUSDT', 'FUSDT', 'HUSDT']
+    kwargs = dict(min_quote_volume=1e6, max_spread=0.002, max_abs_change=30.0)
+
+    assert screen_tickers(tickers, symbols, 10, **kwargs) == ['EUSDT', 'HUSDT', 'AUSDT']
+    assert screen_tickers(tickers, symbols, 2, **kwargs) == ['EUSDT', 'HUSDT']
+    assert screen_tickers(tickers, [], 10, **kwargs) == []
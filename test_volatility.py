@@ -0,0 +1,30 @@
+import math
+import time
+from volatility import VolatilityTracker
+
+def test_volatility_incremental_update():
+    tracker = VolatilityTracker(ewma_lambda=0.94, atr_period=3, ttl=60)
+    closes = [100.0, 101.0, 99.0, 102.0, 100.0]
+    times = list(range(len(closes)))
+    highs = [c + 1 for c in closes]
+    lows = [c - 1 for c in closes]
+
+    assert tracker.update('BTCUSDT', times, highs, lows, closes) == 5
+    # Powtórne dane nie zmieniają stanu
+    assert tracker.update('BTCUSDT', times, highs, lows, closes) == 0
+
+    var = None
+    for prev, cur in zip(closes, closes[1:]):
+        r2 = math.log(cur / prev) ** 2
+        var = r2 if var is None else 0.94 * var + 0.06 * r2
+    assert math.isclose(tracker.ewma('BTCUSDT'), math.sqrt(var))
+    assert tracker.atr_percent('BTCUSDT') > 0
+    assert tracker.get('BTCUSDT') == max(tracker.ewma('BTCUSDT'), tracker.atr_percent('BTCUSDT'))
+
+def test_volatility_expiry():
+    tracker = VolatilityTracker(ttl=60)
+    tracker.update('ETHUSDT', [1, 2], [11, 12], [9, 10], [10, 11])
+    assert tracker.get('ETHUSDT') is not None
+    tracker._state['ETHUSDT'].updated_at = time.monotonic() - 120
+    assert tracker.get('ETHUSDT') is None
+    assert tracker.get('XRPUSDT') is None
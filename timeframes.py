@@ -0,0 +1,96 @@
+# timeframes.py
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional
+from klines import KLINE_DTYPE, klines_frame
+
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 180_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '2h': 7_200_000,
+    '4h': 14_400_000,
+    '6h': 21_600_000,
+    '8h': 28_800_000,
+    '12h': 43_200_000,
+    '1d': 86_400_000
+}
+
+def resample(base: np.ndarray, interval_ms: int, drop_partial_head: bool = True) -> np.ndarray:
+    """
+    Agregacja świec bazowych do wyższego interwału (przedziały liczone od epoki UTC,
+    jak na Binance). Pierwszy przedział bez pełnego początku jest pomijany.
+    """
+    if not len(base):
+        return np.empty(0, dtype=KLINE_DTYPE)
+    bins = base['timestamp'] // interval_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bins)) + 1))
+    ends = np.append(starts[1:], len(base)) - 1
+
+    bars = np.empty(len(starts), dtype=KLINE_DTYPE)
+    bars['timestamp'] = bins[starts] * interval_ms
+    bars['open'] = base['open'][starts]
+    bars['high'] = np.maximum.reduceat(base['high'], starts)
+    bars['low'] = np.minimum.reduceat(base['low'], starts)
+    bars['close'] = base['close'][ends]
+    bars['volume'] = np.add.reduceat(base['volume'], starts)
+    # Dla niezamkniętego słupka czas zamknięcia to ostatnia świeca bazowa
+    bars['close_time'] = base['close_time'][ends]
+
+    if drop_partial_head and base['timestamp'][0] != bars['timestamp'][0]:
+        bars = bars[1:]
+    return bars
+
+class CandleSeries:
+    """
+    Jedna seria świec bazowych na symbol; wyższe interwały liczone lokalnie
+    i aktualizowane przyrostowo - przeliczany jest tylko ostatni dotknięty słupek.
+    """
+
+    def __init__(self, base_interval: str = '1h', intervals: Iterable[str] = ('4h', '1d'), history: int = 1000):
+        self.base_interval = base_interval
+        self.base_ms = INTERVAL_MS[base_interval]
+        self.history = history
+        self.base = np.empty(0, dtype=KLINE_DTYPE)
+        self.frames: Dict[str, np.ndarray] = {}
+        for interval in intervals:
+            if INTERVAL_MS[interval] % self.base_ms:
+                raise ValueError(f"Interwał {interval} nie jest wielokrotnością {base_interval}")
+            if interval != base_interval:
+                self.frames[interval] = np.empty(0, dtype=KLINE_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        return int(self.base['timestamp'][-1]) if len(self.base) else None
+
+    def update(self, candles: np.ndarray) -> None:
+        """Dołącza nowe świece; świeca o tym samym czasie otwarcia (niezamknięta) jest zastępowana."""
+        if not len(candles):
+            return
+        first = candles['timestamp'][0]
+        if len(self.base) and first <= self.base['timestamp'][-1]:
+            self.base = np.concatenate((self.base[self.base['timestamp'] < first], candles))
+        else:
+            self.base = np.concatenate((self.base, candles))
+        self.base = self.base[-self.history:]
+
+        for interval, bars in self.frames.items():
+            interval_ms = INTERVAL_MS[interval]
+            start = first // interval_ms * interval_ms
+            tail = self.base[self.base['timestamp'] >= start]
+            kept = bars[bars['timestamp'] < start] if len(bars) else bars
+            updated = resample(tail, interval_ms, drop_partial_head=not len(kept))
+            self.frames[interval] = np.concatenate((kept, updated))[-self.history:]
+
+    def array(self, interval: Optional[str] = None, lookback: Optional[int] = None) -> np.ndarray:
+        data = self.base if interval in (None, self.base_interval) else self.frames[interval]
+        return data[-lookback:] if lookback else data
+
+    def frame(self, interval: Optional[str] = None, lookback: Optional[int] = None) -> pd.DataFrame:
+        return klines_frame(self.array(interval, lookback))
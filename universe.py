@@ -0,0 +1,50 @@
+# universe.py
+import logging
+import numpy as np
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+def _column(tickers: List[Dict], key: str) -> np.ndarray:
+    return np.array([float(t.get(key) or 0.0) for t in tickers], dtype=np.float64)
+
+def screen_tickers(
+    tickers: List[Dict],
+    symbols: Iterable[str],
+    limit: int,
+    min_quote_volume: float = 0.0,
+    max_spread: float = float('inf'),
+    min_abs_change: float = 0.0,
+    max_abs_change: float = float('inf')
+) -> List[str]:
+    """
+    Wstępna selekcja z odpowiedzi /api/v3/ticker/24hr: tylko symbole z `symbols`
+    spełniające progi płynności, spreadu i zmiany ceny, posortowane malejąco
+    po wolumenie w walucie kwotowanej. Zwraca co najwyżej `limit` symboli.
+    """
+    allowed = set(symbols)
+    tickers = [t for t in tickers if t.get('symbol') in allowed]
+    if not tickers:
+        return []
+
+    quote_volume = _column(tickers, 'quoteVolume')
+    bid = _column(tickers, 'bidPrice')
+    ask = _column(tickers, 'askPrice')
+    change = np.abs(_column(tickers, 'priceChangePercent'))
+    mid = (bid + ask) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spread = np.where((bid > 0) & (ask >= bid), (ask - bid) / mid, np.inf)
+
+    mask = (
+        (quote_volume >= min_quote_volume)
+        & (spread <= max_spread)
+        & (change >= min_abs_change)
+        & (change <= max_abs_change)
+    )
+    candidates = np.flatnonzero(mask)
+    ranked = candidates[np.argsort(-quote_volume[candidates], kind='stable')][:limit]
+    logger.info(
+        "Selekcja rynku: %d/%d symboli spełnia progi, do analizy %d",
+        len(candidates), len(tickers), len(ranked)
+    )
+    return [tickers[i]['symbol'] for i in ranked]
@@ -1,10 +1,14 @@
 # utils.py
+import importlib
 import logging
+import sys
 import time
 import threading
+import types
 from functools import wraps
 from decimal import Decimal, ROUND_DOWN, InvalidOperation
 from typing import Any, Callable, Optional, TypeVar, Union
+from metrics import metrics
 
 logger = logging.getLogger(__name__)
 T = TypeVar('T')
@@ -16,8 +20,9 @@ class DynamicRateLimiter:
         self.calls = []
         self.lock = threading.Lock()
 
-    def wait(self) -> None:
-        with self.lock:
+    def wait(self, weight: int = 1, priority: str = 'default') -> None:
+        # Limiter lokalny liczy wywołania; waga i priorytet mają znaczenie w SharedRateLimiter
+        with metrics.timer('rate_limiter_wait_seconds'), self.lock:
             now = time.monotonic()
             self.calls = [t for t in self.calls if t > now - self.window]
             
@@ -26,20 +31,54 @@ class DynamicRateLimiter:
                 wait_time = (oldest + self.window) - now
                 
                 if wait_time > 0:
-                    logger.info(f"Oczekiwanie: {wait_time:.2f}s")
+                    logger.info("Oczekiwanie: %.2fs", wait_time)
                     time.sleep(wait_time)
                     now = time.monotonic()
                     self.calls = [t for t in self.calls if t > now - self.window]
             
             self.calls.append(now)
 
+class LazyModule(types.ModuleType):
+    """Moduł importowany dopiero przy pierwszym odwołaniu do atrybutu."""
+
+    def __getattr__(self, attr: str) -> Any:
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+def lazy_import(name: str) -> types.ModuleType:
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+class EventSignal:
+    """Lekki odpowiednik sygnału Qt - bez zależności od pętli Qt."""
+
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback: Callable[..., Any]) -> None:
+        self._callbacks.append(callback)
+
+    def disconnect(self, callback: Callable[..., Any]) -> None:
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def emit(self, *args: Any) -> None:
+        for callback in list(self._callbacks):
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error("Błąd obsługi zdarzenia %s: %s", getattr(callback, '__name__', callback), e)
+
 def error_handler(func: Callable[..., T]) -> Callable[..., Optional[T]]:
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> Optional[T]:
         try:
             return func(*args, **kwargs)
         except Exception as e:
-            logger.error(f"Błąd w {func.__name__}: {str(e)}", exc_info=True)
+            # Pełny traceback tylko przy DEBUG - połykane wyjątki bywają częste
+            logger.error("Błąd w %s: %s", func.__name__, e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return None
     return wrapper
 
@@ -58,7 +97,7 @@ def retry_on_exception(max_attempts: int = 3, timeout: float = 60.0) -> Callable
                 except Exception as e:
                     last_exception = e
                     wait = min(2 ** attempt, 10)
-                    logger.warning(f"Próba {attempt+1}/{max_attempts} - Czekam {wait}s")
+                    logger.warning("Próba %d/%d - Czekam %ss", attempt + 1, max_attempts, wait)
                     time.sleep(wait)
             
             raise last_exception if last_exception else RuntimeError("Nieznany błąd")
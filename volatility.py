@@ -0,0 +1,150 @@
+# volatility.py
+import logging
+import math
+import time
+from collections import deque
+from itertools import chain
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+class SymbolVolatility:
+    __slots__ = (
+        'last_candle_time', 'last_close', 'ewma_var', 'atr', 'tr_count', 'updated_at', 'returns', 'return_times'
+    )
+
+    def __init__(self, history: int):
+        self.last_candle_time = None
+        self.last_close = None
+        self.ewma_var = None
+        self.atr = None
+        self.tr_count = 0
+        self.updated_at = 0.0
+        self.returns = deque(maxlen=history)
+        # Czas świecy każdego zwrotu - wyrównanie scenariuszy VaR między symbolami
+        self.return_times = deque(maxlen=history)
+
+class VolatilityTracker:
+    """Przyrostowa zmienność (EWMA i ATR) per symbol, serwowana z pamięci."""
+
+    def __init__(self, ewma_lambda: float = 0.94, atr_period: int = 14, ttl: float = 7200, history: int = 100):
+        self.ewma_lambda = ewma_lambda
+        self.history = history
+        self.atr_period = atr_period
+        self.ttl = ttl
+        self._state: Dict[str, SymbolVolatility] = {}
+
+    def update_candle(self, symbol: str, candle_time: int, high: float, low: float, close: float) -> bool:
+        state = self._state.get(symbol)
+        if state is None:
+            state = self._state[symbol] = SymbolVolatility(self.history)
+        elif state.last_candle_time is not None and candle_time <= state.last_candle_time:
+            return False
+
+        prev_close = state.last_close
+        if prev_close:
+            log_return = math.log(close / prev_close)
+            state.returns.append(log_return)
+            state.return_times.append(int(candle_time))
+            if state.ewma_var is None:
+                state.ewma_var = log_return ** 2
+            else:
+                state.ewma_var = (
+                    self.ewma_lambda * state.ewma_var +
+                    (1 - self.ewma_lambda) * log_return ** 2
+                )
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        else:
+            true_range = high - low
+
+        # Średnia krocząca do zebrania okresu, potem wygładzanie Wildera
+        if state.atr is None:
+            state.atr = true_range
+            state.tr_count = 1
+        elif state.tr_count < self.atr_period:
+            state.tr_count += 1
+            state.atr += (true_range - state.atr) / state.tr_count
+        else:
+            state.atr = (state.atr * (self.atr_period - 1) + true_range) / self.atr_period
+
+        state.last_candle_time = candle_time
+        state.last_close = close
+        state.updated_at = time.monotonic()
+        return True
+
+    def update(
+        self,
+        symbol: str,
+        candle_times: Sequence[int],
+        highs: Sequence[float],
+        lows: Sequence[float],
+        closes: Sequence[float]
+    ) -> int:
+        state = self._state.get(symbol)
+        last_seen = state.last_candle_time if state else None
+        updated = 0
+        for candle_time, high, low, close in zip(candle_times, highs, lows, closes):
+            if last_seen is not None and candle_time <= last_seen:
+                continue
+            if self.update_candle(symbol, int(candle_time), float(high), float(low), float(close)):
+                updated += 1
+        if state is not None and updated == 0:
+            # Brak nowych świec - dane nadal aktualne
+            state.updated_at = time.monotonic()
+        return updated
+
+    def _fresh_state(self, symbol: str) -> Optional[SymbolVolatility]:
+        state = self._state.get(symbol)
+        if state is None or time.monotonic() - state.updated_at > self.ttl:
+            return None
+        return state
+
+    def ewma(self, symbol: str) -> Optional[float]:
+        state = self._fresh_state(symbol)
+        if state is None or state.ewma_var is None:
+            return None
+        return math.sqrt(state.ewma_var)
+
+    def atr_percent(self, symbol: str) -> Optional[float]:
+        state = self._fresh_state(symbol)
+        if state is None or state.atr is None or not state.last_close:
+            return None
+        return state.atr / state.last_close
+
+    def get(self, symbol: str) -> Optional[float]:
+        values = [v for v in (self.ewma(symbol), self.atr_percent(symbol)) if v is not None]
+        return max(values) if values else None
+
+    def last_close(self, symbol: str) -> Optional[float]:
+        state = self._fresh_state(symbol)
+        return state.last_close if state else None
+
+    def returns_matrix(self, symbols: List[str], length: Optional[int] = None) -> np.ndarray:
+        """
+        Macierz log-zwrotów (świece, symbole): wiersz to jeden czas świecy, wspólny dla
+        wszystkich symboli (ostatnie `length` czasów). Brak świecy symbolu w danym czasie = 0.
+        """
+        length = length or self.history
+        states = [self._state.get(symbol) for symbol in symbols]
+        counts = np.array([len(state.returns) if state else 0 for state in states], dtype=np.intp)
+        total = int(counts.sum())
+        if not total:
+            return np.zeros((0, len(symbols)))
+        filled = [state for state in states if state and state.returns]
+        times = np.fromiter(chain.from_iterable(s.return_times for s in filled), dtype=np.int64, count=total)
+        returns = np.fromiter(chain.from_iterable(s.returns for s in filled), dtype=float, count=total)
+        columns = np.repeat(np.arange(len(symbols)), counts)
+        # Jedno sortowanie wszystkich czasów; wiersz = pozycja czasu wśród unikalnych
+        unique, rows = np.unique(times, return_inverse=True)
+        first = max(0, len(unique) - length)
+        keep = rows >= first
+        matrix = np.zeros((len(unique) - first, len(symbols)))
+        matrix[rows[keep] - first, columns[keep]] = returns[keep]
+        return matrix
+
+    def discard(self, symbol: str) -> None:
+        self._state.pop(symbol, None)
+
+    def __contains__(self, symbol: str) -> bool:
+        return self._fresh_state(symbol) is not None
@@ -1,48 +1,97 @@
 # websocket_handler.py
 import logging
 import asyncio
+import inspect
+from typing import List
 from binance import AsyncClient, BinanceSocketManager
 from cachetools import TTLCache
-from PySide6.QtCore import QObject, Signal
+from utils import EventSignal
+from metrics import metrics
+from klines import parse_klines_array
+from stream_supervisor import StreamSupervisor
+from timeframes import INTERVAL_MS
 
 logger = logging.getLogger(__name__)
 
-class BinanceWebSocketManager(QObject):
-    price_updated = Signal(dict)
-    error_occurred = Signal(str)
+async def _call(method, **params):
+    # Klient asynchroniczny (AsyncClient) albo synchroniczny (Client) - ten drugi poza pętlą
+    if inspect.iscoroutinefunction(method):
+        return await method(**params)
+    return await asyncio.to_thread(method, **params)
 
-    def __init__(self, client: AsyncClient):
-        super().__init__()
+class BinanceWebSocketManager:
+    def __init__(self, client: AsyncClient, config=None, limiter=None, time_offset=None):
+        self.price_updated = EventSignal()
+        self.candle_updated = EventSignal()
+        self.error_occurred = EventSignal()
         self.client = client
+        self.config = config
+        self.limiter = limiter
+        # Przesunięcie zegara giełdy (ms) - nadzór porównuje czasy zdarzeń z czasem giełdy
+        self.time_offset = time_offset
         self.bm = BinanceSocketManager(client)
-        self.sockets = []
+        self.supervisors: List[StreamSupervisor] = []
+        self._tasks = set()
         self.price_cache = TTLCache(maxsize=500, ttl=60)
         self.running = False
 
+    def _supervisor(self, name: str, streams: List[str], on_message, backfill) -> StreamSupervisor:
+        options = {}
+        if self.config is not None:
+            options = {
+                'heartbeat_interval': self.config.ws_heartbeat_interval,
+                'stall_timeout': self.config.ws_stall_timeout,
+                'stream_stall_timeout': self.config.ws_stream_stall_timeout or None,
+                'backoff': self.config.ws_backoff,
+                'max_backoff': self.config.ws_max_backoff
+            }
+        supervisor = StreamSupervisor(
+            name,
+            lambda: self.bm.multiplex_socket(streams),
+            on_message,
+            streams=streams,
+            backfill=backfill,
+            time_offset=self.time_offset,
+            **options
+        )
+        self.supervisors.append(supervisor)
+        return supervisor
+
     async def start_symbol_ticker(self, symbols: list):
+        """Ceny wszystkich symboli jednym połączeniem; działa do close()."""
         self.running = True
-        max_retries = 3  # Nowy mechanizm
-        for symbol in symbols:
-            retries = 0
-            while retries < max_retries and self.running:
-                try:
-                    ts = self.bm.symbol_ticker_socket(symbol)
-                    self.sockets.append(ts)
-                    async with ts as tsc:
-                        while self.running:
-                            msg = await tsc.recv()
-                            self._process_message(msg, symbol)
-                    break
-                except Exception as e:
-                    logger.error(f"Błąd WebSocket ({symbol}): {str(e)}. Próba {retries+1}/{max_retries}")
-                    retries += 1
-                    await asyncio.sleep(5 ** retries)
-        self.running = False
+        streams = [f"{s.lower()}@ticker" for s in symbols]
+        supervisor = self._supervisor('ticker', streams, self._process_message, self._backfill_prices)
+        await self._run(supervisor)
 
-    def _process_message(self, message, symbol):
+    async def _run(self, supervisor: StreamSupervisor) -> None:
+        task = asyncio.current_task()
+        self._tasks.add(task)
         try:
-            if 'e' in message and message['e'] == '24hrTicker':
-                price = float(message['c'])
+            await supervisor.run()
+        finally:
+            self._tasks.discard(task)
+            if not self._tasks:
+                self.running = False
+
+    async def start_kline_stream(self, symbols: list, interval: str = '1h'):
+        """Świece (także niezamknięte) jako tablice KLINE_DTYPE przez candle_updated(symbol, array)."""
+        self.running = True
+        streams = [f"{s.lower()}@kline_{interval}" for s in symbols]
+
+        async def backfill(gap_streams, start_ms, end_ms):
+            await self._backfill_klines(gap_streams, interval, start_ms, end_ms)
+
+        supervisor = self._supervisor(f'kline_{interval}', streams, self._process_kline, backfill)
+        await self._run(supervisor)
+
+    def _process_message(self, message):
+        metrics.mark('ws_messages')
+        try:
+            data = message.get('data', message)
+            if 'e' in data and data['e'] == '24hrTicker':
+                symbol = data['s']
+                price = float(data['c'])
                 self.price_cache[symbol] = price
                 self.price_updated.emit({symbol: price})
         except KeyError as e:
@@ -50,8 +99,60 @@ class BinanceWebSocketManager(QObject):
         except Exception as e:
             self.error_occurred.emit(f"Błąd przetwarzania: {str(e)}")
 
+    def _process_kline(self, message):
+        metrics.mark('ws_messages')
+        try:
+            data = message.get('data', message)
+            k = data['k']
+            candle = parse_klines_array([[k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T']]])
+            self.candle_updated.emit(data['s'], candle)
+        except KeyError as e:
+            self.error_occurred.emit(f"Błędny format wiadomości: {str(e)}")
+        except Exception as e:
+            self.error_occurred.emit(f"Błąd przetwarzania: {str(e)}")
+
+    async def _throttle(self, weight: int) -> None:
+        # Uzupełnianie luk to ruch masowy - ustępuje zleceniom we wspólnym budżecie
+        if self.limiter is not None:
+            await asyncio.to_thread(self.limiter.wait, weight, 'bulk')
+
+    @staticmethod
+    def _symbol(stream: str) -> str:
+        return stream.split('@')[0].upper()
+
+    async def _backfill_prices(self, streams: List[str], start_ms: int, end_ms: int) -> None:
+        # Cena to stan bieżący - dla okna przerwy wystarcza aktualna wartość z REST
+        for stream in streams:
+            symbol = self._symbol(stream)
+            await self._throttle(2)
+            ticker = await _call(self.client.get_symbol_ticker, symbol=symbol)
+            price = float(ticker['price'])
+            self.price_cache[symbol] = price
+            self.price_updated.emit({symbol: price})
+
+    async def _backfill_klines(self, streams: List[str], interval: str, start_ms: int, end_ms: int) -> None:
+        # Od świecy trwającej w chwili zerwania (jej zamknięcie też przepadło) do końca przerwy
+        interval_ms = INTERVAL_MS[interval]
+        first_open = start_ms // interval_ms * interval_ms
+        for stream in streams:
+            symbol = self._symbol(stream)
+            await self._throttle(2)
+            klines = await _call(
+                self.client.get_klines,
+                symbol=symbol,
+                interval=interval,
+                startTime=first_open,
+                endTime=end_ms
+            )
+            if klines:
+                self.candle_updated.emit(symbol, parse_klines_array(klines))
+
     async def close(self):
         self.running = False
-        for ts in self.sockets:
-            await ts.__aexit__(None, None, None)
-        self.sockets.clear()
\ No newline at end of file
+        for supervisor in self.supervisors:
+            supervisor.stop()
+        self.supervisors.clear()
+        tasks = [t for t in self._tasks if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)